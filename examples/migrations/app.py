@@ -0,0 +1,22 @@
+import uvicorn
+
+from examples.migrations.routes import router
+from fastapi_header_versioning import HeaderRoutingFastAPI
+from fastapi_header_versioning.openapi import doc_generation
+
+app = HeaderRoutingFastAPI(version_header="x-version", title="Versioned app")
+app.include_router(router)
+app = doc_generation(app)
+
+uvicorn.Config(
+    app=app,
+    proxy_headers=True,
+    access_log=False,
+)
+
+if __name__ == "__main__":
+    uvicorn.run(
+        app=app,
+        port=9999,
+        reload=False,
+    )
@@ -0,0 +1,54 @@
+from pydantic import BaseModel
+
+from fastapi_header_versioning import HeaderVersionedAPIRouter, VersionChain
+
+chain = VersionChain(["1", "2", "3"])
+router = HeaderVersionedAPIRouter()
+
+
+class User(BaseModel):
+    first_name: str
+    last_name: str
+    tags: list[str]
+
+
+# version "2": "name" is split into "first_name" and "last_name"
+@chain.request("2")
+def split_name(body: dict) -> dict:
+    first_name, _, last_name = body.pop("name").partition(" ")
+    return {**body, "first_name": first_name, "last_name": last_name}
+
+
+@chain.response("2")
+def join_name(body: dict) -> dict:
+    return {"name": f"{body.pop('first_name')} {body.pop('last_name')}", **body}
+
+
+# version "3": required "tags" are added
+@chain.request("3", paths=["/users"])
+def add_tags(body: dict) -> dict:
+    return {**body, "tags": []}
+
+
+@chain.response("3")
+def remove_tags(body: dict) -> dict:
+    body.pop("tags", None)
+    return body
+
+
+@router.post("/users")
+@router.migrations(chain)
+async def create_user(user: User) -> User:
+    return user
+
+
+@router.get("/users/{user_id}")
+@router.migrations(chain)
+async def get_user(user_id: int) -> User:
+    return User(first_name="John", last_name=f"Doe{user_id}", tags=["admin"])
+
+
+@router.get("/status")
+@router.version("1")
+async def status():
+    return {"status": "ok"}
@@ -0,0 +1,28 @@
+import uvicorn
+
+from examples.platform_selectors.routes import android_router, router
+from fastapi_header_versioning import HeaderRoutingFastAPI, SelectorHeader
+from fastapi_header_versioning.openapi import doc_generation
+
+app = HeaderRoutingFastAPI(
+    version_header="x-version",
+    # unknown or missing platform is served as web client
+    selector_headers=[SelectorHeader("x-platform", fallback="web")],
+    title="Versioned app",
+)
+app.include_router(router)
+app.include_router(android_router)
+app = doc_generation(app)
+
+uvicorn.Config(
+    app=app,
+    proxy_headers=True,
+    access_log=False,
+)
+
+if __name__ == "__main__":
+    uvicorn.run(
+        app=app,
+        port=9999,
+        reload=False,
+    )
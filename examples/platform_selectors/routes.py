@@ -0,0 +1,42 @@
+from fastapi_header_versioning import HeaderVersionedAPIRouter
+
+router = HeaderVersionedAPIRouter()
+
+
+@router.get("/greeting")
+@router.version("1")
+async def greeting():
+    return {"greeting": "Hi!"}
+
+
+@router.get("/greeting")
+@router.version("1", selectors=("ios",))
+async def ios_greeting():
+    return {"greeting": "Hi from iOS!"}
+
+
+@router.get("/greeting")
+@router.version("1", selectors=("web",))
+async def web_greeting():
+    return {"greeting": "Hi from web!"}
+
+
+@router.get("/greeting")
+@router.version("2")
+async def greeting_v2():
+    return {"greeting": "Hi! v2"}
+
+
+@router.get("/greeting")
+@router.version("2", selectors=("android",))
+async def android_greeting_v2():
+    return {"greeting": "Hi from Android! v2"}
+
+
+android_router = HeaderVersionedAPIRouter(default_version="2")
+
+
+@android_router.get("/widgets")
+@android_router.selectors("android")
+async def android_widgets():
+    return {"widgets": ["android"]}
@@ -1,8 +1,30 @@
+from .dependencies import get_api_version, get_version_resolution, version_cached
+from .dispatch import APIVersion, SelectorHeader, VersionResolution
 from .fastapi import HeaderRoutingFastAPI
+from .migrations import VersionChain
 from .routing import HeaderVersionedAPIRoute, HeaderVersionedAPIRouter
+from .serialization import FastSerializationAPIRoute, TrustedSerializationAPIRoute
+from .shadow import ShadowTraffic
+from .shedding import LoadShedder
+from .sources import HeaderVersionSource, MediaTypeVersionSource, PathVersionSource, QueryVersionSource
 
 __all__ = [
+    "APIVersion",
+    "FastSerializationAPIRoute",
     "HeaderRoutingFastAPI",
+    "HeaderVersionSource",
     "HeaderVersionedAPIRoute",
     "HeaderVersionedAPIRouter",
+    "LoadShedder",
+    "MediaTypeVersionSource",
+    "PathVersionSource",
+    "QueryVersionSource",
+    "SelectorHeader",
+    "ShadowTraffic",
+    "TrustedSerializationAPIRoute",
+    "VersionChain",
+    "VersionResolution",
+    "get_api_version",
+    "get_version_resolution",
+    "version_cached",
 ]
@@ -0,0 +1,134 @@
+import logging
+from collections.abc import Sequence
+from dataclasses import dataclass
+from enum import Enum
+from itertools import product
+
+from starlette.routing import BaseRoute, Route
+
+from .dispatch import NAMED_GROUP
+from .lazy import LazyVersionedRoute
+from .routing import HeaderVersionedAPIRouter
+
+logger = logging.getLogger(__name__)
+
+
+class UnreachableReason(str, Enum):
+    # earlier candidate of each version the route serves has the same path template and all its methods
+    SHADOWED = "shadowed"
+    # all the versions the route serves are dispatched to mounted apps, see HeaderVersionedAPIRouter.mount_version
+    MOUNTED_VERSION = "mounted_version"
+    # request is never resolved to a version the route serves, e.g. the version is not registered
+    VERSION_NOT_RESOLVED = "version_not_resolved"
+
+
+class UnreachableRoutesError(ValueError):
+    def __init__(self, unreachable_routes: Sequence["UnreachableRoute"]) -> None:
+        self.unreachable_routes = unreachable_routes
+        super().__init__(
+            "Unreachable routes:\n" + "\n".join(unreachable.describe() for unreachable in unreachable_routes),
+        )
+
+
+def describe_route(route: BaseRoute) -> str:
+    methods = ",".join(sorted(getattr(route, "methods", None) or ()))
+    # mounts have no methods
+    description = f"{methods} {getattr(route, 'path', route)}".lstrip()
+    description += f" (version {getattr(route, 'api_version', None)}"
+    if selectors := getattr(route, "api_selectors", ()):
+        description += f", selectors {selectors}"
+    return description + ")"
+
+
+@dataclass(frozen=True)
+class UnreachableRoute:
+    route: BaseRoute
+    reason: UnreachableReason
+    shadowed_by: BaseRoute | None = None
+
+    def describe(self) -> str:
+        description = f"{describe_route(self.route)}: {self.reason.value}"
+        if self.shadowed_by is not None:
+            description += f" by {describe_route(self.shadowed_by)}"
+        return description
+
+
+def find_unreachable_routes(router: HeaderVersionedAPIRouter) -> list[UnreachableRoute]:
+    """
+    Static pass over dispatch buckets - each version a request can be resolved to with each combination of selector
+    values. Route is reachable if it's a candidate of any bucket and is not shadowed in it. Only equal path templates
+    are compared, routes other than http ones (mounts, websockets) are always reachable.
+    """
+    routing_table = router.get_routing_table()
+    selector_combinations = list(
+        product(
+            *(
+                {*values, selector_header.fallback}
+                for values, selector_header in zip(
+                    routing_table.selector_values,
+                    routing_table.selector_headers,
+                    strict=True,
+                )
+            ),
+        ),
+    )
+    reachable: set[int] = set()
+    shadowed_by: dict[int, BaseRoute] = {}
+    for version in routing_table.version_index.versions:
+        if version in router.version_apps:
+            continue
+
+        for selectors in selector_combinations:
+            # path template -> methods of earlier candidates and the first of them
+            templates: dict[str, tuple[set[str], BaseRoute]] = {}
+            for route in routing_table.candidates(version, selectors):
+                methods = getattr(route, "methods", None)
+                if not methods or not isinstance(route, Route | LazyVersionedRoute):
+                    reachable.add(id(route))
+                    continue
+
+                # templates differing only by parameter names match the same paths
+                template = NAMED_GROUP.sub("(?:", route.path_regex.pattern)
+                covered_methods, first_route = templates.setdefault(template, (set(), route))
+                if methods <= covered_methods:
+                    shadowed_by.setdefault(id(route), first_route)
+                else:
+                    reachable.add(id(route))
+                covered_methods.update(methods)
+
+    unreachable_routes = []
+    for route in routing_table.routes:
+        if id(route) in reachable:
+            continue
+
+        if id(route) in shadowed_by:
+            unreachable_routes.append(UnreachableRoute(route, UnreachableReason.SHADOWED, shadowed_by[id(route)]))
+        elif any(route.serves_version(version) for version in router.version_apps):  # type: ignore[attr-defined]
+            unreachable_routes.append(UnreachableRoute(route, UnreachableReason.MOUNTED_VERSION))
+        else:
+            unreachable_routes.append(UnreachableRoute(route, UnreachableReason.VERSION_NOT_RESOLVED))
+
+    return unreachable_routes
+
+
+def check_routes(
+    router: HeaderVersionedAPIRouter,
+    drop: bool = False,
+    strict: bool = False,
+) -> list[UnreachableRoute]:
+    """
+    Report unreachable routes, see find_unreachable_routes. 'drop' - remove them from the router, so they are not kept
+    in memory and scanned by dispatch. 'strict' - raise UnreachableRoutesError if there are any.
+    """
+    unreachable_routes = find_unreachable_routes(router)
+    if unreachable_routes and strict:
+        raise UnreachableRoutesError(unreachable_routes)
+
+    for unreachable in unreachable_routes:
+        logger.warning("Unreachable route %s", unreachable.describe())
+
+    if drop and unreachable_routes:
+        unreachable_ids = {id(unreachable.route) for unreachable in unreachable_routes}
+        router.routes = [route for route in router.routes if id(route) not in unreachable_ids]
+
+    return unreachable_routes
@@ -0,0 +1,241 @@
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from starlette.types import ASGIApp
+
+from .fastapi import HeaderRoutingFastAPI
+from .routing import HeaderVersionedAPIRouter
+from .synthetic import SyntheticRequest, dispatch
+
+METRICS = ("build_seconds", "dispatch_seconds", "allocated_bytes_per_request")
+# time is machine dependent, it's compared after scaling by calibration workload timing
+TIME_METRICS = ("build_seconds", "dispatch_seconds")
+DEFAULT_TOLERANCE = {"build_seconds": 0.5, "dispatch_seconds": 0.5, "allocated_bytes_per_request": 0.25}
+
+
+@dataclass(frozen=True)
+class BudgetRequest(SyntheticRequest):
+    # expected response status
+    status_code: int = 200
+
+
+@dataclass(frozen=True)
+class BudgetScenario:
+    name: str
+    build_app: Callable[[], ASGIApp]
+    requests: Sequence[BudgetRequest]
+
+
+@dataclass
+class ScenarioMeasurement:
+    build_seconds: float
+    # per request
+    dispatch_seconds: float
+    # peak of memory allocated while a request is handled. Inflated under tracer (e.g. coverage), it keeps frames
+    # alive - budgets are checked without one
+    allocated_bytes_per_request: int
+
+
+@contextmanager
+def gc_disabled() -> Iterator[None]:
+    enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def calibrate(rounds: int = 5) -> float:
+    """Timing of a fixed pure Python workload, budgets are scaled by it to compare results of different machines"""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        total = 0
+        for number in range(200_000):
+            total += number % 7
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def measure_scenario(
+    scenario: BudgetScenario,
+    build_rounds: int = 3,
+    dispatch_rounds: int = 5,
+    requests_per_round: int = 50,
+) -> ScenarioMeasurement:
+    """
+    Minimal time of several rounds is taken, garbage collection is disabled while timing. Requests are checked for the
+    expected status first, which also warms up lazily built parts of the app.
+    """
+    build_timings = []
+    for _ in range(build_rounds):
+        with gc_disabled():
+            started = time.perf_counter()
+            app = scenario.build_app()
+            build_timings.append(time.perf_counter() - started)
+
+    for request in scenario.requests:
+        status_code = await dispatch(app, request)
+        if status_code != request.status_code:
+            raise AssertionError(
+                f"Scenario {scenario.name}: {request.method} {request.path} responded with {status_code}, "
+                f"expected {request.status_code}",
+            )
+
+    dispatch_timings = []
+    for _ in range(dispatch_rounds):
+        with gc_disabled():
+            started = time.perf_counter()
+            for _ in range(requests_per_round):
+                for request in scenario.requests:
+                    await dispatch(app, request)
+            dispatch_timings.append(
+                (time.perf_counter() - started) / (requests_per_round * len(scenario.requests)),
+            )
+
+    return ScenarioMeasurement(
+        build_seconds=min(build_timings),
+        dispatch_seconds=min(dispatch_timings),
+        allocated_bytes_per_request=await measure_allocations(app, scenario.requests),
+    )
+
+
+async def measure_allocations(app: ASGIApp, requests: Sequence[BudgetRequest]) -> int:
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    allocations = []
+    try:
+        for request in requests:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await dispatch(app, request)
+            allocations.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return int(statistics.median(allocations))
+
+
+@dataclass
+class BudgetViolation:
+    scenario: str
+    metric: str
+    budget: float
+    limit: float
+    measured: float
+
+    @property
+    def change(self) -> float:
+        return self.measured / self.budget - 1 if self.budget else float("inf")
+
+
+def format_violations(violations: Sequence[BudgetViolation]) -> str:
+    lines = [f"{'scenario':<34} {'metric':<28} {'budget':>14} {'limit':>14} {'measured':>14} {'change':>8}"]
+    for violation in violations:
+        lines.append(
+            f"{violation.scenario:<34} {violation.metric:<28} {violation.budget:>14.6g} {violation.limit:>14.6g} "
+            f"{violation.measured:>14.6g} {violation.change:>+8.1%}",
+        )
+    return "\n".join(lines)
+
+
+@dataclass
+class PerformanceBudget:
+    """
+    Committed budget file - measurements of scenarios, calibration timing of the machine they were taken on and
+    relative tolerance per metric. Time budgets are scaled by calibration ratio of current and recorded machine.
+    """
+
+    path: Path
+    calibration_seconds: float | None = None
+    tolerance: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_TOLERANCE))
+    scenarios: dict[str, dict[str, float]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "PerformanceBudget":
+        path = Path(path)
+        if not path.exists():
+            return cls(path=path)
+
+        data = json.loads(path.read_text())
+        return cls(
+            path=path,
+            calibration_seconds=data.get("calibration_seconds"),
+            tolerance={**DEFAULT_TOLERANCE, **data.get("tolerance", {})},
+            scenarios=data.get("scenarios", {}),
+        )
+
+    def check(
+        self,
+        scenario: str,
+        measurement: ScenarioMeasurement,
+        calibration_seconds: float,
+    ) -> list[BudgetViolation]:
+        budget = self.scenarios.get(scenario)
+        if budget is None:
+            raise LookupError(
+                f"No budget for scenario {scenario} in {self.path}, record it with --update-performance-budget",
+            )
+
+        speed_ratio = calibration_seconds / self.calibration_seconds if self.calibration_seconds else 1.0
+        violations = []
+        for metric in METRICS:
+            measured = getattr(measurement, metric)
+            # never recorded, e.g. metric added after the budget file
+            if metric not in budget:
+                continue
+
+            budget_value = budget[metric] * speed_ratio if metric in TIME_METRICS else budget[metric]
+            limit = budget_value * (1 + self.tolerance[metric])
+            if measured > limit:
+                violations.append(BudgetViolation(scenario, metric, budget_value, limit, measured))
+
+        return violations
+
+    def record(self, scenario: str, measurement: ScenarioMeasurement, calibration_seconds: float) -> None:
+        speed_ratio = self.calibration_seconds / calibration_seconds if self.calibration_seconds else 1.0
+        if self.calibration_seconds is None:
+            self.calibration_seconds = calibration_seconds
+        # stored relative to the recorded calibration, so budgets of one file stay comparable
+        budget = self.scenarios.setdefault(scenario, {})
+        for metric in METRICS:
+            measured = getattr(measurement, metric)
+            budget[metric] = measured * speed_ratio if metric in TIME_METRICS else measured
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "calibration_seconds": self.calibration_seconds,
+            "tolerance": self.tolerance,
+            "scenarios": dict(sorted(self.scenarios.items())),
+        }
+
+    def save(self) -> None:
+        self.path.write_text(json.dumps(self.as_dict(), indent=2) + "\n")
+
+
+def synthetic_app(versions: int = 10, routes_per_version: int = 20) -> HeaderRoutingFastAPI:
+    """Large app with the same set of routes declared for every version"""
+    router = HeaderVersionedAPIRouter()
+    for version in range(1, versions + 1):
+        for route_number in range(routes_per_version):
+
+            @router.get(f"/resource{route_number}/{{item_id}}", name=f"get_{route_number}_{version}")
+            @router.version(str(version))
+            async def get_item(item_id: int) -> dict[str, int]:
+                return {"item_id": item_id}
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    return app
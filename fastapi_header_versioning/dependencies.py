@@ -0,0 +1,95 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Generic, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+
+from .dispatch import APIVersion, VersionResolution
+
+_T = TypeVar("_T")
+
+VersionFactory = Callable[[APIVersion | None], _T | Awaitable[_T]]
+
+
+def get_api_version(connection: HTTPConnection) -> APIVersion | None:
+    """
+    Version resolved by the router (after fallback), None for requests without version. Read from the scope as is - no
+    header parameter is validated or added to the docs.
+    """
+    return connection.scope.get("api_version")
+
+
+def get_version_resolution(connection: HTTPConnection) -> VersionResolution | None:
+    """Resolved version along with the value sent by the client, None if the request reached no versioned router"""
+    return connection.scope.get("version_resolution")
+
+
+class VersionCachedDependency(Generic[_T]):
+    """
+    Dependency memoized per resolved version across requests. Factory is called with resolved APIVersion once per
+    version (and once more after 'ttl' seconds, if set). Concurrent requests of the same version wait for a single
+    factory call, failures are not cached. Sync factories are called in threadpool, as FastAPI does with dependencies.
+    """
+
+    def __init__(self, factory: VersionFactory, ttl: float | None = None) -> None:
+        self.factory = factory
+        self.ttl = ttl
+        self.is_coroutine = asyncio.iscoroutinefunction(factory)
+        self._values: dict[APIVersion | None, tuple[Any, float | None]] = {}
+        self._pending: dict[APIVersion | None, asyncio.Future] = {}
+
+    async def __call__(self, connection: HTTPConnection) -> _T:
+        version = connection.scope.get("api_version")
+        cached = self._values.get(version)
+        if cached is not None and (cached[1] is None or cached[1] > time.monotonic()):
+            return cached[0]
+
+        pending = self._pending.get(version)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = self._pending[version] = asyncio.get_running_loop().create_future()
+        try:
+            if self.is_coroutine:
+                value = await self.factory(version)  # pyright: ignore[reportGeneralTypeIssues]
+            else:
+                value = await run_in_threadpool(self.factory, version)
+        except Exception as exc:
+            pending.set_exception(exc)
+            # waiters get the exception, the future itself must not warn about being never retrieved
+            pending.exception()
+            raise
+        else:
+            self._values[version] = (value, None if self.ttl is None else time.monotonic() + self.ttl)
+            pending.set_result(value)
+            return value
+        finally:
+            del self._pending[version]
+            # e.g. the first request was cancelled - waiters are cancelled as well
+            if not pending.done():
+                pending.cancel()
+
+    def invalidate(self, version: APIVersion | str | None = None) -> None:
+        """Drop cached value of the version, or of all the versions if no version is given"""
+        if version is None:
+            self._values.clear()
+        else:
+            self._values.pop(version, None)  # pyright: ignore[reportGeneralTypeIssues]
+
+
+def version_cached(ttl: float | None = None) -> Callable[[VersionFactory], VersionCachedDependency]:
+    """
+    Decorate a factory of version specific, effectively static object to use it with Depends:
+
+        @version_cached(ttl=60)
+        def get_feature_matrix(version: APIVersion | None) -> FeatureMatrix: ...
+
+        async def handler(features: FeatureMatrix = Depends(get_feature_matrix)): ...
+    """
+
+    def decorator(factory: VersionFactory) -> VersionCachedDependency:
+        return VersionCachedDependency(factory, ttl=ttl)
+
+    return decorator
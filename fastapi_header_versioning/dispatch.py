@@ -0,0 +1,260 @@
+import re
+from bisect import bisect_left
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import cache, total_ordering
+from itertools import product
+from typing import Any
+from weakref import WeakValueDictionary
+
+from starlette.routing import BaseRoute, Route
+from starlette.types import ASGIApp
+
+from .lazy import LazyVersionedRoute
+
+NAMED_GROUP = re.compile(r"\(\?P<[^>]+>")
+
+
+class VersionNotFoundError(LookupError):
+    pass
+
+
+@total_ordering
+@dataclass(frozen=True, eq=False)
+class APIVersion:
+    """
+    Version resolved by the router, interned - there is a single object per registered version. Ordering is the same as
+    the router uses for fallback (string comparison), 'parts' are parsed for handlers logic, e.g. "2.10.1" - (2, 10, 1).
+    """
+
+    value: str
+    parts: tuple[int | str, ...]
+
+    @classmethod
+    def parse(cls, value: str) -> "APIVersion":
+        return cls(value, tuple(int(part) if part.isdigit() else part for part in value.split(".")))
+
+    def __str__(self) -> str:
+        return self.value
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, APIVersion):
+            return self.value == other.value
+        return self.value == other
+
+    def __lt__(self, other: "APIVersion | str") -> bool:
+        return self.value < (other.value if isinstance(other, APIVersion) else other)
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+
+@cache
+def interned_api_version(value: str) -> APIVersion:
+    return APIVersion.parse(value)
+
+
+@dataclass(frozen=True)
+class SelectorHeader:
+    """
+    Additional dispatch dimension. Requested value which is not used by any route (or missing header) is replaced with
+    'fallback' - None means only routes not bound to this selector are used.
+    """
+
+    header: str
+    fallback: str | None = None
+
+
+class ResolutionKind(str, Enum):
+    FULL = "full"
+    # there are routes for the path, but not for this method - 405
+    PARTIAL = "partial"
+    REDIRECT = "redirect"
+    NOT_FOUND = "not_found"
+    VERSION_NOT_FOUND = "version_not_found"
+    # resolved version is served by a whole ASGI app, see HeaderVersionedAPIRouter.mount_version
+    APP = "app"
+
+
+@dataclass
+class RouteResolution:
+    kind: ResolutionKind
+    version: str | None = None
+    route: BaseRoute | None = None
+    child_scope: dict[str, Any] | None = None
+    redirect_url: str | None = None
+    allowed_methods: frozenset[str] | None = None
+    app: ASGIApp | None = None
+
+
+def as_selector_header(selector: "SelectorHeader | str") -> SelectorHeader:
+    if isinstance(selector, SelectorHeader):
+        return selector
+    return SelectorHeader(header=selector)
+
+
+class VersionIndex:
+    def __init__(self, versions: Iterable[str | None]) -> None:
+        self.versions = frozenset(versions)
+        self._sorted_versions = sorted(version for version in self.versions if version is not None)
+        self.api_versions = {version: interned_api_version(version) for version in self._sorted_versions}
+
+    def resolve(self, requested_version: str | None) -> str | None:
+        if requested_version is None or requested_version in self.versions:
+            return requested_version
+
+        # closest registered version which is lower than requested one
+        position = bisect_left(self._sorted_versions, requested_version)
+        if position == 0:
+            raise VersionNotFoundError(requested_version)
+
+        return self._sorted_versions[position - 1]
+
+
+_version_indexes: WeakValueDictionary[frozenset[str | None], VersionIndex] = WeakValueDictionary()
+
+
+def shared_version_index(versions: Iterable[str | None]) -> VersionIndex:
+    """Routers with the same registered versions share the index, see VersionResolution"""
+    versions = frozenset(versions)
+    version_index = _version_indexes.get(versions)
+    if version_index is None:
+        version_index = _version_indexes[versions] = VersionIndex(versions)
+    return version_index
+
+
+@dataclass(frozen=True)
+class VersionResolution:
+    """
+    Recorded to scope["version_resolution"] by the first versioned router handling the request. Routers reached through
+    mounts or nested apps reuse it if they share the version index, others resolve the original value again.
+    """
+
+    # value sent by the client
+    requested_version: str | None
+    version: str | None
+    api_version: APIVersion | None
+    version_index: VersionIndex = field(repr=False, compare=False)
+    router: Any = field(repr=False, compare=False)
+
+
+def route_selectors(route: BaseRoute) -> tuple[str | None, ...]:
+    return getattr(route, "api_selectors", ())
+
+
+class AllowedMethods:
+    """
+    Methods allowed for each path template of the candidates bucket. Templates are compiled into a single alternation,
+    in candidates order, so the first template matching the path wins - same as with sequential matching.
+    """
+
+    def __init__(self, routes: Sequence[BaseRoute]) -> None:
+        templates: dict[str, set[str]] = {}
+        for route in routes:
+            # lazy routes are not starlette routes, but have the same attributes
+            methods = getattr(route, "methods", None)
+            if methods and isinstance(route, Route | LazyVersionedRoute):
+                templates.setdefault(route.path_regex.pattern, set()).update(methods)
+
+        self.allowed_methods = [frozenset(methods) for methods in templates.values()]
+        # named groups of path parameters are not needed, only index of matched template
+        alternatives = (
+            f"(?P<_{position}>{NAMED_GROUP.sub('(?:', pattern.removeprefix('^').removesuffix('$'))})"
+            for position, pattern in enumerate(templates)
+        )
+        self.regex = re.compile("|".join(alternatives)) if templates else None
+
+    def lookup(self, path: str) -> frozenset[str] | None:
+        match = self.regex.fullmatch(path) if self.regex is not None else None
+        if match is None:
+            return None
+
+        return self.allowed_methods[int(match.lastgroup[1:])]  # pyright: ignore[reportOptionalSubscript]
+
+
+class RoutingTable:
+    """
+    Precompiled dispatch structures of HeaderVersionedAPIRouter. Candidate routes are narrowed down by composite key -
+    resolved version and resolved selector values - and computed once per key.
+    """
+
+    def __init__(
+        self,
+        routes: Sequence[BaseRoute],
+        registered_versions: Iterable[str | None],
+        selector_headers: Sequence[SelectorHeader] = (),
+    ) -> None:
+        self.routes = tuple(routes)
+        self.version_index = shared_version_index(registered_versions)
+        self.selector_headers = tuple(selector_headers)
+        selector_values: list[set[str]] = [set() for _ in self.selector_headers]
+        for route in self.routes:
+            for dimension, value in enumerate(route_selectors(route)[: len(selector_values)]):
+                if value is not None:
+                    selector_values[dimension].add(value)
+        self.selector_values = tuple(frozenset(values) for values in selector_values)
+        self._candidates: dict[tuple[str | None, tuple[str | None, ...]], tuple[BaseRoute, ...]] = {}
+        self._allowed_methods: dict[tuple[str | None, tuple[str | None, ...]], AllowedMethods] = {}
+
+    def resolve_selectors(self, requested_selectors: Sequence[str | None]) -> tuple[str | None, ...]:
+        resolved = []
+        for dimension, selector_header in enumerate(self.selector_headers):
+            value = requested_selectors[dimension] if dimension < len(requested_selectors) else None
+            if value not in self.selector_values[dimension]:
+                value = selector_header.fallback
+            resolved.append(value)
+
+        return tuple(resolved)
+
+    def candidates(self, version: str | None, selectors: tuple[str | None, ...] = ()) -> tuple[BaseRoute, ...]:
+        key = (version, selectors)
+        candidates = self._candidates.get(key)
+        if candidates is None:
+            candidates = self._candidates[key] = self._build_candidates(version, selectors)
+
+        return candidates
+
+    def allowed_methods(self, version: str | None, selectors: tuple[str | None, ...] = ()) -> AllowedMethods:
+        key = (version, selectors)
+        allowed_methods = self._allowed_methods.get(key)
+        if allowed_methods is None:
+            allowed_methods = self._allowed_methods[key] = AllowedMethods(self.candidates(version, selectors))
+
+        return allowed_methods
+
+    def warm(self) -> None:
+        """
+        Precompute candidates and allowed methods for each registered version and each combination of registered
+        selector values
+        """
+        selector_combinations = product(
+            *(
+                {*values, selector_header.fallback}
+                for values, selector_header in zip(self.selector_values, self.selector_headers, strict=True)
+            ),
+        )
+        for selectors in list(selector_combinations):
+            for version in self.version_index.versions:
+                self.allowed_methods(version, selectors)
+
+    def _build_candidates(self, version: str | None, selectors: tuple[str | None, ...]) -> tuple[BaseRoute, ...]:
+        candidates: list[tuple[int, BaseRoute]] = []
+        for route in self.routes:
+            serves_version = getattr(route, "serves_version", None)
+            if serves_version is not None and not serves_version(version):
+                continue
+
+            specificity = 0
+            for dimension, value in enumerate(route_selectors(route)):
+                if value is None:
+                    continue
+                if dimension >= len(selectors) or value != selectors[dimension]:
+                    break
+                specificity += 1
+            else:
+                candidates.append((specificity, route))
+
+        # routes bound to more selectors win over generic ones, otherwise declaration order is kept
+        candidates.sort(key=lambda candidate: -candidate[0])
+        return tuple(route for _, route in candidates)
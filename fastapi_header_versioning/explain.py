@@ -0,0 +1,158 @@
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from fastapi import params
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.routing import BaseRoute, Match
+from starlette.types import Scope
+
+from .analysis import describe_route
+from .fastapi import HeaderRoutingFastAPI
+from .sources import VersionExtractor
+from .synthetic import SyntheticRequest
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .routing import HeaderVersionedAPIRouter
+
+
+@dataclass(frozen=True)
+class CandidateMatch:
+    route: str
+    # full, partial or none
+    match: str
+    seconds: float
+    # examined with trailing slash added or removed, after nothing matched the path as is
+    redirect: bool = False
+
+
+class RoutingTracer:
+    """Records what HeaderVersionedAPIRouter.resolve examines, see explain_routing"""
+
+    def __init__(self) -> None:
+        self.selectors: tuple[str | None, ...] = ()
+        # routes of resolved version and selectors, only the ones before the matching route are examined
+        self.candidates_count = 0
+        self.examined: list[CandidateMatch] = []
+
+    def candidates(self, selectors: tuple[str | None, ...], candidates: Sequence[BaseRoute]) -> None:
+        self.selectors = selectors
+        self.candidates_count = len(candidates)
+
+    def matches(self, route: BaseRoute, scope: Scope, redirect: bool = False) -> tuple[Match, Scope]:
+        started = time.perf_counter()
+        match, child_scope = route.matches(scope)
+        seconds = time.perf_counter() - started
+        self.examined.append(CandidateMatch(describe_route(route), match.name.lower(), seconds, redirect))
+        return match, child_scope
+
+
+@dataclass
+class RoutingExplanation:
+    method: str
+    path: str
+    # path the router matched, version path segment is stripped by PathVersionSource
+    routed_path: str
+    requested_version: str | None
+    version_source: str | None
+    # None if requested version is not found, see 'kind'
+    version: str | None
+    fallback: bool
+    requested_selectors: tuple[str | None, ...]
+    selectors: tuple[str | None, ...]
+    # see ResolutionKind
+    kind: str
+    candidates_count: int
+    candidates: list[CandidateMatch] = field(default_factory=list)
+    route: str | None = None
+    allowed_methods: list[str] | None = None
+    redirect_url: str | None = None
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def explain_routing(
+    app: HeaderRoutingFastAPI,
+    method: str,
+    path: str,
+    headers: Iterable[tuple[str, str]] = (),
+) -> RoutingExplanation:
+    """
+    Resolve the request the way the app would, without handling it: version is extracted by the app version sources
+    and the route is picked by the serving routing table. Only the top level router is explained - requests of mounted
+    apps and versions are not followed.
+    """
+    router: HeaderVersionedAPIRouter = app.router  # pyright: ignore[reportGeneralTypeIssues]
+    scope = SyntheticRequest(method.upper(), path, headers=tuple(headers)).scope()
+    extract_version = VersionExtractor(
+        app.version_sources,
+        [selector_header.header for selector_header in router.selector_headers],
+    )
+    extract_version(scope)
+    requested_version = scope["requested_version"]
+
+    tracer = RoutingTracer()
+    started = time.perf_counter()
+    resolution = router.resolve(scope, tracer)
+    seconds = time.perf_counter() - started
+
+    version_resolution = scope.get("version_resolution")
+    version = version_resolution.version if version_resolution is not None else None
+    return RoutingExplanation(
+        method=scope["method"],
+        path=path,
+        routed_path=scope["path"],
+        requested_version=requested_version,
+        version_source=scope["version_source"],
+        version=version,
+        fallback=version_resolution is not None and version != requested_version,
+        requested_selectors=scope["requested_selectors"],
+        selectors=tracer.selectors,
+        kind=resolution.kind.value,
+        candidates_count=tracer.candidates_count,
+        candidates=tracer.examined,
+        route=describe_route(resolution.route) if resolution.route is not None else None,
+        allowed_methods=sorted(resolution.allowed_methods) if resolution.allowed_methods is not None else None,
+        redirect_url=resolution.redirect_url,
+        seconds=seconds,
+    )
+
+
+class ExplainRequest(BaseModel):
+    method: str = "GET"
+    path: str
+    headers: dict[str, str] = {}
+
+
+def enable_routing_explain(
+    app: HeaderRoutingFastAPI,
+    *,
+    dependencies: Sequence[params.Depends],
+    path: str = "/_routing/explain",
+) -> None:
+    """
+    Add diagnostic endpoint served in any version: POST {"method": ..., "path": ..., "headers": {...}} returns
+    explain_routing result. It discloses routes of all the versions, so access control 'dependencies' are required,
+    e.g. [Depends(verify_admin_token)].
+    """
+    if not dependencies:
+        raise ValueError("Routing explain endpoint requires access control dependencies")
+
+    async def explain(request: ExplainRequest) -> dict[str, Any]:
+        return explain_routing(app, request.method, request.path, request.headers.items()).as_dict()
+
+    app.router.routes.append(
+        APIRoute(
+            path,
+            explain,
+            methods=["POST"],
+            dependencies=dependencies,
+            include_in_schema=False,
+            dependency_overrides_provider=app,
+            name="explain_routing",
+        ),
+    )
@@ -1,4 +1,4 @@
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Iterable, Sequence
 from typing import Any, Optional, Union
 
 from fastapi import Depends, FastAPI
@@ -8,19 +8,30 @@ from fastapi.routing import APIRoute
 from fastapi.utils import generate_unique_id
 from starlette.responses import JSONResponse, Response
 from starlette.routing import BaseRoute
-from starlette.types import Lifespan, Receive, Scope, Send
+from starlette.types import ASGIApp, Lifespan, Receive, Scope, Send
 
+from .analysis import UnreachableRoute, check_routes
+from .dispatch import RoutingTable, SelectorHeader, as_selector_header
+from .lazy import MaterializedRoutesPool
+from .memory import MemoryReport, measure_versions_memory
 from .routing import HeaderVersionedAPIRouter
+from .shadow import ShadowTraffic
+from .shedding import LoadShedder
+from .sources import HeaderVersionSource, VersionExtractor, VersionSource
 
 
 class CustomHeaderVersionMiddleware:
     def __init__(
         self,
         app: FastAPI,
-        version_header: str,
+        version_header: str | None = None,
+        selector_headers: Sequence[str] = (),
+        version_sources: Sequence[VersionSource] | None = None,
     ) -> None:
         self.app = app
-        self.version_header = version_header.encode()
+        if version_sources is None:
+            version_sources = [HeaderVersionSource(version_header)] if version_header else []
+        self.extract_version = VersionExtractor(version_sources, selector_headers)
 
     async def __call__(
         self,
@@ -29,10 +40,7 @@ class CustomHeaderVersionMiddleware:
         send: Send,
     ) -> None:
         if scope["type"] in ("http", "websocket"):
-            headers: dict[bytes, bytes] = dict(scope["headers"])
-            scope["requested_version"] = None
-            if self.version_header in headers:
-                scope["requested_version"] = headers[self.version_header].decode()
+            self.extract_version(scope)
 
         return await self.app(scope, receive, send)
 
@@ -40,7 +48,7 @@ class CustomHeaderVersionMiddleware:
 class HeaderRoutingFastAPI(FastAPI):
     def __init__(
         self,
-        version_header: str,
+        version_header: str | None = None,
         routes: Optional[list[BaseRoute]] = None,
         dependencies: Optional[Sequence[Depends]] = None,
         default_response_class: type[Response] = Default(JSONResponse),
@@ -55,8 +63,30 @@ class HeaderRoutingFastAPI(FastAPI):
             generate_unique_id,
         ),
         *args: Any,
+        selector_headers: Sequence[SelectorHeader | str] = (),
+        version_sources: Sequence[VersionSource] | None = None,
+        shadow_traffic: ShadowTraffic | None = None,
+        routes_pool: MaterializedRoutesPool | None = None,
+        load_shedder: LoadShedder | None = None,
         **kwargs: Any,
     ):
+        """
+        'selector_headers' - additional headers used for dispatch along with version header, e.g. client platform.
+        Routes are bound to selector values with HeaderVersionedAPIRouter.version(..., selectors=...) decorator.
+
+        'version_sources' - ordered list of places to read requested version from, replaces 'version_header'. The first
+        source which provided a value wins, it's stored in scope as "version_source".
+
+        'shadow_traffic' - mirror sampled requests to the candidate version and compare latency, see ShadowTraffic.
+
+        'routes_pool' - cap number of materialized versions or routes, see MaterializedRoutesPool.
+
+        'load_shedder' - shed traffic of deprecated versions under overload, see LoadShedder.
+        """
+        if not version_header and not version_sources:
+            raise ValueError("At least one version source is required, pass 'version_header' or 'version_sources'")
+
+        selector_headers = [as_selector_header(selector_header) for selector_header in selector_headers]
         super().__init__(
             *args,
             routes=routes,
@@ -85,8 +115,36 @@ class HeaderRoutingFastAPI(FastAPI):
             include_in_schema=include_in_schema,
             responses=responses,
             generate_unique_id_function=generate_unique_id_function,
+            selector_headers=selector_headers,
+            shadow_traffic=shadow_traffic,
+            routes_pool=routes_pool,
+            load_shedder=load_shedder,
         )
+        if version_sources is not None:
+            self.version_sources: tuple[VersionSource, ...] = tuple(version_sources)
+        else:
+            self.version_sources = (HeaderVersionSource(version_header),) if version_header else ()
         self.add_middleware(
             CustomHeaderVersionMiddleware,
             version_header=version_header,
+            selector_headers=[selector_header.header for selector_header in selector_headers],
+            version_sources=version_sources,
         )
+
+    def mount_version(self, versions: Iterable[str], app: ASGIApp) -> None:
+        """Serve whole versions by another ASGI app, see HeaderVersionedAPIRouter.mount_version"""
+        self.router.mount_version(versions, app)  # pyright: ignore[reportGeneralTypeIssues]
+
+    def swap_routing(self, routing_table: RoutingTable) -> RoutingTable | None:
+        """Atomically start serving routing snapshot, see HeaderVersionedAPIRouter.swap and build_routing_snapshot"""
+        previous_routing_table = self.router.swap(routing_table)  # pyright: ignore[reportGeneralTypeIssues]
+        self.openapi_schema = None
+        return previous_routing_table
+
+    def check_routes(self, drop: bool = False, strict: bool = False) -> list[UnreachableRoute]:
+        """Report shadowed and unreachable routes, optionally drop them or fail, see analysis.check_routes"""
+        return check_routes(self.router, drop=drop, strict=strict)  # pyright: ignore[reportGeneralTypeIssues]
+
+    def memory_report(self) -> MemoryReport:
+        """Memory retained by each version, see measure_versions_memory. Diagnostic only - walks whole routes graph"""
+        return measure_versions_memory(self)
@@ -0,0 +1,114 @@
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+from weakref import WeakValueDictionary
+
+from fastapi.dependencies.models import Dependant
+
+if TYPE_CHECKING:  # pragma: no cover
+    from fastapi.routing import APIRoute
+
+
+@dataclass
+class InterningStats:
+    lookups: int = 0
+    # objects of routes replaced by an identical one built for another route
+    shared: int = 0
+    interned: int = 0
+
+
+class InternedValue:
+    # fields have __slots__ without __weakref__, so values are held by a weakly referenced box. Routes keep the boxes,
+    # the entry is dropped once no route uses the value
+    __slots__ = ("__weakref__", "value")
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+
+class RouteInterner:
+    """
+    Registry of immutable objects built by APIRoute - response fields with their cloned models, dependant trees and
+    body fields. Versions of the same endpoint (e.g. a router included with several versions) build identical ones,
+    only the first of them is kept.
+    """
+
+    def __init__(self) -> None:
+        self._entries: WeakValueDictionary[Hashable, InternedValue] = WeakValueDictionary()
+        self._stats = InterningStats()
+
+    def intern(self, key: Hashable, value: Any, owned: list[InternedValue]) -> Any:
+        """Value registered for the key first, the box is appended to 'owned' to keep it alive"""
+        self._stats.lookups += 1
+        try:
+            entry = self._entries.get(key)
+        except TypeError:
+            # e.g. response model given as unhashable annotation
+            return value
+
+        if entry is None:
+            entry = self._entries[key] = InternedValue(value)
+        elif entry.value is not value:
+            self._stats.shared += 1
+        owned.append(entry)
+        return entry.value
+
+    def stats(self) -> InterningStats:
+        return InterningStats(**{**vars(self._stats), "interned": len(self._entries)})
+
+
+route_interner = RouteInterner()
+
+
+def dependencies_key(route: "APIRoute") -> tuple:
+    # Depends are compared by what they call, instances differ when declared per route
+    return tuple(
+        (type(depends), depends.dependency, depends.use_cache, tuple(getattr(depends, "scopes", None) or ()))
+        for depends in route.dependencies
+    )
+
+
+def intern_dependant(dependant: Dependant, key: Hashable, interner: RouteInterner, owned: list[InternedValue]) -> Any:
+    # sub-dependants are built from these arguments only, so the same dependency is shared by different endpoints too
+    dependant.dependencies = [
+        intern_dependant(
+            sub_dependant,
+            (
+                "dependant",
+                sub_dependant.call,
+                sub_dependant.name,
+                sub_dependant.path,
+                sub_dependant.use_cache,
+                tuple(sub_dependant.security_scopes or ()),
+            ),
+            interner,
+            owned,
+        )
+        for sub_dependant in dependant.dependencies
+    ]
+    return interner.intern(key, dependant, owned)
+
+
+def intern_route(route: "APIRoute", interner: RouteInterner) -> list[InternedValue]:
+    """
+    Replace objects built by the route with the interned ones. Returns boxes of the values used by the route, empty if
+    nothing was interned.
+    """
+    owned: list[InternedValue] = []
+    if route.response_field is not None:
+        key = ("response", f"Response_{route.unique_id}", route.response_model)
+        route.response_field, route.secure_cloned_response_field = interner.intern(
+            key,
+            (route.response_field, route.secure_cloned_response_field),
+            owned,
+        )
+    route.response_fields = {
+        status_code: interner.intern(("response", field.name, route.responses[status_code]["model"]), field, owned)
+        for status_code, field in route.response_fields.items()
+    }
+
+    dependant_key = ("endpoint", route.endpoint, route.path_format, dependencies_key(route))
+    route.dependant = intern_dependant(route.dependant, dependant_key, interner, owned)
+    if route.body_field is not None:
+        route.body_field = interner.intern(("body", dependant_key, route.unique_id), route.body_field, owned)
+    return owned
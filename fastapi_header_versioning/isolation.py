@@ -0,0 +1,377 @@
+"""
+Version groups served by child processes. Front HeaderRoutingFastAPI resolves version as usual and forwards ASGI
+messages of the request to a process of the version group over Unix domain socket, so each group has its own
+dependencies, memory and restarts:
+
+    isolate_versions(app, [VersionGroup("legacy", ["1", "2"], "legacy.main:app", processes=2)])
+
+Child processes host an ASGI app given by import string ("module:attribute"), they are started with the front app
+lifespan and restarted when they exit. Only http requests are forwarded. Unix domain sockets are required, so Windows
+isn't supported.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+from collections.abc import Iterable, Sequence
+from contextlib import suppress
+from dataclasses import dataclass
+from itertools import count
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any
+
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .fastapi import HeaderRoutingFastAPI
+from .mounts import MountedAppLifespan, import_app
+
+logger = logging.getLogger(__name__)
+
+# frame: length of JSON encoded message, length of raw body, message, body
+FRAME_HEADER = struct.Struct(">II")
+BODY_KEYS = ("body", "bytes")
+# scope is passed as a message - only serializable keys are forwarded
+SCOPE_KEYS = (
+    "type",
+    "asgi",
+    "http_version",
+    "method",
+    "scheme",
+    "path",
+    "raw_path",
+    "root_path",
+    "query_string",
+    "headers",
+    "client",
+    "server",
+)
+BYTES_KEYS = ("raw_path", "query_string")
+CLOSE_TIMEOUT = 5.0
+
+
+def encode_message(message: Message) -> bytes:
+    data = {key: value for key, value in message.items() if key not in BODY_KEYS}
+    body = b""
+    for key in BODY_KEYS:
+        if message.get(key) is not None:
+            data["body_key"] = key
+            body = message[key]
+    if "headers" in data:
+        data["headers"] = [[name.decode("latin-1"), value.decode("latin-1")] for name, value in data["headers"]]
+    for key in BYTES_KEYS:
+        if isinstance(data.get(key), bytes):
+            data[key] = data[key].decode("latin-1")
+
+    encoded = json.dumps(data).encode()
+    return FRAME_HEADER.pack(len(encoded), len(body)) + encoded + body
+
+
+def decode_message(encoded: bytes, body: bytes) -> Message:
+    message = json.loads(encoded)
+    body_key = message.pop("body_key", None)
+    if body_key is not None:
+        message[body_key] = body
+    if "headers" in message:
+        message["headers"] = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in message["headers"]]
+    for key in BYTES_KEYS:
+        if key in message:
+            message[key] = message[key].encode("latin-1")
+    return message
+
+
+async def read_message(reader: asyncio.StreamReader) -> Message | None:
+    """Next message of the stream, None if the other side closed connection"""
+    try:
+        message_size, body_size = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+        return decode_message(await reader.readexactly(message_size), await reader.readexactly(body_size))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+
+async def write_message(writer: asyncio.StreamWriter, message: Message) -> None:
+    writer.write(encode_message(message))
+    # backpressure - the slow side of the socket holds the producer
+    await writer.drain()
+
+
+def scope_message(scope: Scope) -> Message:
+    return {key: scope[key] for key in SCOPE_KEYS if key in scope}
+
+
+async def handle_connection(app: ASGIApp, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Child side - a connection carries a single request"""
+    # the only reader of the socket, app may wait for disconnect while reading body. Queue is bounded, so a slow app
+    # stops reading of the socket and the front waits for it
+    messages: asyncio.Queue[Message] = asyncio.Queue(maxsize=1)
+
+    async def read_messages() -> None:
+        while (message := await read_message(reader)) is not None:
+            await messages.put(message)
+            if message["type"] == "http.disconnect":
+                return
+        await messages.put({"type": "http.disconnect"})
+
+    async def receive() -> Message:
+        message = await messages.get()
+        if message["type"] == "http.disconnect":
+            # reader is done, further calls get the same message
+            messages.put_nowait(message)
+        return message
+
+    async def send(message: Message) -> None:
+        await write_message(writer, message)
+
+    messages_reader: asyncio.Task | None = None
+    try:
+        scope = await read_message(reader)
+        if scope is None:
+            return
+
+        messages_reader = asyncio.get_running_loop().create_task(read_messages())
+        await app(scope, receive, send)
+    except Exception:
+        logger.exception("Request forwarded to %r failed", app)
+    finally:
+        if messages_reader is not None:
+            messages_reader.cancel()
+            with suppress(asyncio.CancelledError):
+                await messages_reader
+        # socket closed with unread messages resets connection, and the front may lose the response - the front
+        # closes it after the response is read
+        writer.write_eof()
+        with suppress(ConnectionError, asyncio.TimeoutError):
+            await asyncio.wait_for(reader.read(), CLOSE_TIMEOUT)
+        writer.close()
+        with suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+async def serve(app: ASGIApp, socket_path: str, stop: asyncio.Event) -> None:
+    """Serve forwarded requests until 'stop' is set. Socket accepts connections only after app startup"""
+    lifespan = MountedAppLifespan(app)
+    await lifespan.startup()
+    Path(socket_path).unlink(missing_ok=True)
+    server = await asyncio.start_unix_server(
+        lambda reader, writer: handle_connection(app, reader, writer),
+        path=socket_path,
+    )
+    try:
+        await stop.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        await lifespan.shutdown()
+
+
+def run_group_process(app_path: str, socket_path: str) -> None:  # pragma: no cover - runs in child processes
+    async def main() -> None:
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        await serve(import_app(app_path), socket_path, stop)
+
+    asyncio.run(main())
+
+
+@dataclass(frozen=True)
+class VersionGroup:
+    name: str
+    versions: Sequence[str]
+    # import string of ASGI app hosting routers of the versions, e.g. "legacy.main:app"
+    app: str
+    processes: int = 1
+
+
+class ProcessGroup:
+    """
+    ASGI app forwarding requests to child processes of a version group, round-robin over live processes. Responds
+    with 503 if no process accepts connection and with 502 if process failed before response started. Processes are
+    started on lifespan startup and are checked every 'check_interval' seconds, exited ones are restarted.
+    """
+
+    def __init__(
+        self,
+        group: VersionGroup,
+        socket_dir: str | None = None,
+        startup_timeout: float = 30.0,
+        check_interval: float = 1.0,
+    ) -> None:
+        if sys.platform == "win32":
+            raise RuntimeError("Version groups are served over Unix domain sockets, which Windows doesn't support")
+
+        self.group = group
+        self.startup_timeout = startup_timeout
+        self.check_interval = check_interval
+        self._own_socket_dir = socket_dir is None
+        # own socket dir exists only between start and stop
+        self.socket_dir = socket_dir
+        self.socket_paths: list[str] = []
+        self.processes: list[BaseProcess | None] = [None] * group.processes
+        self.restarts = 0
+        self._next_socket = count()
+        self._supervisor: asyncio.Task | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.forward(scope, receive, send)
+        else:
+            await send({"type": "websocket.close", "code": 1000})
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        await receive()
+        try:
+            await self.start()
+        except Exception as exc:
+            logger.exception("Startup of version group %r failed", self.group.name)
+            await send({"type": "lifespan.startup.failed", "message": str(exc)})
+            return
+
+        await send({"type": "lifespan.startup.complete"})
+        await receive()
+        await self.stop()
+        await send({"type": "lifespan.shutdown.complete"})
+
+    async def _start_process(self, index: int) -> BaseProcess:
+        socket_path = self.socket_paths[index]
+        Path(socket_path).unlink(missing_ok=True)
+        process = multiprocessing.get_context("spawn").Process(
+            target=run_group_process,
+            args=(self.group.app, socket_path),
+            name=f"{self.group.name}-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.startup_timeout
+        while loop.time() < deadline and process.is_alive():
+            with suppress(OSError):
+                _, writer = await asyncio.open_unix_connection(socket_path)
+                writer.close()
+                return process
+            await asyncio.sleep(0.05)
+
+        raise RuntimeError(f"Process {process.name} of version group {self.group.name!r} failed to start")
+
+    def _create_socket_dir(self) -> None:
+        if self.socket_dir is None:
+            self.socket_dir = tempfile.mkdtemp(prefix="versions-")
+        self.socket_paths = [
+            str(Path(self.socket_dir, f"{self.group.name}-{index}.sock")) for index in range(self.group.processes)
+        ]
+
+    async def start(self) -> None:
+        self._create_socket_dir()
+        try:
+            await asyncio.gather(*(self._start_process(index) for index in range(self.group.processes)))
+        except Exception:
+            await self.stop()
+            raise
+        self._supervisor = asyncio.get_running_loop().create_task(self._supervise())
+
+    async def _supervise(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for index, process in enumerate(self.processes):
+                if process is None or process.is_alive():
+                    continue
+
+                logger.warning(
+                    "Process %s of version group %r exited with code %s, restarting",
+                    index,
+                    self.group.name,
+                    process.exitcode,
+                )
+                self.restarts += 1
+                try:
+                    await self._start_process(index)
+                except Exception:
+                    # retried on the next check
+                    logger.exception("Restart of process %s of version group %r failed", index, self.group.name)
+
+    async def stop(self) -> None:
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._supervisor
+            self._supervisor = None
+
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for index, process in enumerate(self.processes):
+            if process is not None:
+                await asyncio.to_thread(process.join, self.startup_timeout)
+                if process.is_alive():
+                    process.kill()
+                self.processes[index] = None
+
+        if self._own_socket_dir and self.socket_dir is not None:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+            self.socket_dir = None
+            self.socket_paths = []
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter] | None:
+        for _ in self.socket_paths:
+            socket_path = self.socket_paths[next(self._next_socket) % len(self.socket_paths)]
+            with suppress(OSError):
+                return await asyncio.open_unix_connection(socket_path)
+        return None
+
+    async def forward(self, scope: Scope, receive: Receive, send: Send) -> None:
+        connection = await self._connect()
+        if connection is None:
+            await PlainTextResponse("Service Unavailable", status_code=503)(scope, receive, send)
+            return
+
+        reader, writer = connection
+        await write_message(writer, scope_message(scope))
+        request_pump = asyncio.get_running_loop().create_task(self._forward_request(receive, writer))
+        try:
+            response_started = False
+            while (message := await read_message(reader)) is not None:
+                response_started = True
+                await send(message)
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    break
+
+            if not response_started:
+                await PlainTextResponse("Bad Gateway", status_code=502)(scope, receive, send)
+        finally:
+            request_pump.cancel()
+            with suppress(asyncio.CancelledError):
+                await request_pump
+            writer.close()
+
+    async def _forward_request(self, receive: Receive, writer: asyncio.StreamWriter) -> None:
+        with suppress(ConnectionError):
+            while True:
+                message = await receive()
+                await write_message(writer, message)
+                if message["type"] == "http.disconnect":
+                    return
+
+
+def isolate_versions(
+    app: HeaderRoutingFastAPI,
+    groups: Iterable[VersionGroup],
+    socket_dir: str | None = None,
+    **group_kwargs: Any,
+) -> list[ProcessGroup]:
+    """Serve versions of each group by its child processes, see ProcessGroup"""
+    process_groups = []
+    for group in groups:
+        process_group = ProcessGroup(group, socket_dir, **group_kwargs)
+        app.mount_version(group.versions, process_group)
+        process_groups.append(process_group)
+    return process_groups
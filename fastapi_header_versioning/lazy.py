@@ -0,0 +1,158 @@
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import URLPath
+from starlette.routing import BaseRoute, Match, NoMatchFound, compile_path, get_name, replace_params
+from starlette.types import Receive, Scope, Send
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .routing import RouteDefinition
+
+
+@dataclass
+class RoutesPoolStats:
+    builds: int = 0
+    # builds of routes which were materialized before and evicted
+    rebuilds: int = 0
+    evicted_versions: int = 0
+    evicted_routes: int = 0
+    # routes which were materialized when their lazy routes were removed from the router
+    released_routes: int = 0
+    materialized_versions: int = 0
+    materialized_routes: int = 0
+
+
+class MaterializedRoutesPool:
+    """
+    Materialized routes of the least recently used versions are evicted when there are more than 'max_versions'
+    versions or more than 'max_routes' routes materialized. Version which is being materialized is never evicted.
+    """
+
+    def __init__(self, max_versions: int | None = None, max_routes: int | None = None) -> None:
+        self.max_versions = max_versions
+        self.max_routes = max_routes
+        self._versions: OrderedDict[str, dict[int, APIRoute]] = OrderedDict()
+        self._routes_count = 0
+        self._stats = RoutesPoolStats()
+
+    def materialize(self, lazy_route: "LazyVersionedRoute") -> APIRoute:
+        version = lazy_route.api_version
+        version_routes = self._versions.get(version)
+        if version_routes is None:
+            version_routes = self._versions[version] = {}
+        else:
+            self._versions.move_to_end(version)
+
+        route = version_routes.get(id(lazy_route))
+        if route is None:
+            route = version_routes[id(lazy_route)] = lazy_route.build()
+            self._routes_count += 1
+            self._stats.builds += 1
+            lazy_route.materializations += 1
+            if lazy_route.materializations > 1:
+                self._stats.rebuilds += 1
+            self._evict()
+
+        return route
+
+    def _evict(self) -> None:
+        while len(self._versions) > 1 and (
+            (self.max_versions is not None and len(self._versions) > self.max_versions)
+            or (self.max_routes is not None and self._routes_count > self.max_routes)
+        ):
+            _, evicted_routes = self._versions.popitem(last=False)
+            self._routes_count -= len(evicted_routes)
+            self._stats.evicted_versions += 1
+            self._stats.evicted_routes += len(evicted_routes)
+
+    def release(self, lazy_routes: Iterable["LazyVersionedRoute"]) -> None:
+        """Drop materialized routes of lazy routes which aren't served anymore, e.g. retired by a routing swap"""
+        for lazy_route in lazy_routes:
+            version_routes = self._versions.get(lazy_route.api_version)
+            if version_routes is None or version_routes.pop(id(lazy_route), None) is None:
+                continue
+
+            self._routes_count -= 1
+            self._stats.released_routes += 1
+            if not version_routes:
+                del self._versions[lazy_route.api_version]
+
+    def stats(self) -> RoutesPoolStats:
+        return RoutesPoolStats(
+            **{
+                **vars(self._stats),
+                "materialized_versions": len(self._versions),
+                "materialized_routes": self._routes_count,
+            },
+        )
+
+
+class LazyVersionedRoute(BaseRoute):
+    """
+    Definition of versioned API route which is matched by path and methods only. Real route is materialized by the
+    pool when request is handled.
+    """
+
+    def __init__(self, definition: "RouteDefinition", pool: MaterializedRoutesPool, router: Any) -> None:
+        self.definition = definition
+        self.pool = pool
+        self.router = router
+        self.path = definition.path
+        self.endpoint = definition.endpoint
+        name = definition.kwargs.get("name")
+        self.name = get_name(definition.endpoint) if name is None else name
+        methods = definition.kwargs.get("methods") or ["GET"]
+        self.methods = {method.upper() for method in methods}
+        self.path_regex, self.path_format, self.param_convertors = compile_path(self.path)
+        route_class = definition.route_class
+        self.api_version: str = route_class.api_version  # pyright: ignore[reportGeneralTypeIssues]
+        self.api_selectors = getattr(route_class, "api_selectors", ())
+        self.api_migrations = getattr(route_class, "api_migrations", None)
+        self.materializations = 0
+
+    def serves_version(self, version: str | None) -> bool:
+        return self.definition.route_class.serves_version(self, version)  # pyright: ignore[reportGeneralTypeIssues]
+
+    def build(self) -> APIRoute:
+        return self.definition.route_class(
+            self.definition.path,
+            self.definition.endpoint,
+            dependency_overrides_provider=self.router.dependency_overrides_provider,
+            **self.definition.kwargs,
+        )
+
+    def matches(self, scope: Scope) -> tuple[Match, Scope]:
+        # same as Route.matches followed by HeaderVersionedAPIRoute version check
+        if scope["type"] != "http":
+            return Match.NONE, {}
+
+        match = self.path_regex.match(scope["path"])
+        if match is None:
+            return Match.NONE, {}
+
+        path_params = dict(scope.get("path_params", {}))
+        for key, value in match.groupdict().items():
+            path_params[key] = self.param_convertors[key].convert(value)
+        child_scope = {"endpoint": self.endpoint, "path_params": path_params}
+
+        if scope["method"] not in self.methods:
+            return Match.PARTIAL, child_scope
+
+        if self.serves_version(scope["requested_version"]):
+            return Match.FULL, child_scope
+
+        return Match.NONE, child_scope
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.pool.materialize(self).handle(scope, receive, send)
+
+    def url_path_for(self, name: str, /, **path_params: Any) -> URLPath:
+        # same as Route.url_path_for, without materialization
+        if name != self.name or set(path_params) != set(self.param_convertors):
+            raise NoMatchFound(name, path_params)
+
+        path, _ = replace_params(self.path_format, self.param_convertors, path_params)
+        return URLPath(path=path, protocol="http")
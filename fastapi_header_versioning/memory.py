@@ -0,0 +1,131 @@
+import gc
+import json
+import sys
+import sysconfig
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from types import ModuleType
+from typing import TYPE_CHECKING, Any
+
+from starlette.routing import BaseRoute
+
+if TYPE_CHECKING:  # pragma: no cover
+    from fastapi import FastAPI
+
+LIBRARY_PATHS = tuple(
+    {sysconfig.get_paths()[name] for name in ("stdlib", "platstdlib", "purelib", "platlib")},
+)
+
+
+def is_library_type(obj: type) -> bool:
+    # classes of libraries and stdlib are shared by everything, walking them would attribute whole pydantic/fastapi
+    # to each version
+    module = sys.modules.get(obj.__module__)
+    module_file = getattr(module, "__file__", None)
+    return module_file is None or module_file.startswith(LIBRARY_PATHS)
+
+
+def reachable_objects(roots: Iterable[Any], stop_ids: set[int]) -> dict[int, Any]:
+    reachable: dict[int, Any] = {}
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        object_id = id(obj)
+        if object_id in reachable or object_id in stop_ids:
+            continue
+        if isinstance(obj, ModuleType) or (isinstance(obj, type) and is_library_type(obj)):
+            continue
+
+        # object itself is kept to make sure id is not reused during the walk
+        reachable[object_id] = obj
+        stack.extend(gc.get_referents(obj))
+
+    return reachable
+
+
+def route_version(route: BaseRoute) -> str | None:
+    return getattr(route, "api_version", None)
+
+
+@dataclass
+class VersionMemoryRecord:
+    version: str | None
+    routes: int
+    # freed if the version is retired - objects reachable only from this version
+    exclusive_bytes: int
+    exclusive_objects: int
+    # including objects shared with other versions
+    retained_bytes: int
+
+
+@dataclass
+class MemoryReport:
+    versions: list[VersionMemoryRecord]
+    shared_bytes: int
+    shared_objects: int
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "total_bytes": self.shared_bytes + sum(record.exclusive_bytes for record in self.versions),
+            "shared_bytes": self.shared_bytes,
+            "shared_objects": self.shared_objects,
+            "versions": [asdict(record) for record in self.versions],
+        }
+
+    def as_json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+
+def measure_versions_memory(app: "FastAPI") -> MemoryReport:
+    """
+    Attribute memory retained by app routes to versions: routes with dependant trees, fields and models, docs apps
+    mounted by doc_generation with their cached schemas. Objects reachable from several versions are reported as
+    shared. Modules, their globals and classes of libraries are never walked.
+    """
+    version_roots: dict[str | None, list[BaseRoute]] = {}
+    for route in app.router.routes:
+        version_roots.setdefault(route_version(route), []).append(route)
+
+    stop_ids = {id(app), id(app.router), id(app.router.routes), id(version_roots)}
+    stop_ids.update(id(vars(module)) for module in list(sys.modules.values()) if module is not None)
+    stop_ids.update(id(routes) for routes in version_roots.values())
+    # registry of interned objects is reachable from route classes, objects are attributed through the routes using them
+    stop_ids.update(id(interner) for route in app.router.routes if (interner := getattr(route, "interner", None)))
+
+    version_objects = {version: reachable_objects(routes, stop_ids) for version, routes in version_roots.items()}
+    owners: dict[int, int] = {}
+    for objects in version_objects.values():
+        for object_id in objects:
+            owners[object_id] = owners.get(object_id, 0) + 1
+
+    records = []
+    shared: dict[int, Any] = {}
+    for version, objects in version_objects.items():
+        exclusive_bytes = 0
+        exclusive_objects = 0
+        retained_bytes = 0
+        for object_id, obj in objects.items():
+            size = sys.getsizeof(obj)
+            retained_bytes += size
+            if owners[object_id] == 1:
+                exclusive_bytes += size
+                exclusive_objects += 1
+            else:
+                shared[object_id] = obj
+
+        records.append(
+            VersionMemoryRecord(
+                version=version,
+                routes=len(version_roots[version]),
+                exclusive_bytes=exclusive_bytes,
+                exclusive_objects=exclusive_objects,
+                retained_bytes=retained_bytes,
+            ),
+        )
+
+    records.sort(key=lambda record: record.exclusive_bytes, reverse=True)
+    return MemoryReport(
+        versions=records,
+        shared_bytes=sum(sys.getsizeof(obj) for obj in shared.values()),
+        shared_objects=len(shared),
+    )
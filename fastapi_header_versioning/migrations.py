@@ -0,0 +1,303 @@
+import json
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from functools import cache
+from typing import Any
+
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from starlette.types import Message, Receive, Scope, Send
+
+from .routing import HeaderVersionedAPIRoute
+
+Migration = Callable[[Any], Any]
+
+
+@dataclass(frozen=True)
+class MigrationStep:
+    version: str
+    migration: Migration
+    # route path templates the step is applied to. empty - all routes of the chain
+    paths: tuple[str, ...] = ()
+
+    def applies_to(self, path: str) -> bool:
+        return not self.paths or path in self.paths
+
+
+@dataclass
+class MigrationStats:
+    requests: int = 0
+    request_seconds: float = 0.0
+    responses: int = 0
+    response_seconds: float = 0.0
+
+    def __add__(self, other: "MigrationStats") -> "MigrationStats":
+        return MigrationStats(
+            requests=self.requests + other.requests,
+            request_seconds=self.request_seconds + other.request_seconds,
+            responses=self.responses + other.responses,
+            response_seconds=self.response_seconds + other.response_seconds,
+        )
+
+
+@dataclass(frozen=True)
+class MigrationPipeline:
+    """Flat list of body transformations for one version of one route, request ones go first"""
+
+    version: str
+    request_migrations: tuple[Migration, ...] = ()
+    response_migrations: tuple[Migration, ...] = ()
+    stats: MigrationStats = field(default_factory=MigrationStats, compare=False, hash=False)
+
+    def __bool__(self) -> bool:
+        return bool(self.request_migrations or self.response_migrations)
+
+    def migrate_request(self, body: Any) -> Any:
+        started = time.perf_counter()
+        for migration in self.request_migrations:
+            body = migration(body)
+        self.stats.requests += 1
+        self.stats.request_seconds += time.perf_counter() - started
+        return body
+
+    def migrate_response(self, body: Any) -> Any:
+        started = time.perf_counter()
+        for migration in self.response_migrations:
+            body = migration(body)
+        self.stats.responses += 1
+        self.stats.response_seconds += time.perf_counter() - started
+        return body
+
+
+class VersionChain:
+    """
+    Ordered versions (oldest first) served by a single "head" implementation - the latest version. Older versions are
+    described by migrations between adjacent versions:
+
+    - request migration registered for version X converts request body of version preceding X into X shape. Requests of
+      older clients pass all the request migrations up to the head, in ascending order
+    - response migration registered for version X converts response body of version X into preceding version shape.
+      Head responses pass them in descending order, down to requested version
+
+    Migrations receive and return decoded JSON body. Only JSON request bodies and successful JSON responses are
+    migrated. Request bodies which aren't valid JSON are passed to the head as is, request migration failing on a body
+    of unexpected shape results in a validation error.
+    """
+
+    def __init__(self, versions: Sequence[str]) -> None:
+        if not versions:
+            raise ValueError("At least one version is required")
+        if len(set(versions)) != len(versions):
+            raise ValueError("Versions of the chain must be unique")
+
+        self.versions = tuple(versions)
+        self.head = self.versions[-1]
+        self.request_steps: list[MigrationStep] = []
+        self.response_steps: list[MigrationStep] = []
+        self._pipelines: dict[tuple[str, str], MigrationPipeline] = {}
+
+    def _register(
+        self,
+        steps: list[MigrationStep],
+        version: str,
+        paths: Sequence[str],
+    ) -> Callable[[Migration], Migration]:
+        if version not in self.versions[1:]:
+            raise ValueError(f"Version {version} is not a part of the chain or it is the first version")
+
+        def decorator(migration: Migration) -> Migration:
+            steps.append(MigrationStep(version, migration, tuple(paths)))
+            self._pipelines.clear()
+            return migration
+
+        return decorator
+
+    def request(self, version: str, paths: Sequence[str] = ()) -> Callable[[Migration], Migration]:
+        return self._register(self.request_steps, version, paths)
+
+    def response(self, version: str, paths: Sequence[str] = ()) -> Callable[[Migration], Migration]:
+        return self._register(self.response_steps, version, paths)
+
+    def _migrations(self, steps: list[MigrationStep], version: str, path: str) -> list[Migration]:
+        position = self.versions.index(version)
+        later_versions = self.versions[position + 1 :]
+        # steps of the same version keep declaration order, versions without steps are skipped
+        return [
+            step.migration
+            for later_version in later_versions
+            for step in steps
+            if step.version == later_version and step.applies_to(path)
+        ]
+
+    def pipeline(self, version: str, path: str) -> MigrationPipeline:
+        key = (version, path)
+        pipeline = self._pipelines.get(key)
+        if pipeline is None:
+            pipeline = self._pipelines[key] = MigrationPipeline(
+                version=version,
+                request_migrations=tuple(self._migrations(self.request_steps, version, path)),
+                response_migrations=tuple(reversed(self._migrations(self.response_steps, version, path))),
+            )
+
+        return pipeline
+
+    def compile(self, path: str) -> dict[str, MigrationPipeline]:
+        # head and versions without any applicable step get no pipeline at all - handled without any overhead
+        pipelines = {version: self.pipeline(version, path) for version in self.versions}
+        return {version: pipeline for version, pipeline in pipelines.items() if pipeline}
+
+    def route_class(
+        self,
+        route_class: type[APIRoute] = APIRoute,
+        selectors: tuple[str | None, ...] = (),
+    ) -> type[APIRoute]:
+        return migrated_api_route(self, route_class, selectors)
+
+    def stats(self) -> dict[str, MigrationStats]:
+        stats: dict[str, MigrationStats] = {}
+        for (version, _), pipeline in self._pipelines.items():
+            if pipeline:
+                stats[version] = stats.get(version, MigrationStats()) + pipeline.stats
+
+        return stats
+
+
+def is_json(headers: Sequence[tuple[bytes, bytes]]) -> bool:
+    for name, value in headers:
+        if name == b"content-type":
+            return value.split(b";")[0].strip().endswith(b"json")
+
+    return False
+
+
+def with_content_length(headers: Sequence[tuple[bytes, bytes]], content_length: int) -> list[tuple[bytes, bytes]]:
+    return [(name, value) for name, value in headers if name != b"content-length"] + [
+        (b"content-length", str(content_length).encode()),
+    ]
+
+
+async def read_body(receive: Receive) -> bytes:
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+    return body
+
+
+class MigratedAPIRoute(HeaderVersionedAPIRoute):
+    """Serves all the versions of the chain, request and response bodies are migrated at ASGI level"""
+
+    api_migrations: VersionChain
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, endpoint, **kwargs)
+        self.migration_pipelines = self.api_migrations.compile(self.path)
+
+    def serves_version(self, version: str | None) -> bool:
+        return version in self.api_migrations.versions
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        pipeline = self.migration_pipelines.get(scope["requested_version"])
+        if pipeline is None:
+            await super().handle(scope, receive, send)
+            return
+
+        if pipeline.request_migrations and is_json(scope["headers"]):
+            body = await read_body(receive)
+            if body:
+                body = self._migrate_request_body(pipeline, body)
+                scope["headers"] = with_content_length(scope["headers"], len(body))
+            receive = self._replay_receive(body, receive)
+
+        if pipeline.response_migrations:
+            send = self._migrating_send(pipeline, send)
+
+        await super().handle(scope, receive, send)
+
+    @staticmethod
+    def _migrate_request_body(pipeline: MigrationPipeline, body: bytes) -> bytes:
+        try:
+            decoded = json.loads(body)
+        except ValueError:
+            # head rejects it the same way as a request of its own version
+            return body
+
+        try:
+            migrated = pipeline.migrate_request(decoded)
+        except (LookupError, TypeError, ValueError, AttributeError) as e:
+            # migrations may have changed the decoded body in place
+            original = json.loads(body)
+            raise RequestValidationError(
+                [
+                    {
+                        "type": "migration_error",
+                        "loc": ("body",),
+                        "msg": f"Body can't be migrated from version {pipeline.version}",
+                        "input": original,
+                        "ctx": {"error": repr(e)},
+                    },
+                ],
+                body=original,
+            ) from e
+        return json.dumps(migrated).encode()
+
+    @staticmethod
+    def _replay_receive(body: bytes, receive: Receive) -> Receive:
+        sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return replay_receive
+
+    @staticmethod
+    def _migrating_send(pipeline: MigrationPipeline, send: Send) -> Send:
+        start_message: Message | None = None
+        body = b""
+
+        async def migrating_send(message: Message) -> None:
+            nonlocal start_message, body
+            if message["type"] == "http.response.start":
+                if 200 <= message["status"] < 300 and is_json(message.get("headers", [])):
+                    start_message = message
+                    return
+                await send(message)
+                return
+
+            if start_message is None:
+                await send(message)
+                return
+
+            body += message.get("body", b"")
+            if message.get("more_body", False):
+                return
+
+            if body:
+                body = json.dumps(pipeline.migrate_response(json.loads(body))).encode()
+            start_message["headers"] = with_content_length(start_message.get("headers", []), len(body))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        return migrating_send
+
+
+@cache
+def migrated_api_route(
+    chain: VersionChain,
+    route_class: type[APIRoute] = APIRoute,
+    selectors: tuple[str | None, ...] = (),
+) -> type[APIRoute]:
+    class SpecificChainAPIRoute(MigratedAPIRoute, route_class):
+        api_version = chain.head
+        api_selectors = selectors
+        api_migrations = chain
+
+    return SpecificChainAPIRoute
@@ -0,0 +1,88 @@
+import asyncio
+import importlib
+import logging
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from typing import Any
+
+from starlette.types import ASGIApp, Message
+
+logger = logging.getLogger(__name__)
+
+LifespanContext = Callable[[Any], AbstractAsyncContextManager]
+
+
+def import_app(app_path: str) -> ASGIApp:
+    """ASGI app by import string, "module:attribute" """
+    module_name, _, attribute = app_path.partition(":")
+    if not attribute:
+        raise ValueError(f"App import string must be 'module:attribute', got {app_path!r}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class MountedAppLifespan:
+    """
+    Runs lifespan protocol of a mounted ASGI app. Apps which don't support lifespan (raise or return without
+    responding to startup) are skipped, the same way ASGI servers do in "auto" mode.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.state: dict[str, Any] = {}
+        self._receive_queue: asyncio.Queue[Message] = asyncio.Queue()
+        self._send_queue: asyncio.Queue[Message | None] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        scope = {"type": "lifespan", "asgi": {"version": "3.0", "spec_version": "2.0"}, "state": self.state}
+        try:
+            await self.app(scope, self._receive_queue.get, self._send_queue.put)
+        except Exception:  # noqa: BLE001
+            logger.debug("Lifespan of mounted app %r failed", self.app, exc_info=True)
+        finally:
+            # app is done - nothing will answer further events
+            await self._send_queue.put(None)
+
+    async def _event(self, event: str) -> Message | None:
+        await self._receive_queue.put({"type": f"lifespan.{event}"})
+        return await self._send_queue.get()
+
+    async def startup(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        message = await self._event("startup")
+        if message is None:
+            self._task = None
+            return
+        if message["type"] == "lifespan.startup.failed":
+            raise RuntimeError(f"Startup of mounted app {self.app!r} failed: {message.get('message', '')}")
+
+    async def shutdown(self) -> None:
+        if self._task is None:
+            return
+
+        message = await self._event("shutdown")
+        await self._task
+        self._task = None
+        if message is not None and message["type"] == "lifespan.shutdown.failed":
+            raise RuntimeError(f"Shutdown of mounted app {self.app!r} failed: {message.get('message', '')}")
+
+
+def forwarding_lifespan(lifespan_context: LifespanContext, apps: Callable[[], Iterable[ASGIApp]]) -> LifespanContext:
+    """Wrap router lifespan, so mounted apps are started before it and shut down after it"""
+
+    @asynccontextmanager
+    async def lifespan(app: Any) -> AsyncIterator[Any]:
+        mounted_lifespans = [MountedAppLifespan(mounted_app) for mounted_app in dict.fromkeys(apps())]
+        started: list[MountedAppLifespan] = []
+        try:
+            for mounted_lifespan in mounted_lifespans:
+                await mounted_lifespan.startup()
+                started.append(mounted_lifespan)
+
+            async with lifespan_context(app) as state:
+                yield state
+        finally:
+            for mounted_lifespan in reversed(started):
+                await mounted_lifespan.shutdown()
+
+    return lifespan
@@ -1,50 +1,208 @@
 from collections import defaultdict
+from typing import Any
 
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
-from starlette.routing import BaseRoute
+from starlette.routing import BaseRoute, Mount
 
+from .dispatch import RoutingTable
 from .fastapi import HeaderRoutingFastAPI
-from .routing import HeaderVersionedAPIRoute
+from .lazy import LazyVersionedRoute
+from .routing import HeaderVersionedAPIRoute, HeaderVersionedAPIRouter
+from .schemas import SchemaRegistry
 
 
 def get_version_from_route(route: BaseRoute) -> str | None:
-    if isinstance(route, HeaderVersionedAPIRoute):
+    if isinstance(route, HeaderVersionedAPIRoute | LazyVersionedRoute):
         return route.api_version or None
 
     return None
 
 
-def doc_generation(
-    app: HeaderRoutingFastAPI,
-) -> HeaderRoutingFastAPI:
-    parent_app = app
+def get_versions_from_route(route: BaseRoute) -> tuple[str | None, ...]:
+    chain = getattr(route, "api_migrations", None)
+    if chain is not None:
+        return chain.versions
+
+    return (get_version_from_route(route),)
+
+
+def get_selectors_from_route(route: BaseRoute) -> tuple[str | None, ...]:
+    if isinstance(route, HeaderVersionedAPIRoute | LazyVersionedRoute) and any(
+        value is not None for value in route.api_selectors
+    ):
+        return route.api_selectors
+
+    return ()
+
+
+class VersionDocsMount(Mount):
+    """Generated docs app of a single version"""
+
+    def __init__(
+        self,
+        path: str,
+        app: FastAPI,
+        api_version: str | None = None,
+        selectors: tuple[str | None, ...] = (),
+    ) -> None:
+        super().__init__(path, app=app)
+        self.api_version = api_version
+        self.selectors = selectors
+
+
+def use_schema_registry(app: FastAPI, registry: SchemaRegistry) -> None:
+    def openapi() -> dict[str, Any]:
+        if app.openapi_schema is None:
+            app.openapi_schema = registry.openapi(app)
+        return app.openapi_schema
+
+    app.openapi = openapi  # type: ignore[method-assign]
+
+
+def version_docs_mount(
+    parent_app: HeaderRoutingFastAPI,
+    prefix: str,
+    version_description: str,
+    routes: list[BaseRoute],
+    version: str | None = None,
+    registry: SchemaRegistry | None = None,
+    selectors: tuple[str | None, ...] = (),
+) -> VersionDocsMount:
+    unique_routes = {}
+    versioned_app = FastAPI(
+        title=parent_app.title,
+        description=version_description + " " + parent_app.description,
+    )
+    if registry is not None:
+        use_schema_registry(versioned_app, registry)
+    has_lazy_routes = False
+    for route in routes:
+        if isinstance(route, LazyVersionedRoute):
+            route = route.build()  # noqa: PLW2901
+            has_lazy_routes = True
+
+        if isinstance(route, APIRoute):
+            for method in route.methods:
+                unique_routes[route.path + "|" + method] = route
+
+        # TODO: support websocket routes
+
+    docs_routes = list(versioned_app.router.routes)
+    versioned_app.router.routes.extend(unique_routes.values())
+    if has_lazy_routes:
+        # schema is rendered once, routes built for it are released right away
+        versioned_app.openapi()
+        versioned_app.router.routes = docs_routes
+    return VersionDocsMount(prefix, app=versioned_app, api_version=version, selectors=selectors)
+
+
+def combined_docs_mount(
+    parent_app: HeaderRoutingFastAPI,
+    mounts: list[VersionDocsMount],
+    registry: SchemaRegistry,
+    prefix: str = "/all_versions",
+) -> VersionDocsMount:
+    """Single document of all the versions, assembled from documents of generic 'mounts', see SchemaRegistry.combine"""
+    combined_app = FastAPI(title=parent_app.title, description="All versions. " + parent_app.description)
+
+    def openapi() -> dict[str, Any]:
+        if combined_app.openapi_schema is None:
+            combined_app.openapi_schema = registry.combine(
+                {mount.api_version: mount.app.openapi() for mount in mounts},
+                {"title": combined_app.title, "version": parent_app.version, "description": combined_app.description},
+            )
+        return combined_app.openapi_schema
+
+    combined_app.openapi = openapi  # type: ignore[method-assign]
+    return VersionDocsMount(prefix, app=combined_app)
+
+
+def version_docs_mounts(
+    parent_app: HeaderRoutingFastAPI,
+    app_routes: list[BaseRoute],
+    registry: SchemaRegistry | None = None,
+    combined_docs: bool = False,
+) -> list[VersionDocsMount]:
+    """
+    Docs of each version are generated by FastAPI. With 'registry' equal parts of documents of all the versions are
+    interned and shared. 'combined_docs' - also mount a single document of all the versions at /all_versions.
+    """
     version_route_mapping: dict[str | None, list[BaseRoute]] = defaultdict(list)
+    mounts = []
 
-    for route in app.routes:
-        version = get_version_from_route(route)  # pyright: ignore[reportGeneralTypeIssues]
-        version_route_mapping[version].append(route)  # pyright: ignore[reportGeneralTypeIssues]
+    for route in app_routes:
+        # route served through migrations is documented in each version of its chain (with head schema)
+        for version in get_versions_from_route(route):
+            version_route_mapping[version].append(route)
 
     versions = version_route_mapping.keys()
     for version in versions:
-        unique_routes = {}
         version_description = version if version is not None else "Not versioned"
-        versioned_app = FastAPI(
-            title=app.title,
-            description=version_description + " " + app.description,
+        prefix = f"/version_{version}"
+        if version is None:
+            prefix = "/no_version"
+
+        routes = version_route_mapping[version]
+        generic_routes = [route for route in routes if not get_selectors_from_route(route)]
+        mounts.append(version_docs_mount(parent_app, prefix, version_description, generic_routes, version, registry))
+
+        # routes bound to selectors are documented separately, on top of generic routes of the same version
+        selector_variants = dict.fromkeys(
+            selectors for route in routes if (selectors := get_selectors_from_route(route))
         )
-        for route in version_route_mapping[version]:
-            if isinstance(route, APIRoute):
-                for method in route.methods:
-                    unique_routes[route.path + "|" + method] = route
+        for selectors in selector_variants:
+            variant_name = "_".join(value if value is not None else "any" for value in selectors)
+            mounts.append(
+                version_docs_mount(
+                    parent_app,
+                    f"{prefix}_{variant_name}",
+                    f"{version_description} ({', '.join(value for value in selectors if value is not None)})",
+                    generic_routes + [route for route in routes if get_selectors_from_route(route) == selectors],
+                    version,
+                    registry,
+                    selectors,
+                ),
+            )
 
-            # TODO: support websocket routes
+    if combined_docs:
+        mounts.append(
+            combined_docs_mount(
+                parent_app,
+                [mount for mount in mounts if not mount.selectors],
+                registry if registry is not None else SchemaRegistry(),
+            ),
+        )
+    return mounts
 
-        versioned_app.router.routes.extend(unique_routes.values())
 
-        prefix = f"/version_{version}"
-        if version is None:
-            prefix = "/no_version"
-        parent_app.mount(prefix, versioned_app)
+def doc_generation(
+    app: HeaderRoutingFastAPI,
+    combined_docs: bool = False,
+    registry: SchemaRegistry | None = None,
+) -> HeaderRoutingFastAPI:
+    app.router.routes.extend(version_docs_mounts(app, app.routes, registry=registry, combined_docs=combined_docs))
+    return app
 
-    return parent_app
+
+def build_routing_snapshot(
+    app: HeaderRoutingFastAPI,
+    router: HeaderVersionedAPIRouter | None = None,
+    docs: bool = True,
+    warm: bool = True,
+    combined_docs: bool = False,
+    registry: SchemaRegistry | None = None,
+) -> RoutingTable:
+    """
+    Routing snapshot of 'router' routes (staging router with the new set of versions) for app.swap_routing, docs of
+    each version are regenerated if 'docs'. Heavy part - routes and docs construction - happens here, off the hot path.
+    """
+    source_router = app.router if router is None else router
+    routes = [route for route in source_router.routes if not isinstance(route, VersionDocsMount)]
+    if docs:
+        routes += version_docs_mounts(app, routes, registry=registry, combined_docs=combined_docs)
+    return app.router.build_snapshot(  # pyright: ignore[reportGeneralTypeIssues]
+        routes,
+        source_router.registered_versions,
+        warm=warm,
+    )
@@ -0,0 +1,241 @@
+import json
+import logging
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from fastapi.routing import APIRoute
+from starlette.routing import BaseRoute
+
+if TYPE_CHECKING:  # pragma: no cover
+    from fastapi import APIRouter
+
+logger = logging.getLogger(__name__)
+
+_active_profiler: "BuildProfiler | None" = None
+
+
+def get_active_profiler() -> "BuildProfiler | None":
+    return _active_profiler
+
+
+def _route_version(route: BaseRoute) -> str | None:
+    return getattr(route, "api_version", None)
+
+
+def _endpoint_name(endpoint: Callable[..., Any]) -> str:
+    return f"{getattr(endpoint, '__module__', '?')}.{getattr(endpoint, '__qualname__', repr(endpoint))}"
+
+
+@dataclass
+class RouteBuildRecord:
+    endpoint: str
+    methods: list[str]
+    path: str
+    version: str | None
+    builds: int = 0
+    # re-creations of already built route on outer levels of nested include_router calls
+    rebuilds: int = 0
+    seconds: float = 0.0
+    allocated_bytes: int = 0
+
+
+@dataclass
+class VersionBuildRecord:
+    version: str | None
+    routes: int = 0
+    builds: int = 0
+    rebuilds: int = 0
+    seconds: float = 0.0
+    allocated_bytes: int = 0
+
+
+@dataclass
+class IncludeRecord:
+    router: str
+    prefix: str
+    version: str | None
+    routes: int
+    seconds: float
+    allocated_bytes: int
+
+
+@dataclass
+class BuildProfiler:
+    """
+    Collects wall time and allocated memory spent on routes construction while the app is assembled.
+
+    Only routes built by HeaderVersionedAPIRouter are tracked - plain APIRouter children are measured once they are
+    re-created by a versioned router in include_router.
+    """
+
+    trace_memory: bool = True
+    routes: dict[tuple[int, tuple[str, ...], str | None], RouteBuildRecord] = field(default_factory=dict)
+    includes: list[IncludeRecord] = field(default_factory=list)
+    _rebuilding: int = field(default=0, init=False, repr=False)
+    _started_tracemalloc: bool = field(default=False, init=False, repr=False)
+
+    def start(self) -> None:
+        global _active_profiler  # noqa: PLW0603
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        _active_profiler = self
+
+    def stop(self) -> None:
+        global _active_profiler  # noqa: PLW0603
+        if _active_profiler is self:
+            _active_profiler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _traced_memory(self) -> int:
+        if self.trace_memory and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return 0
+
+    @contextmanager
+    def measure_route(self, router: "APIRouter") -> Iterator[None]:
+        routes_count = len(router.routes)
+        memory_before = self._traced_memory()
+        started = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - started
+        allocated = self._traced_memory() - memory_before
+        if len(router.routes) == routes_count:  # pragma: no cover
+            # nothing was added (e.g. route building failed and error was suppressed)
+            return
+
+        route = router.routes[-1]
+        if not isinstance(route, APIRoute):  # pragma: no cover
+            return
+
+        methods = tuple(sorted(route.methods))
+        version = _route_version(route)
+        # same endpoint re-created on each level of nested include_router calls shares the record of its version
+        key = (id(route.endpoint), methods, version)
+        record = self.routes.get(key)
+        if record is None:
+            record = RouteBuildRecord(
+                endpoint=_endpoint_name(route.endpoint),
+                methods=list(methods),
+                path=route.path,
+                version=version,
+            )
+            self.routes[key] = record
+
+        # the outermost (latest) build defines the effective path
+        record.path = route.path
+        if self._rebuilding:
+            record.rebuilds += 1
+        else:
+            record.builds += 1
+        record.seconds += seconds
+        record.allocated_bytes += allocated
+
+    @contextmanager
+    def measure_include(
+        self,
+        router: "APIRouter",
+        included: "APIRouter",
+        prefix: str,
+        version: str | None,
+        rebuilds: bool = False,
+    ) -> Iterator[None]:
+        """'rebuilds' - routes added by the include are re-created routes of 'included', which were measured already"""
+        routes_count = len(router.routes)
+        memory_before = self._traced_memory()
+        started = time.perf_counter()
+        self._rebuilding += int(rebuilds)
+        try:
+            yield
+        finally:
+            self._rebuilding -= int(rebuilds)
+        self.includes.append(
+            IncludeRecord(
+                router=f"{type(included).__name__}@{id(included):#x}",
+                prefix=prefix,
+                version=version,
+                routes=len(router.routes) - routes_count,
+                seconds=time.perf_counter() - started,
+                allocated_bytes=self._traced_memory() - memory_before,
+            ),
+        )
+
+    def versions(self) -> list[VersionBuildRecord]:
+        versions: dict[str | None, VersionBuildRecord] = {}
+        for record in self.routes.values():
+            version_record = versions.setdefault(record.version, VersionBuildRecord(version=record.version))
+            version_record.routes += 1
+            version_record.builds += record.builds
+            version_record.rebuilds += record.rebuilds
+            version_record.seconds += record.seconds
+            version_record.allocated_bytes += record.allocated_bytes
+
+        return sorted(versions.values(), key=lambda record: record.seconds, reverse=True)
+
+    def as_dict(self) -> dict[str, Any]:
+        routes = sorted(self.routes.values(), key=lambda record: record.seconds, reverse=True)
+        return {
+            "total_seconds": sum(record.seconds for record in routes),
+            "total_allocated_bytes": sum(record.allocated_bytes for record in routes),
+            "versions": [asdict(record) for record in self.versions()],
+            "routes": [asdict(record) for record in routes],
+            "includes": [
+                asdict(record) for record in sorted(self.includes, key=lambda record: record.seconds, reverse=True)
+            ],
+        }
+
+    def as_json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+    def as_text(self) -> str:
+        report = self.as_dict()
+        lines = [
+            f"Routes build: {report['total_seconds'] * 1000:.2f} ms, {report['total_allocated_bytes']} bytes allocated",
+            "",
+            f"{'version':<20} {'routes':>7} {'builds':>7} {'rebuilds':>8} {'ms':>10} {'bytes':>12}",
+        ]
+        for version in report["versions"]:
+            version_name = "<unversioned>" if version["version"] is None else version["version"]
+            lines.append(
+                f"{version_name:<20} {version['routes']:>7} {version['builds']:>7} {version['rebuilds']:>8} "
+                f"{version['seconds'] * 1000:>10.2f} {version['allocated_bytes']:>12}",
+            )
+
+        lines += ["", f"{'route':<60} {'version':<12} {'builds':>7} {'rebuilds':>8} {'ms':>10} {'bytes':>12}"]
+        for route in report["routes"]:
+            route_name = f"{','.join(route['methods'])} {route['path']}"
+            version_name = "-" if route["version"] is None else route["version"]
+            lines.append(
+                f"{route_name:<60} {version_name:<12} {route['builds']:>7} {route['rebuilds']:>8} "
+                f"{route['seconds'] * 1000:>10.2f} {route['allocated_bytes']:>12}",
+            )
+
+        return "\n".join(lines)
+
+    def dump(self, json_path: str | None = None) -> None:
+        logger.info("Versioned app build profile:\n%s", self.as_text())
+        if json_path is not None:
+            Path(json_path).write_text(self.as_json())
+
+
+@contextmanager
+def profile_build(json_path: str | None = None, trace_memory: bool = True) -> Iterator[BuildProfiler]:
+    """
+    Profile routes construction for everything assembled inside the block. Routers declared at module level must be
+    imported inside the block to be measured. Report is dumped on exit - log text report and optional JSON file.
+    """
+    profiler = BuildProfiler(trace_memory=trace_memory)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+    profiler.dump(json_path=json_path)
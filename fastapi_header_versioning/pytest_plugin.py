@@ -0,0 +1,93 @@
+"""
+Performance budgets for the test suite. Enable with `pytest_plugins = ["fastapi_header_versioning.pytest_plugin"]` in
+the top-level conftest.py and use `performance_budget` fixture:
+
+    async def test__budget(performance_budget):
+        await performance_budget.check(BudgetScenario("app", build_app, [BudgetRequest("GET", "/items")]))
+
+Budget file is set by `performance_budget` ini option or `--performance-budget`, re-record it with
+`--update-performance-budget`. Tests using the fixture are marked with `performance_budget` marker and skipped under a
+tracer (e.g. coverage) - run them separately with `pytest -m performance_budget`.
+"""
+
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from .budgets import BudgetScenario, PerformanceBudget, calibrate, format_violations, measure_scenario
+
+
+class BudgetChecker:
+    def __init__(self, budget: PerformanceBudget, update: bool) -> None:
+        self.budget = budget
+        self.update = update
+        self._calibration_seconds: float | None = None
+
+    @property
+    def calibration_seconds(self) -> float:
+        if self._calibration_seconds is None:
+            self._calibration_seconds = calibrate()
+        return self._calibration_seconds
+
+    async def check(self, scenario: BudgetScenario, **measure_kwargs: Any) -> None:
+        measurement = await measure_scenario(scenario, **measure_kwargs)
+        if self.update:
+            self.budget.record(scenario.name, measurement, self.calibration_seconds)
+            return
+
+        violations = self.budget.check(scenario.name, measurement, self.calibration_seconds)
+        if violations:
+            # a single slow measurement is noise - regression has to be reproduced
+            measurement = await measure_scenario(scenario, **measure_kwargs)
+            violations = self.budget.check(scenario.name, measurement, self.calibration_seconds)
+        if violations:
+            pytest.fail(f"Performance budget of {self.budget.path} is exceeded:\n{format_violations(violations)}")
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("performance budget")
+    group.addoption("--performance-budget", default=None, help="Path to performance budget file")
+    group.addoption(
+        "--update-performance-budget",
+        action="store_true",
+        help="Record measured scenarios into performance budget file instead of checking them",
+    )
+    parser.addini("performance_budget", "Path to performance budget file", default="performance_budget.json")
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "performance_budget: checks performance budget, skipped under a tracer")
+
+
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    for item in items:
+        if "performance_budget" in getattr(item, "fixturenames", ()):
+            item.add_marker(pytest.mark.performance_budget)
+
+
+@contextmanager
+def budget_checker(path: Path, update: bool) -> Iterator[BudgetChecker]:
+    """Checker of the budget file, measured scenarios are saved on exit if 'update' is set"""
+    checker = BudgetChecker(PerformanceBudget.load(path), update=update)
+    yield checker
+
+    if checker.update:
+        checker.budget.save()
+
+
+@pytest.fixture(scope="session")
+def performance_budget(pytestconfig: pytest.Config) -> Iterator[BudgetChecker]:
+    path = pytestconfig.getoption("performance_budget") or pytestconfig.rootpath / pytestconfig.getini(
+        "performance_budget",
+    )
+    update = pytestconfig.getoption("update_performance_budget")
+    # tracer slows dispatch down and keeps frames alive - both time and allocations would be off
+    if sys.gettrace() is not None:
+        pytest.skip("Performance budget is not checked under a tracer, run `pytest -m performance_budget`")
+
+    with budget_checker(Path(path), update) as checker:  # pragma: no cover - never reached under coverage
+        yield checker
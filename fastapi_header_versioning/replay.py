@@ -0,0 +1,337 @@
+"""
+Replay of an access log against an app, to check routing changes and sizing with the real mix of versions and paths:
+
+    python -m fastapi_header_versioning.replay access.log --app service.main:app --speed 2 --concurrency 20
+    python -m fastapi_header_versioning.replay access.log --url http://127.0.0.1:8000 --app service.main:app
+
+Log has a request per line - "<timestamp> <method> <path> <version>", timestamp is unix time or ISO 8601, version is
+"-" for requests without it. With --app requests are handled in-process over ASGI, within the app lifespan, with --url
+they are sent over HTTP/1.1 (e.g. to uvicorn with several workers), --app is used then only to report resolved
+versions.
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Protocol
+from urllib.parse import urlsplit
+
+from starlette.types import ASGIApp
+
+from .fastapi import HeaderRoutingFastAPI
+from .mounts import MountedAppLifespan, import_app
+from .synthetic import SyntheticRequest, dispatch
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 99)
+NO_VERSION = "-"
+
+
+@dataclass(frozen=True)
+class LogEntry:
+    timestamp: float
+    method: str
+    path: str
+    version: str | None
+
+
+def parse_timestamp(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def parse_access_log(lines: Iterable[str]) -> Iterator[LogEntry]:
+    """Entries of the log, blank lines and lines starting with '#' are skipped"""
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()  # noqa: PLW2901
+        if not line or line.startswith("#"):
+            continue
+
+        parts = line.split()
+        if len(parts) != 4:
+            raise ValueError(f"Line {line_number}: expected '<timestamp> <method> <path> <version>', got {line!r}")
+        timestamp, method, path, version = parts
+        yield LogEntry(parse_timestamp(timestamp), method.upper(), path, None if version == NO_VERSION else version)
+
+
+class ReplayTarget(Protocol):
+    async def start(self) -> None:
+        ...
+
+    async def send(self, entry: LogEntry) -> tuple[int, str | None]:
+        """Response status code and resolved version if known"""
+
+    async def close(self) -> None:
+        ...
+
+
+class ASGITarget:
+    """Requests are handled in-process between app lifespan startup and shutdown, resolved version is read from scope"""
+
+    def __init__(self, app: ASGIApp, version_header: str = "x-version") -> None:
+        self.app = app
+        self.version_header = version_header
+        self._lifespan = MountedAppLifespan(app)
+
+    async def start(self) -> None:
+        await self._lifespan.startup()
+
+    async def send(self, entry: LogEntry) -> tuple[int, str | None]:
+        headers = ((self.version_header, entry.version),) if entry.version is not None else ()
+        request = SyntheticRequest(entry.method, entry.path, headers=headers)
+        scope = request.scope()
+        # same as servers do - each request gets a copy of the lifespan state
+        scope["state"] = self._lifespan.state.copy()
+        status_code = await dispatch(self.app, request, scope)
+        # version is interned to the scope only if it was resolved
+        return status_code, scope.get("requested_version") if "api_version" in scope else None
+
+    async def close(self) -> None:
+        await self._lifespan.shutdown()
+
+
+class StaleConnectionError(ConnectionError):
+    pass
+
+
+class HTTPTarget:
+    """Minimal HTTP/1.1 client with keep-alive connections, a connection per concurrent request"""
+
+    def __init__(
+        self,
+        url: str,
+        version_header: str = "x-version",
+        resolve_version: Callable[[str | None], str | None] | None = None,
+    ) -> None:
+        parsed = urlsplit(url)
+        if parsed.scheme != "http" or parsed.hostname is None:
+            raise ValueError(f"Only http:// URLs are supported, got {url!r}")
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.netloc = parsed.netloc
+        self.version_header = version_header
+        self.resolve_version = resolve_version
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def start(self) -> None:
+        # connections are opened on demand, the server runs its own lifespan
+        pass
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: dict[str, str]) -> None:
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while size := int((await reader.readline()).split(b";")[0], 16):
+                await reader.readexactly(size + 2)
+            # trailers are not expected, only the final line
+            await reader.readline()
+        else:
+            await reader.readexactly(int(headers.get("content-length", 0)))
+
+    @staticmethod
+    async def _read_status_code(reader: asyncio.StreamReader) -> int:
+        status_line = await reader.readline()
+        if not status_line:
+            raise StaleConnectionError("Connection was closed by the server")
+        return int(status_line.split()[1])
+
+    async def _exchange(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, entry: LogEntry) -> int:
+        """Status code of the response. Connection is returned to idle ones only if the response was read completely"""
+        try:
+            request = f"{entry.method} {entry.path} HTTP/1.1\r\nhost: {self.netloc}\r\ncontent-length: 0\r\n"
+            if entry.version is not None:
+                request += f"{self.version_header}: {entry.version}\r\n"
+            writer.write(f"{request}\r\n".encode("latin-1"))
+            await writer.drain()
+
+            status_code = await self._read_status_code(reader)
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if entry.method != "HEAD" and status_code not in (204, 304):
+                await self._read_body(reader, headers)
+        except BaseException:
+            writer.close()
+            raise
+
+        if headers.get("connection", "").lower() != "close":
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+        return status_code
+
+    async def send(self, entry: LogEntry) -> tuple[int, str | None]:
+        status_code = None
+        if self._idle:
+            try:
+                status_code = await self._exchange(*self._idle.pop(), entry)
+            except ConnectionError:
+                # idle connection was closed by the server (e.g. keep-alive timeout), retried once on a new one
+                logger.debug("Idle connection to %s is stale, reconnecting", self.netloc, exc_info=True)
+        if status_code is None:
+            status_code = await self._exchange(*await asyncio.open_connection(self.host, self.port), entry)
+
+        resolved_version = self.resolve_version(entry.version) if self.resolve_version is not None else None
+        return status_code, resolved_version
+
+    async def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)]
+
+
+@dataclass
+class VersionStats:
+    requests: int = 0
+    # server errors and requests which raised
+    errors: int = 0
+    latencies: list[float] = field(default_factory=list, repr=False)
+
+    def add(self, seconds: float, error: bool) -> None:
+        self.requests += 1
+        self.errors += error
+        self.latencies.append(seconds)
+
+    def percentiles(self) -> dict[int, float]:
+        latencies = sorted(self.latencies)
+        return {percent: percentile(latencies, percent) for percent in PERCENTILES}
+
+
+@dataclass
+class ReplayReport:
+    seconds: float
+    by_requested_version: dict[str | None, VersionStats]
+    by_resolved_version: dict[str | None, VersionStats]
+
+    @property
+    def requests(self) -> int:
+        return sum(stats.requests for stats in self.by_requested_version.values())
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    def format(self) -> str:
+        lines = [f"{self.requests} requests in {self.seconds:.3f} s, {self.throughput:.1f} requests/s"]
+        for title, stats_by_version in (
+            ("requested version", self.by_requested_version),
+            ("resolved version", self.by_resolved_version),
+        ):
+            lines.append("")
+            lines.append(
+                f"{title:<20} {'requests':>10} {'errors':>8} {'requests/s':>12} "
+                + " ".join(f"{f'p{percent} ms':>10}" for percent in PERCENTILES),
+            )
+            for version, stats in sorted(stats_by_version.items(), key=lambda item: (item[0] is not None, item[0])):
+                lines.append(
+                    f"{version or NO_VERSION:<20} {stats.requests:>10} {stats.errors:>8} "
+                    f"{stats.requests / self.seconds if self.seconds else 0.0:>12.1f} "
+                    + " ".join(f"{value * 1000:>10.3f}" for value in stats.percentiles().values()),
+                )
+        return "\n".join(lines)
+
+
+async def replay(
+    target: ReplayTarget,
+    entries: Sequence[LogEntry],
+    speed: float | None = 1.0,
+    concurrency: int = 10,
+) -> ReplayReport:
+    """
+    Send entries in log order, each one not earlier than its timestamp offset from the first entry divided by 'speed'
+    ('speed' None - as fast as possible), with at most 'concurrency' requests in flight.
+    """
+    by_requested_version: dict[str | None, VersionStats] = {}
+    by_resolved_version: dict[str | None, VersionStats] = {}
+    pending = iter(entries)
+    first_timestamp = entries[0].timestamp if entries else 0.0
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async def worker() -> None:
+        for entry in pending:
+            if speed is not None:
+                delay = started + (entry.timestamp - first_timestamp) / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            request_started = time.perf_counter()
+            try:
+                status_code, resolved_version = await target.send(entry)
+                error = status_code >= 500
+            except Exception:  # noqa: BLE001
+                logger.debug("Replayed request %s %s failed", entry.method, entry.path, exc_info=True)
+                resolved_version, error = None, True
+            seconds = time.perf_counter() - request_started
+            by_requested_version.setdefault(entry.version, VersionStats()).add(seconds, error)
+            by_resolved_version.setdefault(resolved_version, VersionStats()).add(seconds, error)
+
+    await target.start()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        await target.close()
+    return ReplayReport(loop.time() - started, by_requested_version, by_resolved_version)
+
+
+def version_resolver(app: HeaderRoutingFastAPI) -> Callable[[str | None], str | None]:
+    version_index = app.router.get_routing_table().version_index  # pyright: ignore[reportGeneralTypeIssues]
+
+    def resolve_version(version: str | None) -> str | None:
+        try:
+            return version_index.resolve(version)
+        except LookupError:
+            return None
+
+    return resolve_version
+
+
+async def run(arguments: argparse.Namespace) -> ReplayReport:
+    with open(arguments.log) as log_file:  # noqa: PTH123
+        entries = list(parse_access_log(log_file))
+
+    app = import_app(arguments.app) if arguments.app else None
+    target: ReplayTarget
+    if arguments.url:
+        resolve_version = version_resolver(app) if isinstance(app, HeaderRoutingFastAPI) else None
+        target = HTTPTarget(arguments.url, arguments.version_header, resolve_version)
+    elif app is not None:
+        target = ASGITarget(app, arguments.version_header)
+    else:
+        raise ValueError("Either --app or --url is required")
+
+    speed = None if arguments.speed == 0 else arguments.speed
+    return await replay(target, entries, speed=speed, concurrency=arguments.concurrency)
+
+
+def parse_arguments(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay access log against an app")
+    parser.add_argument("log", help="Access log, a '<timestamp> <method> <path> <version>' line per request")
+    parser.add_argument("--app", help="Import string of the app, e.g. 'service.main:app'")
+    parser.add_argument("--url", help="Base URL of running server, e.g. 'http://127.0.0.1:8000'")
+    parser.add_argument("--version-header", default="x-version")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier, 0 - as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=10)
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    print(asyncio.run(run(parse_arguments(argv))).format())  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
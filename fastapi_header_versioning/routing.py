@@ -1,7 +1,11 @@
-from collections.abc import Callable, Sequence
+import copy
+from collections.abc import Callable, Coroutine, Iterable, Iterator, Sequence
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from enum import Enum
 from functools import cache
 from typing import (
+    TYPE_CHECKING,
     Any,
     Optional,
     TypeVar,
@@ -14,15 +18,38 @@ from fastapi.routing import APIRoute
 from fastapi.types import DecoratedCallable
 from fastapi.utils import (
     generate_unique_id,
+    get_value_or_default,
 )
 from starlette.datastructures import URL
 from starlette.exceptions import HTTPException
+from starlette.requests import Request
 from starlette.responses import JSONResponse, PlainTextResponse, RedirectResponse, Response
 from starlette.routing import (
     BaseRoute,
     Match,
 )
-from starlette.types import Receive, Scope, Send
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .dispatch import (
+    ResolutionKind,
+    RouteResolution,
+    RoutingTable,
+    SelectorHeader,
+    VersionIndex,
+    VersionNotFoundError,
+    VersionResolution,
+    as_selector_header,
+)
+from .interning import InternedValue, RouteInterner, intern_route, route_interner
+from .lazy import LazyVersionedRoute, MaterializedRoutesPool
+from .mounts import forwarding_lifespan
+from .profiling import get_active_profiler
+from .shadow import ShadowTraffic
+from .shedding import LoadShedder
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .explain import RoutingTracer
+    from .migrations import MigrationStats, VersionChain
 
 _T = TypeVar("_T")
 
@@ -34,12 +61,79 @@ def same_definition_as_in(t: _T) -> Callable[[Callable], _T]:
     return decorator
 
 
+def notifying(method: Callable[..., Any]) -> Callable[..., Any]:
+    def mutator(self: Any, *args: Any, **kwargs: Any) -> Any:
+        result = method(self, *args, **kwargs)
+        self.on_change()
+        return result
+
+    return mutator
+
+
+class RoutesList(list):
+    """Routes of the router, 'on_change' is called after each in-place mutation"""
+
+    def __init__(self, routes: Iterable[BaseRoute], on_change: Callable[[], None]) -> None:
+        super().__init__(routes)
+        self.on_change = on_change
+
+    __setitem__ = notifying(list.__setitem__)
+    __delitem__ = notifying(list.__delitem__)
+    __iadd__ = notifying(list.__iadd__)
+    __imul__ = notifying(list.__imul__)
+    append = notifying(list.append)
+    extend = notifying(list.extend)
+    insert = notifying(list.insert)
+    pop = notifying(list.pop)
+    remove = notifying(list.remove)
+    clear = notifying(list.clear)
+    sort = notifying(list.sort)
+    reverse = notifying(list.reverse)
+
+
+class VersionsSet(set):
+    """Registered versions of the router, 'on_change' is called after each in-place mutation"""
+
+    def __init__(self, versions: Iterable[str | None], on_change: Callable[[], None]) -> None:
+        super().__init__(versions)
+        self.on_change = on_change
+
+    __ior__ = notifying(set.__ior__)
+    __iand__ = notifying(set.__iand__)
+    __isub__ = notifying(set.__isub__)
+    __ixor__ = notifying(set.__ixor__)
+    add = notifying(set.add)
+    discard = notifying(set.discard)
+    remove = notifying(set.remove)
+    pop = notifying(set.pop)
+    clear = notifying(set.clear)
+    update = notifying(set.update)
+    difference_update = notifying(set.difference_update)
+    intersection_update = notifying(set.intersection_update)
+    symmetric_difference_update = notifying(set.symmetric_difference_update)
+
+
 class HeaderVersionedAPIRoute(APIRoute):
     api_version = None
+    # values of additional selector headers, positional. None - route is not bound to this selector
+    api_selectors: tuple[str | None, ...] = ()
+    # fields and dependants identical to ones of another route (e.g. other version of the endpoint) are shared with it,
+    # None - each route keeps its own
+    interner: RouteInterner | None = route_interner
+    # boxes of interned objects used by the route, keep them alive
+    interned_objects: list[InternedValue] | None = None
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        # called by APIRoute.__init__ once fields and the dependant are built - handler closes over the interned ones
+        if self.interner is not None and self.interned_objects is None:
+            self.interned_objects = intern_route(self, self.interner)
+        return super().get_route_handler()
+
+    def serves_version(self, version: str | None) -> bool:
+        return self.api_version == version
 
     def is_version_matching(self, scope: Scope) -> bool:
-        requested_version = scope["requested_version"]
-        return self.api_version == requested_version
+        return self.serves_version(scope["requested_version"])
 
     def matches(self, scope: Scope) -> tuple[Match, Scope]:
         match, child_scope = super().matches(scope)
@@ -57,13 +151,69 @@ class HeaderVersionedAPIRoute(APIRoute):
 def specific_version_api_route(
     version: str,
     route_class: type[APIRoute] = APIRoute,
+    selectors: tuple[str | None, ...] = (),
 ) -> type[APIRoute]:
     class SpecificVersionAPIRoute(HeaderVersionedAPIRoute, route_class):
         api_version = version
+        api_selectors = selectors
 
     return SpecificVersionAPIRoute
 
 
+@dataclass
+class RouteDefinition:
+    """
+    Arguments of APIRouter.add_api_route kept instead of a constructed route. Used by deferred routers - real route
+    object is created only once, when definition reaches not deferred router.
+    """
+
+    path: str
+    endpoint: Callable[..., Any]
+    route_class: type[APIRoute]
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_route(cls, route: APIRoute) -> "RouteDefinition":
+        return cls(
+            path=route.path,
+            endpoint=route.endpoint,
+            route_class=type(route),
+            kwargs={
+                "response_model": route.response_model,
+                "status_code": route.status_code,
+                "tags": route.tags,
+                "dependencies": route.dependencies,
+                "summary": route.summary,
+                "description": route.description,
+                "response_description": route.response_description,
+                "responses": route.responses,
+                "deprecated": route.deprecated,
+                "methods": route.methods,
+                "operation_id": route.operation_id,
+                "response_model_include": route.response_model_include,
+                "response_model_exclude": route.response_model_exclude,
+                "response_model_by_alias": route.response_model_by_alias,
+                "response_model_exclude_unset": route.response_model_exclude_unset,
+                "response_model_exclude_defaults": route.response_model_exclude_defaults,
+                "response_model_exclude_none": route.response_model_exclude_none,
+                "include_in_schema": route.include_in_schema,
+                "response_class": route.response_class,
+                "name": route.name,
+                "callbacks": route.callbacks,
+                "openapi_extra": route.openapi_extra,
+                "generate_unique_id_function": route.generate_unique_id_function,
+            },
+        )
+
+
+@dataclass
+class DeferredInclude:
+    router: APIRouter
+    prefix: str
+    version: str | None
+    include_kwargs: dict[str, Any]
+
+
 async def handle_non_existing_version(scope: Scope, receive: Receive, send: Send) -> None:
     if "app" in scope:
         raise HTTPException(
@@ -75,61 +225,315 @@ async def handle_non_existing_version(scope: Scope, receive: Receive, send: Send
     await response(scope, receive, send)  # pragma: no cover
 
 
+async def handle_method_not_allowed(
+    allowed_methods: frozenset[str],
+    scope: Scope,
+    receive: Receive,
+    send: Send,
+) -> None:
+    headers = {"Allow": ", ".join(sorted(allowed_methods))}
+    if "app" in scope:
+        raise HTTPException(405, headers=headers)
+
+    response = PlainTextResponse("Method Not Allowed", status_code=405, headers=headers)  # pragma: no cover
+    await response(scope, receive, send)  # pragma: no cover
+
+
+def iter_router_definitions(router: APIRouter) -> Iterator[RouteDefinition]:
+    if isinstance(router, HeaderVersionedAPIRouter) and router.deferred:
+        yield from router.iter_route_definitions()
+        return
+
+    for route in router.routes:
+        if isinstance(route, APIRoute):
+            yield RouteDefinition.from_route(route)
+
+
+def without_api_routes(router: APIRouter) -> APIRouter:
+    router_copy = copy.copy(router)
+    router_copy.routes = [route for route in router.routes if not isinstance(route, APIRoute)]
+    return router_copy
+
+
 class HeaderVersionedAPIRouter(APIRouter):
     def __init__(
         self,
         default_version: str | None = None,
         *args: Any,
+        deferred: bool = False,
+        selector_headers: Sequence[SelectorHeader | str] = (),
+        shadow_traffic: ShadowTraffic | None = None,
+        routes_pool: MaterializedRoutesPool | None = None,
+        load_shedder: LoadShedder | None = None,
         **kwargs: Any,
     ) -> None:
+        """
+        'deferred' router keeps route definitions and included routers instead of constructing routes. Routes are
+        materialized once, when deferred router is included into not deferred one (e.g. into the app). Deferred router
+        can't serve requests by itself.
+
+        'selector_headers' - additional dispatch dimensions. Only used by router which serves requests (app router).
+
+        'shadow_traffic' - mirror sampled requests to candidate version, for latency comparison. Only used by router
+        which serves requests.
+
+        'routes_pool' - versioned routes are kept as definitions, real routes are materialized on demand and evicted
+        for the least recently used versions. Only for router which serves requests - routers with lazy routes can't
+        be included into other routers.
+
+        'load_shedder' - reject requests of low priority versions while the worker is overloaded. Only used by router
+        which serves requests.
+        """
         self.default_version: str | None = default_version
+        self.deferred = deferred
+        self.selector_headers = [as_selector_header(selector_header) for selector_header in selector_headers]
+        self.shadow_traffic = shadow_traffic
+        self.routes_pool = routes_pool
+        self.load_shedder = load_shedder
+        self.version_apps: dict[str, ASGIApp] = {}
+        # bumped on each change of routes and registered versions, routing table is rebuilt once it's outdated
+        self._generation = 0
+        self._routing_table: RoutingTable | None = None
+        self._routing_table_generation = 0
         self._context_version: str | None = None
-        self.registered_versions: set[str | None] = set()
-        self.registered_versions.add(self.default_version)
+        self._deferred_entries: list[RouteDefinition | DeferredInclude] = []
+        self.registered_versions = {self.default_version}
         super().__init__(*args, **kwargs)
+        if load_shedder is not None:
+            self.lifespan_context = load_shedder.lifespan(self.lifespan_context)
+
+    def _changed(self) -> None:
+        self._generation += 1
+
+    @property
+    def routes(self) -> list[BaseRoute]:
+        return self._routes
+
+    @routes.setter
+    def routes(self, routes: Iterable[BaseRoute]) -> None:
+        self._routes = RoutesList(routes, self._changed)
+        self._changed()
+
+    @property
+    def registered_versions(self) -> set[str | None]:
+        return self._registered_versions
+
+    @registered_versions.setter
+    def registered_versions(self, versions: Iterable[str | None]) -> None:
+        self._registered_versions = VersionsSet(versions, self._changed)
+        self._changed()
 
     def version(
         self,
         api_version: str,
+        selectors: tuple[str | None, ...] = (),
+        route_class: type[APIRoute] | None = None,
     ) -> Callable[[DecoratedCallable], DecoratedCallable]:
+        """
+        'route_class' - base route class for this version of the endpoint instead of router's one, e.g.
+        FastSerializationAPIRoute for versions returning huge payloads.
+        """
         self.registered_versions.add(api_version)
 
         def decorator(func: DecoratedCallable) -> DecoratedCallable:
             func.__endpoint_api_version__ = api_version
+            if selectors:
+                func.__endpoint_api_selectors__ = selectors
+            if route_class is not None:
+                func.__endpoint_route_class__ = route_class
             return func
 
         return decorator
 
-    @same_definition_as_in(APIRouter.add_api_route)
-    def add_api_route(
+    def selectors(self, *selectors: str | None) -> Callable[[DecoratedCallable], DecoratedCallable]:
+        """
+        Bind route to values of selector headers without setting a version. Values are positional, same order as
+        selector_headers of the app. None - route is not bound to this selector.
+        """
+
+        def decorator(func: DecoratedCallable) -> DecoratedCallable:
+            func.__endpoint_api_selectors__ = selectors
+            return func
+
+        return decorator
+
+    def migrations(self, chain: "VersionChain") -> Callable[[DecoratedCallable], DecoratedCallable]:
+        """
+        Serve all the versions of the chain by this (head) endpoint, older versions are served through request and
+        response migrations of the chain.
+        """
+        self.registered_versions.update(chain.versions)
+
+        def decorator(func: DecoratedCallable) -> DecoratedCallable:
+            func.__endpoint_api_migrations__ = chain
+            return func
+
+        return decorator
+
+    def mount_version(self, versions: Iterable[str], app: ASGIApp) -> None:
+        """
+        Serve requests resolved to any of 'versions' by another ASGI app, e.g. legacy service hosted in the same
+        process. App is picked by the resolved version before any route matching, so it takes precedence over routes
+        of these versions. Lifespan events are forwarded to mounted apps.
+        """
+        if not self.version_apps:
+            self.lifespan_context = forwarding_lifespan(self.lifespan_context, self.version_apps.values)
+        for version in versions:
+            self.version_apps[version] = app
+            self.registered_versions.add(version)
+
+    def _versioned_route_class(
         self,
-        path: str,
         endpoint: Callable[..., Any],
-        *,
-        route_class_override: type[APIRoute] | None = None,
-        **kwargs: Any,
-    ):
+        route_class_override: type[APIRoute] | None,
+        context_version: str | None,
+    ) -> type[APIRoute]:
         if route_class_override:
             # called from include_router or similar functions - we are re-generating routes
 
             # don't override route_class for already versioned routes
-            if not issubclass(route_class_override, HeaderVersionedAPIRoute) and self._context_version:
+            if not issubclass(route_class_override, HeaderVersionedAPIRoute) and context_version:
                 # need to wrap original route class with HeaderVersionedAPIRoute
                 # currently including routes from unversioned router with some externally defined version
                 route_class_override = specific_version_api_route(
-                    self._context_version,
+                    context_version,
                     route_class_override,
                 )
-        else:
-            # called from decorator-based routes declaration. extract __endpoint_api_version__ if set and generate
-            # proper route
-            if endpoint_version := getattr(endpoint, "__endpoint_api_version__", None):
-                route_class_override = specific_version_api_route(endpoint_version, APIRoute)
-            else:
-                # wrap with default version
-                route_class_override = specific_version_api_route(self.default_version, APIRoute)
+            return route_class_override
+
+        # called from decorator-based routes declaration. extract __endpoint_api_version__ if set and generate
+        # proper route. wrap with default version otherwise
+        endpoint_version = getattr(endpoint, "__endpoint_api_version__", None) or self.default_version
+        endpoint_selectors = getattr(endpoint, "__endpoint_api_selectors__", ())
+        base_route_class = getattr(endpoint, "__endpoint_route_class__", self.route_class)
+        chain = getattr(endpoint, "__endpoint_api_migrations__", None)
+        if chain is not None:
+            return chain.route_class(base_route_class, endpoint_selectors)
+        return specific_version_api_route(endpoint_version, base_route_class, endpoint_selectors)
+
+    @same_definition_as_in(APIRouter.add_api_route)
+    def add_api_route(
+        self,
+        path: str,
+        endpoint: Callable[..., Any],
+        *,
+        route_class_override: type[APIRoute] | None = None,
+        **kwargs: Any,
+    ):
+        route_class_override = self._versioned_route_class(endpoint, route_class_override, self._context_version)
+
+        if self.deferred:
+            self._deferred_entries.append(
+                self._route_definition(path, endpoint, route_class_override=route_class_override, **kwargs),
+            )
+            return
 
-        super().add_api_route(path, endpoint, route_class_override=route_class_override, **kwargs)
+        if (
+            self.routes_pool is not None
+            and issubclass(route_class_override, HeaderVersionedAPIRoute)
+            and route_class_override.api_version is not None
+        ):
+            definition = self._route_definition(path, endpoint, route_class_override=route_class_override, **kwargs)
+            self.routes.append(LazyVersionedRoute(definition, self.routes_pool, self))
+            return
+
+        profiler = get_active_profiler()
+        if profiler is None:
+            super().add_api_route(path, endpoint, route_class_override=route_class_override, **kwargs)
+            return
+
+        with profiler.measure_route(self):
+            super().add_api_route(path, endpoint, route_class_override=route_class_override, **kwargs)
+
+    def _route_definition(
+        self,
+        path: str,
+        endpoint: Callable[..., Any],
+        *,
+        route_class_override: type[APIRoute],
+        **kwargs: Any,
+    ) -> RouteDefinition:
+        # mirrors APIRouter.add_api_route, but keeps arguments instead of constructing the route
+        kwargs["responses"] = {**self.responses, **(kwargs.get("responses") or {})}
+        kwargs["response_class"] = get_value_or_default(
+            kwargs.get("response_class", Default(JSONResponse)),
+            self.default_response_class,
+        )
+        kwargs["tags"] = [*self.tags, *(kwargs.get("tags") or [])]
+        kwargs["dependencies"] = [*self.dependencies, *(kwargs.get("dependencies") or [])]
+        kwargs["callbacks"] = [*self.callbacks, *(kwargs.get("callbacks") or [])]
+        kwargs["deprecated"] = kwargs.get("deprecated") or self.deprecated
+        kwargs["include_in_schema"] = kwargs.get("include_in_schema", True) and self.include_in_schema
+        kwargs["generate_unique_id_function"] = get_value_or_default(
+            kwargs.get("generate_unique_id_function", Default(generate_unique_id)),
+            self.generate_unique_id_function,
+        )
+        return RouteDefinition(
+            path=self.prefix + path,
+            endpoint=endpoint,
+            route_class=route_class_override,
+            kwargs=kwargs,
+        )
+
+    def _include_definition(
+        self,
+        definition: RouteDefinition,
+        router: APIRouter,
+        prefix: str,
+        include_kwargs: dict[str, Any],
+    ) -> tuple[str, dict[str, Any]]:
+        # mirrors APIRoute processing of APIRouter.include_router. Returns path and add_api_route arguments
+        kwargs = dict(definition.kwargs)
+        kwargs["responses"] = {**(include_kwargs["responses"] or {}), **(kwargs.get("responses") or {})}
+        kwargs["response_class"] = get_value_or_default(
+            kwargs.get("response_class", Default(JSONResponse)),
+            router.default_response_class,
+            include_kwargs["default_response_class"],
+            self.default_response_class,
+        )
+        kwargs["tags"] = [*(include_kwargs["tags"] or []), *(kwargs.get("tags") or [])]
+        kwargs["dependencies"] = [*(include_kwargs["dependencies"] or []), *(kwargs.get("dependencies") or [])]
+        kwargs["callbacks"] = [*(include_kwargs["callbacks"] or []), *(kwargs.get("callbacks") or [])]
+        kwargs["deprecated"] = kwargs.get("deprecated") or include_kwargs["deprecated"] or self.deprecated
+        kwargs["include_in_schema"] = (
+            kwargs.get("include_in_schema", True) and self.include_in_schema and include_kwargs["include_in_schema"]
+        )
+        kwargs["generate_unique_id_function"] = get_value_or_default(
+            kwargs.get("generate_unique_id_function", Default(generate_unique_id)),
+            router.generate_unique_id_function,
+            include_kwargs["generate_unique_id_function"],
+            self.generate_unique_id_function,
+        )
+        return prefix + definition.path, kwargs
+
+    def iter_route_definitions(self) -> Iterator[RouteDefinition]:
+        """
+        Flatten composition tree of deferred router - effective prefix, version, dependencies, tags etc. are folded down
+        to each definition.
+        """
+        for entry in self._deferred_entries:
+            if isinstance(entry, RouteDefinition):
+                yield entry
+                continue
+
+            for child_definition in iter_router_definitions(entry.router):
+                path, kwargs = self._include_definition(
+                    child_definition,
+                    entry.router,
+                    entry.prefix,
+                    entry.include_kwargs,
+                )
+                route_class = self._versioned_route_class(
+                    child_definition.endpoint,
+                    child_definition.route_class,
+                    entry.version,
+                )
+                yield self._route_definition(
+                    path,
+                    child_definition.endpoint,
+                    route_class_override=route_class,
+                    **kwargs,
+                )
 
     def include_router(
         self,
@@ -152,88 +556,189 @@ class HeaderVersionedAPIRouter(APIRouter):
         if 'version' provided - include all the unversioned routes with this version. May be used to wrap existing
         routers with desired version.
         """
+        include_kwargs = {
+            "tags": tags,
+            "dependencies": dependencies,
+            "default_response_class": default_response_class,
+            "responses": responses,
+            "callbacks": callbacks,
+            "deprecated": deprecated,
+            "include_in_schema": include_in_schema,
+            "generate_unique_id_function": generate_unique_id_function,
+        }
         self._context_version = version
         self.registered_versions.add(version)
-        super().include_router(
-            router=router,
-            prefix=prefix,
-            tags=tags,
-            dependencies=dependencies,
-            default_response_class=default_response_class,
-            responses=responses,
-            callbacks=callbacks,
-            deprecated=deprecated,
-            include_in_schema=include_in_schema,
-            generate_unique_id_function=generate_unique_id_function,
-        )
+        profiler = get_active_profiler()
+        # routes of not deferred versioned routers were built (and measured) once already, here they are re-created
+        rebuilds = isinstance(router, HeaderVersionedAPIRouter) and not router.deferred
+        with profiler.measure_include(self, router, prefix, version, rebuilds) if profiler else nullcontext():
+            if self.deferred:
+                # only composition tree is recorded, API routes will be materialized by not deferred router
+                self._deferred_entries.append(DeferredInclude(router, prefix, version, include_kwargs))
+                router = without_api_routes(router)
+            elif isinstance(router, HeaderVersionedAPIRouter) and router.deferred:
+                for definition in router.iter_route_definitions():
+                    path, kwargs = self._include_definition(definition, router, prefix, include_kwargs)
+                    self.add_api_route(
+                        path,
+                        definition.endpoint,
+                        route_class_override=definition.route_class,
+                        **kwargs,
+                    )
+                    if issubclass(definition.route_class, HeaderVersionedAPIRoute):
+                        self.registered_versions.add(definition.route_class.api_version)
+                    if chain := getattr(definition.route_class, "api_migrations", None):
+                        self.registered_versions.update(chain.versions)
+
+            # deferred routers and copies made by without_api_routes contain only not API routes here
+            super().include_router(router=router, prefix=prefix, **include_kwargs)
         if isinstance(router, HeaderVersionedAPIRouter):
             self.registered_versions.update(router.registered_versions)
 
         self._context_version = None
 
-    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:  # noqa: C901
-        """
-        Mostly a duplicate of FastAPI implementation, but with ability to handle partially matched versions.
-        A lot of no-covers as there are a lot of edge cases handled exactly as fastapi does
-        """
-        assert scope["type"] in ("http", "websocket", "lifespan")  # noqa: S101
+    def migration_stats(self) -> dict[str, "MigrationStats"]:
+        """Requests and responses migrated by the routes of this router and time spent on it, by version"""
+        chains = {id(chain): chain for route in self.routes if (chain := getattr(route, "api_migrations", None))}
+        stats: dict[str, MigrationStats] = {}
+        for chain in chains.values():
+            for version, chain_stats in chain.stats().items():
+                stats[version] = stats[version] + chain_stats if version in stats else chain_stats
+
+        return stats
+
+    def get_routing_table(self) -> RoutingTable:
+        routing_table = self._routing_table
+        # any change of routes or registered versions (including direct ones, e.g. mounts) bumps the generation
+        if routing_table is None or self._routing_table_generation != self._generation:
+            if routing_table is not None:
+                self._release_retired_routes(routing_table.routes)
+            routing_table = self._routing_table = RoutingTable(
+                self.routes,
+                self.registered_versions,
+                self.selector_headers,
+            )
+            self._routing_table_generation = self._generation
+
+        return routing_table
+
+    def _release_retired_routes(self, previous_routes: Iterable[BaseRoute]) -> None:
+        if self.routes_pool is None:
+            return
 
-        if "router" not in scope:  # pragma: no cover
-            scope["router"] = self
+        routes = {id(route) for route in self.routes}
+        self.routes_pool.release(
+            route for route in previous_routes if isinstance(route, LazyVersionedRoute) and id(route) not in routes
+        )
 
-        if scope["type"] == "lifespan":  # pragma: no cover
-            await self.lifespan(scope, receive, send)
-            return
+    def invalidate_routing_table(self) -> None:
+        """Should be called if route objects themselves were changed, changes of routes list are tracked"""
+        self._routing_table = None
+
+    def build_snapshot(
+        self,
+        routes: Sequence[BaseRoute] | None = None,
+        registered_versions: Iterable[str | None] | None = None,
+        warm: bool = True,
+    ) -> RoutingTable:
+        """
+        Build routing snapshot for the given routes (e.g. routes of a staging router with versions added or removed)
+        without touching the serving state. Dispatch structures are precomputed if 'warm', so the first requests after
+        the swap don't pay for it.
+        """
+        routing_table = RoutingTable(
+            self.routes if routes is None else routes,
+            self.registered_versions if registered_versions is None else registered_versions,
+            self.selector_headers,
+        )
+        if warm:
+            routing_table.warm()
+        return routing_table
 
-        partial = None
-        partial_scope = None
+    def swap(self, routing_table: RoutingTable) -> RoutingTable | None:
+        """
+        Start serving the snapshot. Requests in flight keep routes they resolved, retired routes are released once
+        they are done. Must be called from the event loop thread - there are no awaits in between, so requests never
+        see partially replaced state. Returns the previous snapshot.
+        """
+        previous_routing_table = self._routing_table
+        # routes removed since the previous table was built are released as well
+        previous_routes = [*self.routes, *(previous_routing_table.routes if previous_routing_table is not None else ())]
+        self.routes = routing_table.routes
+        self.registered_versions = routing_table.version_index.versions
+        self._routing_table = routing_table
+        self._routing_table_generation = self._generation
+        self._release_retired_routes(previous_routes)
+        return previous_routing_table
+
+    def _resolve_version(self, scope: Scope, version_index: VersionIndex) -> VersionResolution:
         requested_version = scope.get("requested_version")
+        version_resolution: VersionResolution | None = scope.get("version_resolution")
+        # resolved by an outer router, unless the version was replaced since (e.g. by shadow traffic)
+        if version_resolution is not None and version_resolution.version == requested_version:
+            if version_resolution.version_index is version_index:
+                return version_resolution
+            requested_version = version_resolution.requested_version
+            # version sent by the client is reported if it's not found
+            scope["requested_version"] = requested_version
+
+        # if there are no such route with exactly the same version - just use the closest, but last version.
+        # eg - request passed with version header value "10.10.1", and app has only "9.0.0" and "11.0.0".
+        # we'll fallback to "9.0.0". It makes sense if there are many different services with independent
+        # release cycles. Thus, one service may release 100 different API versions and another - just 2. Clients
+        # will be able to use same header for requests to both services, not caring a lot about which versions are
+        # supported in each service.
+        version_to_use = version_index.resolve(requested_version)
+        version_resolution = scope["version_resolution"] = VersionResolution(
+            requested_version,
+            version_to_use,
+            version_index.api_versions[version_to_use] if version_to_use is not None else None,
+            version_index,
+            self,
+        )
+        return version_resolution
 
-        if requested_version is not None and requested_version not in self.registered_versions:
-            # there are no such route with exactly the same version - just use the closest, but last version.
-            # eg - request passed with version header value "10.10.1", and app has only "9.0.0" and "11.0.0".
-            # we'll fallback to "9.0.0". It makes sense if there are many different services with independent
-            # release cycles. Thus, one service may release 100 different API versions and another - just 2. Clients
-            # will be able to use same header for requests to both services, not caring a lot about which versions are
-            # supported in each service.
-            suitable_versions = []
-            for version in self.registered_versions:
-                if version is not None and version < requested_version:
-                    suitable_versions.append(version)
-
-            if not suitable_versions:
-                # this implementation will trigger 406 even on not versioned route if provided version is not registered
-                # however, it covers more real-world scenarios. proper distinguishing between 404 in case of not
-                # versioned route and 406 with not found version requires deep dive into starlette's Mount (used for
-                # doc generation) implementation which seems to be weird in case of further match processing
-                await handle_non_existing_version(scope, receive, send)
-                # it's not really executed as we'll return from function above, but for code readability it's better
-                # to have it
-                return  # pragma: no cover
-            version_to_use = max(suitable_versions)
-            scope["requested_version"] = version_to_use
-            # maybe we can generate more narrow set of routes at this point, but it's possible to optimize it later
-
-        for route in self.routes:
+    def resolve(self, scope: Scope, tracer: "RoutingTracer | None" = None) -> RouteResolution:
+        """
+        Pick the route for the request without handling it. Sets resolved version to scope["requested_version"],
+        interned APIVersion of it to scope["api_version"] and VersionResolution to scope["version_resolution"].
+        'tracer' - record candidates examined on the way, see explain_routing.
+        """
+        routing_table = self.get_routing_table()
+
+        try:
+            version_resolution = self._resolve_version(scope, routing_table.version_index)
+        except VersionNotFoundError:
+            # this implementation will trigger 406 even on not versioned route if provided version is not registered
+            # however, it covers more real-world scenarios. proper distinguishing between 404 in case of not
+            # versioned route and 406 with not found version requires deep dive into starlette's Mount (used for
+            # doc generation) implementation which seems to be weird in case of further match processing
+            return RouteResolution(ResolutionKind.VERSION_NOT_FOUND)
+
+        version_to_use = scope["requested_version"] = version_resolution.version
+        scope["api_version"] = version_resolution.api_version
+        if version_to_use in self.version_apps:
+            return RouteResolution(ResolutionKind.APP, version_to_use, app=self.version_apps[version_to_use])
+
+        selectors = routing_table.resolve_selectors(scope.get("requested_selectors", ()))
+        # only routes of resolved version and selectors are checked
+        candidates = routing_table.candidates(version_to_use, selectors)
+        if tracer is not None:
+            tracer.candidates(selectors, candidates)
+
+        for route in candidates:
             # Determine if any route matches the incoming scope,
             # and hand over to the matching route if found.
-            match, child_scope = route.matches(scope)
+            match, child_scope = route.matches(scope) if tracer is None else tracer.matches(route, scope)
             if match == Match.FULL:
-                scope.update(child_scope)
-                await route.handle(scope, receive, send)
-                return  # pragma: no cover
-
-            if match == Match.PARTIAL and partial is None:
-                partial = route
-                partial_scope = child_scope
-
-        if partial is not None:
-            # Handle partial matches. These are cases where an endpoint is
-            # able to handle the request, but is not a preferred option.
-            # We use this in particular to deal with "405 Method Not Allowed".
-            scope.update(partial_scope)  # pyright: ignore[reportGeneralTypeIssues]
-            await partial.handle(scope, receive, send)
-            return  # pragma: no cover
+                return RouteResolution(ResolutionKind.FULL, version_to_use, route, child_scope)
+
+        # path is served by the resolved version, but not with this method - methods of the first matching path
+        # template are looked up instead of tracking partial matches above
+        if scope["type"] == "http" and (
+            allowed_methods := routing_table.allowed_methods(version_to_use, selectors).lookup(scope["path"])
+        ):
+            return RouteResolution(ResolutionKind.PARTIAL, version_to_use, allowed_methods=allowed_methods)
 
         if scope["type"] == "http" and self.redirect_slashes and scope["path"] != "/":
             redirect_scope = dict(scope)
@@ -242,12 +747,102 @@ class HeaderVersionedAPIRouter(APIRouter):
             else:
                 redirect_scope["path"] = redirect_scope["path"] + "/"
 
-            for route in self.routes:
-                match, child_scope = route.matches(redirect_scope)
+            for route in candidates:
+                if tracer is None:
+                    match, child_scope = route.matches(redirect_scope)
+                else:
+                    match, child_scope = tracer.matches(route, redirect_scope, redirect=True)
                 if match != Match.NONE:
                     redirect_url = URL(scope=redirect_scope)
-                    response = RedirectResponse(url=str(redirect_url))
-                    await response(scope, receive, send)
-                    return
+                    return RouteResolution(
+                        ResolutionKind.REDIRECT,
+                        version_to_use,
+                        route,
+                        child_scope,
+                        redirect_url=str(redirect_url),
+                    )
+
+        return RouteResolution(ResolutionKind.NOT_FOUND, version_to_use)
+
+    async def _handle_route(
+        self,
+        resolution: RouteResolution,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        shadow_scope: Scope | None,
+    ) -> None:
+        if resolution.app is not None:
+            await resolution.app(scope, receive, send)
+            return
+
+        scope.update(resolution.child_scope)  # pyright: ignore[reportGeneralTypeIssues]
+        if shadow_scope is not None:
+            await self.shadow_traffic.handle(  # pyright: ignore[reportOptionalMemberAccess]
+                resolution,
+                scope,
+                shadow_scope,
+                receive,
+                send,
+                self.resolve,
+            )
+            return
+
+        await resolution.route.handle(scope, receive, send)  # pyright: ignore[reportOptionalMemberAccess]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Mostly a duplicate of FastAPI implementation, but with ability to handle partially matched versions.
+        A lot of no-covers as there are a lot of edge cases handled exactly as fastapi does
+        """
+        assert scope["type"] in ("http", "websocket", "lifespan")  # noqa: S101
+
+        if "router" not in scope:  # pragma: no cover
+            scope["router"] = self
+
+        if scope["type"] == "lifespan":  # pragma: no cover
+            await self.lifespan(scope, receive, send)
+            return
+
+        shadow_traffic = self.shadow_traffic
+        # copy is taken before resolution modifies the scope
+        shadow_scope = None
+        if shadow_traffic is not None and shadow_traffic.should_mirror(scope):
+            shadow_scope = shadow_traffic.copy_scope(scope, self)
+        resolution = self.resolve(scope)
+
+        if resolution.kind == ResolutionKind.VERSION_NOT_FOUND:
+            await handle_non_existing_version(scope, receive, send)
+            # it's not really executed as we'll return from function above, but for code readability it's better
+            # to have it
+            return  # pragma: no cover
+
+        if resolution.kind == ResolutionKind.PARTIAL:
+            await handle_method_not_allowed(
+                resolution.allowed_methods,  # pyright: ignore[reportGeneralTypeIssues]
+                scope,
+                receive,
+                send,
+            )
+            return  # pragma: no cover
+
+        if resolution.kind == ResolutionKind.FULL or resolution.kind == ResolutionKind.APP:
+            load_shedder = self.load_shedder
+            if load_shedder is None or scope["type"] != "http":
+                await self._handle_route(resolution, scope, receive, send, shadow_scope)
+                return
+
+            if load_shedder.should_shed(resolution.version):
+                await load_shedder.reject(send)
+                return
+
+            with load_shedder.track():
+                await self._handle_route(resolution, scope, receive, send, shadow_scope)
+            return
+
+        if resolution.kind == ResolutionKind.REDIRECT:
+            response = RedirectResponse(url=resolution.redirect_url)  # pyright: ignore[reportGeneralTypeIssues]
+            await response(scope, receive, send)
+            return
 
         await self.default(scope, receive, send)
@@ -0,0 +1,177 @@
+from collections.abc import Hashable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.openapi.constants import REF_PREFIX
+from fastapi.openapi.utils import get_openapi
+
+
+@dataclass
+class SchemaRegistryStats:
+    fragments: int = 0
+    # fragments of documents which were replaced by already registered equal ones
+    reused_fragments: int = 0
+
+
+def version_sort_key(version: str | None) -> tuple[bool, str]:
+    return version is not None, version or ""
+
+
+def rewrite_refs(fragment: Any, refs: Mapping[str, str]) -> Any:
+    """Copy of the fragment with replaced $ref values, parts without replaced refs are kept as is"""
+    if isinstance(fragment, dict):
+        rewritten = {
+            key: refs.get(value, value) if key == "$ref" else rewrite_refs(value, refs)
+            for key, value in fragment.items()
+        }
+        return fragment if all(rewritten[key] is value for key, value in fragment.items()) else rewritten
+    if isinstance(fragment, list):
+        rewritten_items = [rewrite_refs(value, refs) for value in fragment]
+        return (
+            fragment if all(new is old for new, old in zip(rewritten_items, fragment, strict=True)) else rewritten_items
+        )
+    return fragment
+
+
+def summary_and_webhooks(app: FastAPI) -> dict[str, Any]:
+    """Arguments of get_openapi which FastAPI supports since 0.99"""
+    arguments: dict[str, Any] = {}
+    if hasattr(app, "summary"):
+        arguments["summary"] = app.summary
+    if hasattr(app, "webhooks"):
+        arguments["webhooks"] = app.webhooks.routes
+    return arguments
+
+
+class SchemaRegistry:
+    """
+    Opt-in store shared by docs of the versions. Documents generated by FastAPI are interned by content - equal
+    fragments (component schemas, operations, parameters...) of different versions are the same objects.
+    Documents must be treated as read-only.
+    """
+
+    def __init__(self) -> None:
+        self._fragments: dict[Hashable, Any] = {}
+        self._stats = SchemaRegistryStats()
+
+    def _fragment_key(self, value: Any) -> Hashable:
+        # nested fragments are interned already, so their identity is their content
+        if isinstance(value, dict | list):
+            return id(value)
+        return type(value), value
+
+    def intern(self, fragment: Any) -> Any:
+        if isinstance(fragment, dict):
+            items = [(key, self.intern(value)) for key, value in fragment.items()]
+            key: Hashable = (dict, tuple((name, self._fragment_key(value)) for name, value in items))
+        elif isinstance(fragment, list):
+            items = [self.intern(value) for value in fragment]
+            key = (list, tuple(self._fragment_key(value) for value in items))
+        else:
+            return fragment
+
+        canonical = self._fragments.get(key)
+        if canonical is None:
+            canonical = self._fragments[key] = dict(items) if isinstance(fragment, dict) else items
+        else:
+            self._stats.reused_fragments += 1
+        return canonical
+
+    def openapi(self, app: FastAPI) -> dict[str, Any]:
+        """Interned document which FastAPI.openapi generates for the app"""
+        return self.intern(
+            get_openapi(
+                title=app.title,
+                version=app.version,
+                openapi_version=app.openapi_version,
+                description=app.description,
+                terms_of_service=app.terms_of_service,
+                contact=app.contact,
+                license_info=app.license_info,
+                routes=app.routes,
+                tags=app.openapi_tags,
+                servers=app.servers,
+                **summary_and_webhooks(app),
+            ),
+        )
+
+    def combine(self, documents: Mapping[str | None, dict[str, Any]], info: dict[str, Any]) -> dict[str, Any]:
+        """
+        Single document of all the versions. Operation is listed once with "x-versions" it's served in, operations
+        which differ between versions are listed under "x-version-variants" of the latest one. Component schemas
+        which differ between versions get version suffix.
+        """
+        versions = sorted(documents, key=version_sort_key)
+        # no-op for documents of this registry
+        documents = {version: self.intern(documents[version]) for version in versions}
+        components, version_refs = self._combine_components(documents)
+        paths = self._combine_paths(documents, version_refs)
+        openapi_version = next((document["openapi"] for document in documents.values()), "3.1.0")
+        output: dict[str, Any] = {"openapi": openapi_version, "info": info, "paths": paths}
+        if components:
+            output["components"] = components
+        return output
+
+    def _combine_components(
+        self,
+        documents: dict[str | None, dict[str, Any]],
+    ) -> tuple[dict[str, Any], dict[str | None, dict[str, str]]]:
+        versions = list(documents)
+        schema_variants: dict[str, dict[int, tuple[Any, list[str | None]]]] = {}
+        for version in versions:
+            for name, schema in documents[version].get("components", {}).get("schemas", {}).items():
+                variants = schema_variants.setdefault(name, {})
+                variants.setdefault(id(schema), (schema, []))[1].append(version)
+
+        schemas: dict[str, Any] = {}
+        version_refs: dict[str | None, dict[str, str]] = {version: {} for version in versions}
+        for name, variants in schema_variants.items():
+            for schema, schema_versions in variants.values():
+                schema_name = name
+                if len(variants) > 1:
+                    schema_name = f"{name}__{schema_versions[0] or 'no_version'}"
+                    for version in schema_versions:
+                        version_refs[version][REF_PREFIX + name] = REF_PREFIX + schema_name
+                schemas[schema_name] = (schema, schema_versions)
+
+        components: dict[str, Any] = {}
+        for name, (schema, schema_versions) in schemas.items():
+            components.setdefault("schemas", {})[name] = self.intern(
+                rewrite_refs(schema, version_refs[schema_versions[0]]),
+            )
+        for version in versions:
+            for section, section_components in documents[version].get("components", {}).items():
+                if section != "schemas":
+                    for name, component in section_components.items():
+                        components.setdefault(section, {}).setdefault(name, component)
+        return components, version_refs
+
+    def _combine_paths(
+        self,
+        documents: dict[str | None, dict[str, Any]],
+        version_refs: dict[str | None, dict[str, str]],
+    ) -> dict[str, dict[str, Any]]:
+        versions = list(documents)
+        operations: dict[tuple[str, str], dict[int, tuple[Any, list[str | None]]]] = {}
+        for version in versions:
+            for path, path_item in documents[version].get("paths", {}).items():
+                for method, operation in path_item.items():
+                    operation = self.intern(rewrite_refs(operation, version_refs[version]))  # noqa: PLW2901
+                    variants = operations.setdefault((path, method), {})
+                    variants.setdefault(id(operation), (operation, []))[1].append(version)
+
+        paths: dict[str, dict[str, Any]] = {}
+        for (path, method), variants in operations.items():
+            latest_variant = max(variants, key=lambda variant_id: version_sort_key(variants[variant_id][1][-1]))
+            operation, operation_versions = variants.pop(latest_variant)
+            combined_operation = {**operation, "x-versions": operation_versions}
+            if variants:
+                combined_operation["x-version-variants"] = [
+                    {**variant, "x-versions": variant_versions} for variant, variant_versions in variants.values()
+                ]
+            paths.setdefault(path, {})[method] = combined_operation
+        return paths
+
+    def stats(self) -> SchemaRegistryStats:
+        return SchemaRegistryStats(**{**vars(self._stats), "fragments": len(self._fragments)})
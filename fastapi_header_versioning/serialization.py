@@ -0,0 +1,129 @@
+import asyncio
+import copy
+from collections.abc import Callable, Coroutine
+from functools import cache
+from typing import Any
+
+from fastapi.datastructures import DefaultPlaceholder
+
+try:
+    from fastapi.exceptions import ResponseValidationError
+except ImportError:  # pragma: no cover - FastAPI before 0.100 raises pydantic ValidationError as is
+    ResponseValidationError = None
+from fastapi.routing import APIRoute, _prepare_response_content, get_request_handler
+from pydantic import BaseConfig, BaseModel, ValidationError, create_model
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+# same output as JSONResponse.render
+JSON_DUMPS_KWARGS = {"ensure_ascii": False, "allow_nan": False, "indent": None, "separators": (",", ":")}
+
+
+class RenderedJSON(str):
+    """Response body rendered by the endpoint wrapper, FastAPI serialization passes str through as is"""
+
+
+class RenderedJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, RenderedJSON):
+            return content.encode("utf-8")
+        return super().render(content)
+
+
+@cache
+def response_serializer(response_type: Any) -> type[BaseModel]:
+    """
+    Custom root model rendering content of 'response_type' in a single pass: .dict() followed by json.dumps with
+    pydantic encoder. Built once per response model and shared by all the routes (and versions) returning it.
+    """
+    json_encoders = getattr(getattr(response_type, "__config__", BaseConfig), "json_encoders", {})
+    config = type("Config", (BaseConfig,), {"json_encoders": json_encoders})
+    name = getattr(response_type, "__name__", "Response")
+    return create_model(f"{name}Serializer", __config__=config, __root__=(Any, ...))
+
+
+class FastSerializationAPIRoute(APIRoute):
+    """
+    Renders JSON responses directly into the body: handler output is validated against response model and dumped,
+    without FastAPI's jsonable_encoder pass over validated content. Serializer is prepared when the route is built.
+
+    Routes with non-JSON response class or response_model_include/exclude use regular FastAPI serialization.
+    """
+
+    # False - handler output is trusted to match the response model: it's neither validated nor filtered by the model
+    validate_response = True
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        response_class = self.response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        if (
+            response_class is not JSONResponse
+            or self.response_model_include is not None
+            or self.response_model_exclude is not None
+        ):
+            return super().get_route_handler()
+
+        response_field = self.secure_cloned_response_field
+        self.serialized_response_field = response_field if self.validate_response else None
+        self.response_serializer = response_serializer(response_field.type_ if response_field else None)
+
+        dependant = copy.copy(self.dependant)
+        dependant.call = self._rendering_endpoint(self.dependant.call)  # pyright: ignore[reportGeneralTypeIssues]
+        return get_request_handler(
+            dependant=dependant,
+            body_field=self.body_field,
+            status_code=self.status_code,
+            response_class=RenderedJSONResponse,
+            dependency_overrides_provider=self.dependency_overrides_provider,
+        )
+
+    def _rendering_endpoint(self, endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        # endpoint kind is kept, sync endpoints are rendered in threadpool along with the handler
+        if asyncio.iscoroutinefunction(endpoint):
+
+            async def rendering_endpoint(**values: Any) -> Any:
+                return self.render(await endpoint(**values))
+
+        else:
+
+            def rendering_endpoint(**values: Any) -> Any:
+                return self.render(endpoint(**values))
+
+        return rendering_endpoint
+
+    def render(self, content: Any) -> Any:
+        if isinstance(content, Response):
+            return content
+
+        field = self.serialized_response_field
+        if field is not None:
+            response_content = _prepare_response_content(
+                content,
+                exclude_unset=self.response_model_exclude_unset,
+                exclude_defaults=self.response_model_exclude_defaults,
+                exclude_none=self.response_model_exclude_none,
+            )
+            content, errors = field.validate(response_content, {}, loc=("response",))
+            if errors:
+                # same error as FastAPI serialize_response raises
+                error = ValidationError([errors], field.type_)  # pyright: ignore[reportGeneralTypeIssues]
+                if ResponseValidationError is None:  # pragma: no cover - FastAPI before 0.100
+                    raise error
+                raise ResponseValidationError(errors=error.errors(), body=response_content)
+
+        return RenderedJSON(
+            self.response_serializer.construct(__root__=content).json(
+                by_alias=self.response_model_by_alias,
+                exclude_unset=self.response_model_exclude_unset,
+                exclude_defaults=self.response_model_exclude_defaults,
+                exclude_none=self.response_model_exclude_none,
+                **JSON_DUMPS_KWARGS,
+            ),
+        )
+
+
+class TrustedSerializationAPIRoute(FastSerializationAPIRoute):
+    """Handler output is dumped as is, e.g. for huge legacy payloads built by the handler in response model shape"""
+
+    validate_response = False
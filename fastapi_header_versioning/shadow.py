@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Callable, Sequence
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import Any
+
+from starlette.routing import BaseRoute, Router
+from starlette.types import Message, Receive, Scope, Send
+
+from .dispatch import ResolutionKind, RouteResolution
+
+logger = logging.getLogger(__name__)
+
+Resolver = Callable[[Scope], RouteResolution]
+
+# state of the framework for the primary request, it's set up anew for the copy
+PER_REQUEST_SCOPE_KEYS = frozenset(
+    ("fastapi_astack", "router", "endpoint", "route", "path_params", "version_resolution", "api_version"),
+)
+
+
+@dataclass
+class LatencyStats:
+    requests: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    status_codes: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.requests if self.requests else 0.0
+
+    def record(self, seconds: float, status_code: int) -> None:
+        self.requests += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+
+
+@dataclass
+class ShadowRouteStats:
+    method: str
+    path: str
+    primary_version: str | None
+    candidate_version: str
+    primary: LatencyStats = field(default_factory=LatencyStats)
+    candidate: LatencyStats = field(default_factory=LatencyStats)
+    # sampled, but not mirrored - candidate version has no other route for the request or body was not read
+    skipped: int = 0
+
+
+def has_body(scope: Scope) -> bool:
+    headers = dict(scope["headers"])
+    return b"transfer-encoding" in headers or headers.get(b"content-length", b"0") != b"0"
+
+
+class BodyRecorder:
+    """Keeps request body chunks read by the primary handler, so the body is received once and shared with the copy"""
+
+    def __init__(self, receive: Receive) -> None:
+        self._receive = receive
+        self.chunks: list[bytes] = []
+        self.complete = False
+
+    async def receive(self) -> Message:
+        message = await self._receive()
+        if message["type"] == "http.request":
+            self.chunks.append(message.get("body", b""))
+            self.complete = not message.get("more_body", False)
+        return message
+
+
+class ShadowTraffic:
+    """
+    Mirrors sampled requests to the same path under the candidate version. The copy is handled by a detached task
+    started after the primary response was sent, its response is discarded. Only latency and status codes of both
+    versions are recorded, per route.
+
+    Only safe methods are mirrored by default - the copy is a real request to the candidate handler.
+    """
+
+    def __init__(
+        self,
+        candidate_version: str,
+        sample_rate: float = 0.01,
+        methods: Sequence[str] = ("GET", "HEAD"),
+        seed: int | None = None,
+    ) -> None:
+        self.candidate_version = candidate_version
+        self.sample_rate = sample_rate
+        self.methods = frozenset(methods)
+        self.random = random.Random(seed)
+        self.stats: dict[tuple[str, str, str | None], ShadowRouteStats] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def should_mirror(self, scope: Scope) -> bool:
+        return (
+            scope["type"] == "http"
+            and scope["method"] in self.methods
+            and scope.get("requested_version") != self.candidate_version
+            and self.random.random() < self.sample_rate
+        )
+
+    def copy_scope(self, scope: Scope, router: Router) -> Scope:
+        """Scope of the copy - request data of 'scope' without per-request state of the framework"""
+        shadow_scope = {key: value for key, value in scope.items() if key not in PER_REQUEST_SCOPE_KEYS}
+        shadow_scope["router"] = router
+        if "state" in scope:
+            shadow_scope["state"] = dict(scope["state"])
+        return shadow_scope
+
+    def route_stats(self, scope: Scope, route: BaseRoute, version: str | None) -> ShadowRouteStats:
+        key = (scope["method"], getattr(route, "path", scope["path"]), version)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = ShadowRouteStats(*key, candidate_version=self.candidate_version)
+        return stats
+
+    async def handle(
+        self,
+        resolution: RouteResolution,
+        scope: Scope,
+        shadow_scope: Scope,
+        receive: Receive,
+        send: Send,
+        resolve: Resolver,
+    ) -> None:
+        """Handle the request by resolved route, recording primary status and latency, then schedule the copy"""
+        route: BaseRoute = resolution.route  # pyright: ignore[reportGeneralTypeIssues]
+        stats = self.route_stats(scope, route, resolution.version)
+        recorder = BodyRecorder(receive)
+        status_code = 500
+
+        async def recording_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await route.handle(scope, recorder.receive, recording_send)
+        except Exception as exc:
+            status_code = getattr(exc, "status_code", 500)
+            raise
+        finally:
+            stats.primary.record(time.perf_counter() - started, status_code)
+            if recorder.complete or not has_body(shadow_scope):
+                self.schedule(self.mirror(stats, route, shadow_scope, b"".join(recorder.chunks), resolve))
+            else:
+                stats.skipped += 1
+
+    def schedule(self, coroutine: Any) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        # keep a reference until the task is done, event loop keeps only weak ones
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def mirror(
+        self,
+        stats: ShadowRouteStats,
+        primary_route: BaseRoute,
+        shadow_scope: Scope,
+        body: bytes,
+        resolve: Resolver,
+    ) -> None:
+        shadow_scope["requested_version"] = self.candidate_version
+        resolution = resolve(shadow_scope)
+        if resolution.kind != ResolutionKind.FULL or resolution.route is primary_route:
+            stats.skipped += 1
+            return
+
+        shadow_route: BaseRoute = resolution.route  # pyright: ignore[reportGeneralTypeIssues]
+        shadow_scope.update(resolution.child_scope)  # pyright: ignore[reportGeneralTypeIssues]
+        body_sent = False
+        status_code = 500
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return {"type": "http.disconnect"}
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def discard_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        started = time.perf_counter()
+        try:
+            # the same as AsyncExitStackMiddleware does for the primary request - teardown of yield dependencies
+            async with AsyncExitStack() as stack:
+                shadow_scope["fastapi_astack"] = stack
+                await shadow_route.handle(shadow_scope, replay_receive, discard_send)
+        except Exception as exc:  # noqa: BLE001
+            status_code = getattr(exc, "status_code", 500)
+            logger.debug("Shadow request to version %s failed", self.candidate_version, exc_info=True)
+        stats.candidate.record(time.perf_counter() - started, status_code)
+
+    async def drain(self) -> None:
+        """Wait for all the scheduled copies to complete"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Iterator, Mapping
+from contextlib import asynccontextmanager, contextmanager, suppress
+from typing import Any
+
+from starlette.types import Send
+
+from .mounts import LifespanContext
+
+
+class LoadShedder:
+    """
+    Rejects requests of low priority versions with 503 while the worker is overloaded - event loop lag measured by a
+    periodic probe is over 'max_loop_lag' seconds, or there are 'max_in_flight' requests handled already.
+
+    Versions with priority lower or equal to 'shed_priority' are shed, versions missing in 'priorities' get
+    'default_priority'.
+    """
+
+    def __init__(
+        self,
+        priorities: Mapping[str | None, int],
+        default_priority: int = 1,
+        shed_priority: int = 0,
+        max_loop_lag: float = 0.1,
+        max_in_flight: int | None = None,
+        probe_interval: float = 0.05,
+        retry_after: int = 1,
+    ) -> None:
+        self.priorities = dict(priorities)
+        self.default_priority = default_priority
+        self.shed_priority = shed_priority
+        self.max_loop_lag = max_loop_lag
+        self.max_in_flight = max_in_flight
+        self.probe_interval = probe_interval
+        self.loop_lag = 0.0
+        self.in_flight = 0
+        self.shed_counts: dict[str | None, int] = {}
+        self._probe_task: asyncio.Task | None = None
+        # response is rendered once, rejection doesn't allocate anything
+        body = b"Service Unavailable"
+        self._start_message = {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        }
+        self._body_message = {"type": "http.response.body", "body": body, "more_body": False}
+
+    @property
+    def overloaded(self) -> bool:
+        return self.loop_lag > self.max_loop_lag or (
+            self.max_in_flight is not None and self.in_flight >= self.max_in_flight
+        )
+
+    def should_shed(self, version: str | None) -> bool:
+        self.ensure_probe()
+        if self.priorities.get(version, self.default_priority) > self.shed_priority or not self.overloaded:
+            return False
+
+        self.shed_counts[version] = self.shed_counts.get(version, 0) + 1
+        return True
+
+    async def reject(self, send: Send) -> None:
+        await send(self._start_message)
+        await send(self._body_message)
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def ensure_probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        # probe is bound to event loop, e.g. test clients may run each request in a new one
+        if self._probe_task is None or self._probe_task.get_loop() is not loop:
+            self._probe_task = loop.create_task(self.probe())
+
+    async def stop_probe(self) -> None:
+        task, self._probe_task = self._probe_task, None
+        # task of another (already closed) event loop is just released
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def lifespan(self, lifespan_context: LifespanContext) -> LifespanContext:
+        """Wrap router lifespan, so the probe is stopped on shutdown"""
+
+        @asynccontextmanager
+        async def lifespan(app: Any) -> AsyncIterator[Any]:
+            try:
+                async with lifespan_context(app) as state:
+                    yield state
+            finally:
+                await self.stop_probe()
+
+        return lifespan
+
+    async def probe(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.probe_interval)
+            self.loop_lag = max(time.perf_counter() - started - self.probe_interval, 0.0)
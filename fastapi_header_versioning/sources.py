@@ -0,0 +1,146 @@
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, ClassVar
+from urllib.parse import unquote_plus
+
+from starlette.types import Scope
+
+
+class VersionSource:
+    kind: ClassVar[str]
+
+
+@dataclass(frozen=True)
+class HeaderVersionSource(VersionSource):
+    """Version header value as is, e.g. 'x-version: 2'"""
+
+    header: str
+    kind: ClassVar[str] = "header"
+
+
+@dataclass(frozen=True)
+class MediaTypeVersionSource(VersionSource):
+    """Media type parameter, e.g. 'Accept: application/json; version=2'"""
+
+    parameter: str = "version"
+    header: str = "accept"
+    kind: ClassVar[str] = "media_type"
+
+
+@dataclass(frozen=True)
+class QueryVersionSource(VersionSource):
+    """Query parameter, e.g. '?api-version=2'"""
+
+    parameter: str = "api-version"
+    kind: ClassVar[str] = "query"
+
+
+@dataclass(frozen=True)
+class PathVersionSource(VersionSource):
+    """
+    Optional leading path segment, e.g. '/v2/items'. Segment is always stripped from the path (moved to root_path, same
+    as Mount does), so routes are declared without it.
+    """
+
+    prefix: str = "v"
+    pattern: str = r"[0-9][^/]*"
+    kind: ClassVar[str] = "path"
+
+
+def find_media_type_parameter(value: str, parameter: str) -> str | None:
+    # lightweight scan instead of full media type parsing: "type/subtype; name=value; ..., type/subtype; ..."
+    for media_range in value.split(","):
+        for media_parameter in media_range.split(";")[1:]:
+            name, separator, parameter_value = media_parameter.partition("=")
+            if separator and name.strip().lower() == parameter:
+                return parameter_value.strip().strip('"')
+
+    return None
+
+
+def find_query_parameter(query_string: bytes, parameter: bytes) -> str | None:
+    # looks for the single parameter without parsing the whole query string
+    position = query_string.find(parameter)
+    while position != -1:
+        if position == 0 or query_string[position - 1 : position] == b"&":
+            start = position + len(parameter)
+            end = query_string.find(b"&", start)
+            return unquote_plus(query_string[start : end if end != -1 else None].decode("latin-1"))
+
+        position = query_string.find(parameter, position + 1)
+
+    return None
+
+
+class VersionExtractor:
+    """
+    Compiled extraction of requested version and selectors. All the headers required by sources and selectors are read
+    in a single pass over raw headers, sources are checked in order and the first one provided a value wins.
+    """
+
+    def __init__(self, sources: Sequence[VersionSource], selector_headers: Sequence[str] = ()) -> None:
+        if not sources:
+            raise ValueError("At least one version source is required")
+
+        self.sources = tuple(sources)
+        self.selectors_count = len(selector_headers)
+        # header name -> position in extracted values. selectors go first, then headers used by sources
+        self.extracted_headers: dict[bytes, int] = {
+            header.lower().encode(): position for position, header in enumerate(selector_headers)
+        }
+        self._steps: list[tuple[str, int, Any]] = []
+        self._path_pattern: re.Pattern | None = None
+        for source in self.sources:
+            if isinstance(source, HeaderVersionSource | MediaTypeVersionSource):
+                header = source.header.lower().encode()
+                position = self.extracted_headers.setdefault(header, len(self.extracted_headers))
+                argument = source.parameter.lower() if isinstance(source, MediaTypeVersionSource) else None
+                self._steps.append((source.kind, position, argument))
+            elif isinstance(source, QueryVersionSource):
+                self._steps.append((source.kind, -1, f"{source.parameter}=".encode()))
+            elif isinstance(source, PathVersionSource):
+                if self._path_pattern is not None:
+                    raise ValueError("Only one path version source is supported")
+                self._path_pattern = re.compile(rf"/{re.escape(source.prefix)}(?P<version>{source.pattern})(?=/|$)")
+                self._steps.append((source.kind, -1, None))
+            else:
+                raise TypeError(f"Unsupported version source {source!r}")
+
+        self.values_count = len(self.extracted_headers)
+
+    def __call__(self, scope: Scope) -> None:
+        values: list[str | None] = [None] * self.values_count
+        # last value wins, same as for dict()
+        for header, value in scope["headers"]:
+            position = self.extracted_headers.get(header)
+            if position is not None:
+                values[position] = value.decode()
+
+        path_version = None
+        if self._path_pattern is not None and (match := self._path_pattern.match(scope["path"])):
+            # path segment is stripped even if version is provided by source with higher priority
+            scope["path"] = scope["path"][match.end() :] or "/"
+            scope["root_path"] = scope.get("root_path", "") + match.group(0)
+            path_version = match.group("version")
+
+        requested_version = None
+        version_source = None
+        for kind, position, argument in self._steps:
+            if kind == HeaderVersionSource.kind:
+                requested_version = values[position]
+            elif kind == MediaTypeVersionSource.kind:
+                if (header_value := values[position]) is not None:
+                    requested_version = find_media_type_parameter(header_value, argument)
+            elif kind == QueryVersionSource.kind:
+                requested_version = find_query_parameter(scope.get("query_string", b""), argument)
+            else:
+                requested_version = path_version
+
+            if requested_version is not None:
+                version_source = kind
+                break
+
+        scope["requested_version"] = requested_version
+        scope["version_source"] = version_source
+        scope["requested_selectors"] = tuple(values[: self.selectors_count])
@@ -0,0 +1,52 @@
+"""In-process requests to an ASGI app, without network and test client layers"""
+
+from dataclasses import dataclass
+
+from starlette.types import ASGIApp, Message, Scope
+
+
+@dataclass(frozen=True)
+class SyntheticRequest:
+    method: str
+    path: str
+    headers: tuple[tuple[str, str], ...] = ()
+    body: bytes = b""
+
+    def scope(self) -> Scope:
+        path, _, query_string = self.path.partition("?")
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": self.method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": query_string.encode(),
+            "headers": [(name.lower().encode(), value.encode()) for name, value in self.headers]
+            + [(b"content-length", str(len(self.body)).encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+
+
+async def dispatch(app: ASGIApp, request: SyntheticRequest, scope: Scope | None = None) -> int:
+    """Handle the request in-process, 'scope' - built by request.scope() already. Returns response status code"""
+    body_sent = False
+    status_code = 0
+
+    async def receive() -> Message:
+        nonlocal body_sent
+        if body_sent:
+            return {"type": "http.disconnect"}
+        body_sent = True
+        return {"type": "http.request", "body": request.body, "more_body": False}
+
+    async def send(message: Message) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(request.scope() if scope is None else scope, receive, send)
+    return status_code
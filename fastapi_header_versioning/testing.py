@@ -0,0 +1,362 @@
+"""
+Differential testing of HeaderVersionedAPIRouter dispatch. Random request scopes are resolved by the plain linear
+reference implementation and by an optimized resolver (router.resolve by default), first diverging case is reported
+with a minimized reproducer.
+
+reference_resolve is a specification model of the current dispatch rules, not a copy of the original router. Where the
+rules deliberately differ from the original linear HeaderVersionedAPIRouter.__call__ - modelled by baseline_resolve -
+is listed in reference_resolve docstring.
+"""
+
+import random
+import re
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import FastAPI
+from starlette.datastructures import URL
+from starlette.routing import BaseRoute, Match, Mount, Route
+
+from .dispatch import ResolutionKind, RouteResolution, route_selectors
+from .lazy import LazyVersionedRoute
+from .routing import HeaderVersionedAPIRouter
+
+Resolver = Callable[[dict[str, Any]], RouteResolution]
+
+METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")
+PATH_PARAMETER = re.compile(r"{[^}]+}")
+
+
+def get_router(app: FastAPI | HeaderVersionedAPIRouter) -> HeaderVersionedAPIRouter:
+    router = app.router if isinstance(app, FastAPI) else app
+    if not isinstance(router, HeaderVersionedAPIRouter):
+        raise TypeError("HeaderRoutingFastAPI or HeaderVersionedAPIRouter is required")
+    return router
+
+
+def reference_specificity(route: BaseRoute, version: str | None, selectors: list[str | None]) -> int | None:
+    serves_version = getattr(route, "serves_version", None)
+    if serves_version is not None and not serves_version(version):
+        return None
+
+    matched = 0
+    for dimension, value in enumerate(route_selectors(route)):
+        if value is None:
+            continue
+        if dimension >= len(selectors) or value != selectors[dimension]:
+            return None
+        matched += 1
+    return matched
+
+
+def reference_match(
+    router: HeaderVersionedAPIRouter,
+    scope: dict[str, Any],
+    version: str | None,
+    selectors: list[str | None],
+    accepted: tuple[Match, ...],
+) -> tuple[BaseRoute, dict[str, Any]] | None:
+    # route bound to more selectors wins, the first declared one otherwise
+    best = None
+    best_specificity = -1
+    for route in router.routes:
+        specificity = reference_specificity(route, version, selectors)
+        if specificity is None or specificity <= best_specificity:
+            continue
+        match, child_scope = route.matches(scope)
+        if match in accepted:
+            best = route, child_scope
+            best_specificity = specificity
+    return best
+
+
+def baseline_resolve(router: HeaderVersionedAPIRouter, scope: dict[str, Any]) -> RouteResolution:
+    """
+    Model of the original linear HeaderVersionedAPIRouter.__call__: closest lower version fallback, then the first
+    route of the declaration order which fully matches, the first partially matched route of any version and the first
+    route of any version matching the path with toggled trailing slash. It knows nothing of selectors and mounted
+    versions.
+    """
+    requested_version = scope.get("requested_version")
+    version = requested_version
+    if requested_version is not None and requested_version not in router.registered_versions:
+        suitable_versions = [
+            registered_version
+            for registered_version in router.registered_versions
+            if registered_version is not None and registered_version < requested_version
+        ]
+        if not suitable_versions:
+            return RouteResolution(ResolutionKind.VERSION_NOT_FOUND)
+        version = scope["requested_version"] = max(suitable_versions)
+
+    partial = None
+    for route in router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return RouteResolution(ResolutionKind.FULL, version, route, child_scope)
+        if match == Match.PARTIAL and partial is None:
+            partial = route
+
+    if partial is not None:
+        return RouteResolution(
+            ResolutionKind.PARTIAL,
+            version,
+            allowed_methods=frozenset(getattr(partial, "methods", None) or ()),
+        )
+
+    if scope["type"] == "http" and router.redirect_slashes and scope["path"] != "/":
+        redirect_scope = dict(scope)
+        if scope["path"].endswith("/"):
+            redirect_scope["path"] = redirect_scope["path"].rstrip("/")
+        else:
+            redirect_scope["path"] = redirect_scope["path"] + "/"
+        for route in router.routes:
+            match, child_scope = route.matches(redirect_scope)
+            if match != Match.NONE:
+                return RouteResolution(
+                    ResolutionKind.REDIRECT,
+                    version,
+                    route,
+                    child_scope,
+                    redirect_url=str(URL(scope=redirect_scope)),
+                )
+
+    return RouteResolution(ResolutionKind.NOT_FOUND, version)
+
+
+def reference_resolve(router: HeaderVersionedAPIRouter, scope: dict[str, Any]) -> RouteResolution:
+    """
+    Straightforward linear implementation of the current dispatch rules, without any precomputed structures. It agrees
+    with baseline_resolve on found routes, version fallback and 406, except for:
+
+    - 405 is returned only if a route of the resolved version matches the path, and lists methods of all of them. The
+      original router answered 405 for a path matched by a route of any version, with methods of that route only
+    - redirect to the path with toggled trailing slash requires a route of the resolved version as well
+    - route bound to more selectors wins over the first declared one, versions can be served by mounted apps
+    """
+    requested_version = scope.get("requested_version")
+    version = requested_version
+    if requested_version is not None and requested_version not in router.registered_versions:
+        suitable_versions = [
+            registered_version
+            for registered_version in router.registered_versions
+            if registered_version is not None and registered_version < requested_version
+        ]
+        if not suitable_versions:
+            return RouteResolution(ResolutionKind.VERSION_NOT_FOUND)
+        version = max(suitable_versions)
+
+    scope["requested_version"] = version
+    if version in router.version_apps:
+        return RouteResolution(ResolutionKind.APP, version, app=router.version_apps[version])
+
+    requested_selectors = scope.get("requested_selectors", ())
+    selectors = []
+    for dimension, selector_header in enumerate(router.selector_headers):
+        value = requested_selectors[dimension] if dimension < len(requested_selectors) else None
+        if value is None or not any(
+            dimension < len(route_selectors(route)) and route_selectors(route)[dimension] == value
+            for route in router.routes
+        ):
+            value = selector_header.fallback
+        selectors.append(value)
+
+    if full := reference_match(router, scope, version, selectors, (Match.FULL,)):
+        return RouteResolution(ResolutionKind.FULL, version, *full)
+
+    if partial := reference_match(router, scope, version, selectors, (Match.PARTIAL,)):
+        # 405 lists methods of all the routes with the same path template
+        path_pattern = partial[0].path_regex.pattern  # pyright: ignore[reportGeneralTypeIssues]
+        allowed_methods = {
+            method
+            for route in router.routes
+            if isinstance(route, Route | LazyVersionedRoute)
+            and route.path_regex.pattern == path_pattern
+            and reference_specificity(route, version, selectors) is not None
+            for method in route.methods or ()
+        }
+        return RouteResolution(ResolutionKind.PARTIAL, version, allowed_methods=frozenset(allowed_methods))
+
+    if scope["type"] == "http" and router.redirect_slashes and scope["path"] != "/":
+        redirect_scope = dict(scope)
+        if scope["path"].endswith("/"):
+            redirect_scope["path"] = redirect_scope["path"].rstrip("/")
+        else:
+            redirect_scope["path"] = redirect_scope["path"] + "/"
+        if redirect := reference_match(router, redirect_scope, version, selectors, (Match.FULL, Match.PARTIAL)):
+            return RouteResolution(
+                ResolutionKind.REDIRECT,
+                version,
+                *redirect,
+                redirect_url=str(URL(scope=redirect_scope)),
+            )
+
+    return RouteResolution(ResolutionKind.NOT_FOUND, version)
+
+
+def describe_resolution(resolution: RouteResolution) -> tuple:
+    path_params = (resolution.child_scope or {}).get("path_params")
+    return (
+        resolution.kind,
+        resolution.version,
+        id(resolution.route),
+        path_params,
+        resolution.redirect_url,
+        resolution.allowed_methods,
+        id(resolution.app),
+    )
+
+
+def route_repr(route: BaseRoute | None) -> str:
+    if route is None:
+        return "-"
+    methods = ",".join(sorted(getattr(route, "methods", None) or []))
+    version = getattr(route, "api_version", None)
+    return f"{type(route).__name__}({methods} {getattr(route, 'path', '?')}, version={version!r})"
+
+
+def scope_repr(scope: dict[str, Any]) -> str:
+    version = scope.get("requested_version")
+    selectors = scope.get("requested_selectors")
+    return f"{scope['method']} {scope['path']} version={version!r} selectors={selectors!r}"
+
+
+@dataclass
+class Divergence:
+    scope: dict[str, Any]
+    minimized_scope: dict[str, Any]
+    reference: RouteResolution
+    optimized: RouteResolution
+
+    def __str__(self) -> str:
+        return "\n".join(
+            [
+                f"Routing divergence for {scope_repr(self.minimized_scope)}",
+                f"  reference: {self.reference.kind.value} {route_repr(self.reference.route)}",
+                f"  optimized: {self.optimized.kind.value} {route_repr(self.optimized.route)}",
+                f"  original scope: {scope_repr(self.scope)}",
+            ],
+        )
+
+
+class ScopeGenerator:
+    """Random request scopes built from the app routes: paths, methods, version values and trailing slashes"""
+
+    def __init__(self, router: HeaderVersionedAPIRouter, seed: int = 0) -> None:
+        self.random = random.Random(seed)
+        self.paths = sorted({getattr(route, "path", "/") for route in router.routes} | {"/", "/not-existing"})
+        self.paths += [f"{route.path}/openapi.json" for route in router.routes if isinstance(route, Mount)]
+        registered_versions = sorted(version for version in router.registered_versions if version is not None)
+        self.versions: list[str | None] = [None, "0", "999", *registered_versions]
+        self.versions += [f"{version}.5" for version in registered_versions]
+        selector_values: set[str | None] = {None, "unknown"}
+        for route in router.routes:
+            selector_values.update(route_selectors(route))
+        self.selector_values = sorted(selector_values, key=str)
+        self.selectors_count = len(router.selector_headers)
+
+    def path(self) -> str:
+        path = PATH_PARAMETER.sub(lambda _: self.random.choice(["1", "foo", "a-b"]), self.random.choice(self.paths))
+        if self.random.random() < 0.3:
+            path = path.rstrip("/") if path.endswith("/") else path + "/"
+        return path or "/"
+
+    def scope(self) -> dict[str, Any]:
+        return build_scope(
+            method=self.random.choice(METHODS),
+            path=self.path(),
+            requested_version=self.random.choice(self.versions),
+            requested_selectors=tuple(self.random.choice(self.selector_values) for _ in range(self.selectors_count)),
+        )
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        while True:
+            yield self.scope()
+
+
+def build_scope(
+    method: str,
+    path: str,
+    requested_version: str | None = None,
+    requested_selectors: tuple[str | None, ...] = (),
+) -> dict[str, Any]:
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "root_path": "",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "query_string": b"",
+        "headers": [],
+        "requested_version": requested_version,
+        "requested_selectors": requested_selectors,
+    }
+
+
+def simplifications(scope: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    if scope["method"] != "GET":
+        yield {**scope, "method": "GET"}
+    if any(value is not None for value in scope["requested_selectors"]):
+        yield {**scope, "requested_selectors": tuple(None for _ in scope["requested_selectors"])}
+    if scope["requested_version"] is not None:
+        yield {**scope, "requested_version": None}
+    if scope["path"] != "/" and scope["path"].endswith("/"):
+        yield {**scope, "path": scope["path"].rstrip("/") or "/"}
+    segments = scope["path"].strip("/").split("/")
+    for position, segment in enumerate(segments):
+        if segment != "1":
+            yield {**scope, "path": "/" + "/".join([*segments[:position], "1", *segments[position + 1 :]])}
+    if len(segments) > 1:
+        yield {**scope, "path": "/" + "/".join(segments[:-1])}
+
+
+class DifferentialRoutingChecker:
+    def __init__(
+        self,
+        app: FastAPI | HeaderVersionedAPIRouter,
+        resolver: Resolver | None = None,
+    ) -> None:
+        self.router = get_router(app)
+        self.resolver = resolver or self.router.resolve
+
+    def diverges(self, scope: dict[str, Any]) -> tuple[RouteResolution, RouteResolution] | None:
+        # both resolvers are allowed to modify the scope
+        reference = reference_resolve(self.router, dict(scope))
+        optimized = self.resolver(dict(scope))
+        if describe_resolution(reference) != describe_resolution(optimized):
+            return reference, optimized
+        return None
+
+    def minimize(self, scope: dict[str, Any]) -> dict[str, Any]:
+        simplified = True
+        while simplified:
+            simplified = False
+            for candidate in simplifications(scope):
+                if self.diverges(candidate):
+                    scope = candidate
+                    simplified = True
+                    break
+        return scope
+
+    def check(self, samples: int = 1000, seed: int = 0) -> Divergence | None:
+        generator = iter(ScopeGenerator(self.router, seed=seed))
+        for _ in range(samples):
+            scope = next(generator)
+            if self.diverges(scope):
+                minimized_scope = self.minimize(scope)
+                reference, optimized = self.diverges(minimized_scope)  # pyright: ignore[reportGeneralTypeIssues]
+                return Divergence(scope, minimized_scope, reference, optimized)
+        return None
+
+
+def assert_routing_equivalent(
+    app: FastAPI | HeaderVersionedAPIRouter,
+    resolver: Resolver | None = None,
+    samples: int = 1000,
+    seed: int = 0,
+) -> None:
+    divergence = DifferentialRoutingChecker(app, resolver).check(samples=samples, seed=seed)
+    if divergence is not None:
+        raise AssertionError(str(divergence))
@@ -0,0 +1,245 @@
+"""
+Warm-up after startup, so the first requests of each version after deploy don't pay one-time costs - dispatch
+structures, docs and routes resolution of each version are built without calling handlers, and explicitly listed
+synthetic requests are handled in-process to warm validators and caches of the handlers:
+
+    warm_up = enable_warm_up(app, requests={"2": [SyntheticRequest("GET", "/items", headers=(("x-version", "2"),))]})
+
+Warm-up runs in background once the app started. Readiness endpoint (GET /ready by default) responds with 503 and
+progress until it's done, then with 200 and per-version timings, so load balancer sends traffic to warm workers only.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Mapping, Sequence
+from contextlib import asynccontextmanager, suppress
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any
+from uuid import UUID
+
+from fastapi.dependencies.models import Dependant
+from starlette.convertors import FloatConvertor, IntegerConvertor, UUIDConvertor
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from .dispatch import ResolutionKind
+from .fastapi import HeaderRoutingFastAPI
+from .openapi import VersionDocsMount
+from .sources import (
+    HeaderVersionSource,
+    MediaTypeVersionSource,
+    PathVersionSource,
+    QueryVersionSource,
+    VersionExtractor,
+    VersionSource,
+)
+from .synthetic import SyntheticRequest, dispatch
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .routing import HeaderVersionedAPIRouter
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_METHODS = ("GET",)
+PATH_PARAM_PLACEHOLDERS: dict[type, str] = {
+    IntegerConvertor: "0",
+    FloatConvertor: "0",
+    UUIDConvertor: str(UUID(int=0)),
+    UUID: str(UUID(int=0)),
+}
+
+
+@dataclass
+class VersionWarmUp:
+    version: str | None
+    seconds: float
+    # representative requests resolved to a route of the version, handlers are not called
+    resolved: int
+    # explicitly listed requests handled by the app
+    requests: int
+    # requests which raised, warm-up goes on
+    failed: int
+
+
+def versioned_request(source: VersionSource, version: str | None, method: str, path: str) -> SyntheticRequest:
+    """Synthetic request of the version, which is provided the way 'source' reads it"""
+    if version is None:
+        return SyntheticRequest(method, path)
+    if isinstance(source, HeaderVersionSource):
+        return SyntheticRequest(method, path, headers=((source.header, version),))
+    if isinstance(source, MediaTypeVersionSource):
+        media_type = f"application/json; {source.parameter}={version}"
+        return SyntheticRequest(method, path, headers=((source.header, media_type),))
+    if isinstance(source, QueryVersionSource):
+        separator = "&" if "?" in path else "?"
+        return SyntheticRequest(method, f"{path}{separator}{source.parameter}={version}")
+    if isinstance(source, PathVersionSource):
+        return SyntheticRequest(method, f"/{source.prefix}{version}{path}")
+    raise TypeError(f"Unsupported version source {source!r}")
+
+
+def representative_requests(
+    app: HeaderRoutingFastAPI,
+    version: str | None,
+    methods: Sequence[str] = WARM_UP_METHODS,
+) -> list[SyntheticRequest]:
+    """A request per route and method served by the version, path parameters are filled with placeholders"""
+    requests = []
+    routing_table = app.router.get_routing_table()  # pyright: ignore[reportGeneralTypeIssues]
+    for route in routing_table.candidates(version):
+        if isinstance(route, VersionDocsMount) or not hasattr(route, "path_format"):
+            continue
+
+        # parameters of FastAPI routes are typed by endpoint signature, others by path convertors
+        param_types = {name: type(convertor) for name, convertor in getattr(route, "param_convertors", {}).items()}
+        if isinstance(dependant := getattr(route, "dependant", None), Dependant):
+            param_types |= {field.name: field.type_ for field in dependant.path_params}
+        path = route.path_format
+        for name, param_type in param_types.items():
+            path = path.replace(f"{{{name}}}", PATH_PARAM_PLACEHOLDERS.get(param_type, "0"))
+        for method in sorted(getattr(route, "methods", None) or ()):
+            if method in methods:
+                requests.append(versioned_request(app.version_sources[0], version, method, path))
+    return requests
+
+
+class WarmUp:
+    """
+    Warm-up of each registered version (and of unversioned routes): precomputed dispatch structures, built docs of the
+    version and resolution of a request per route and method - handlers are not called. Only requests given
+    explicitly per version in 'requests' are handled by the app, their responses are not checked, requests which
+    raised are logged and counted. Versions served by mounted apps are skipped.
+    """
+
+    def __init__(
+        self,
+        requests: Mapping[str | None, Sequence[SyntheticRequest]] | None = None,
+        methods: Sequence[str] = WARM_UP_METHODS,
+    ) -> None:
+        self.requests = requests or {}
+        self.methods = methods
+        self.ready = False
+        self.seconds: float | None = None
+        # versions to warm up, known once warm-up started
+        self.versions: int | None = None
+        self.report: list[VersionWarmUp] = []
+        self.task: asyncio.Task | None = None
+
+    def resolve(self, app: HeaderRoutingFastAPI, request: SyntheticRequest) -> bool:
+        """Resolve the request the way the app does, without handling it. Returns whether a route was found"""
+        router: HeaderVersionedAPIRouter = app.router  # pyright: ignore[reportGeneralTypeIssues]
+        scope = request.scope()
+        extract_version = VersionExtractor(
+            app.version_sources,
+            [selector_header.header for selector_header in router.selector_headers],
+        )
+        extract_version(scope)
+        return router.resolve(scope).kind == ResolutionKind.FULL
+
+    async def run(self, app: HeaderRoutingFastAPI) -> list[VersionWarmUp]:
+        started = time.perf_counter()
+        router = app.router
+        routing_table = router.get_routing_table()  # pyright: ignore[reportGeneralTypeIssues]
+        routing_table.warm()
+        app.openapi()
+
+        docs_mounts: dict[str | None, list[VersionDocsMount]] = {}
+        for route in router.routes:
+            if isinstance(route, VersionDocsMount):
+                docs_mounts.setdefault(route.api_version, []).append(route)
+
+        versions = [
+            version
+            for version in (None, *routing_table.version_index.api_versions)
+            if version not in router.version_apps  # pyright: ignore[reportGeneralTypeIssues]
+        ]
+        self.versions = len(versions)
+        self.report = []
+        for version in versions:
+            # requests are served in between versions
+            await asyncio.sleep(0)
+            version_started = time.perf_counter()
+            for mount in docs_mounts.get(version, ()):
+                mount.app.openapi()  # pyright: ignore[reportGeneralTypeIssues]
+
+            resolved = sum(
+                self.resolve(app, request) for request in representative_requests(app, version, self.methods)
+            )
+            requests = self.requests.get(version, ())
+            failed = 0
+            for request in requests:
+                try:
+                    await dispatch(app, request)
+                except Exception:  # noqa: BLE001
+                    logger.warning("Warm-up request %s %s failed", request.method, request.path, exc_info=True)
+                    failed += 1
+
+            self.report.append(
+                VersionWarmUp(version, time.perf_counter() - version_started, resolved, len(requests), failed),
+            )
+
+        self.seconds = time.perf_counter() - started
+        self.ready = True
+        logger.info("Warm-up of %s versions is done in %.3f seconds", len(self.report), self.seconds)
+        return self.report
+
+    def start(self, app: HeaderRoutingFastAPI) -> asyncio.Task:
+        """Run warm-up in background of the running event loop"""
+        self.task = asyncio.get_running_loop().create_task(self.run(app))
+        self.task.add_done_callback(self._log_failure)
+        return self.task
+
+    def _log_failure(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and (exc := task.exception()) is not None:
+            logger.error("Warm-up failed, app is not reported ready", exc_info=exc)
+
+    async def wait(self) -> None:
+        """Wait until background warm-up is done"""
+        if self.task is not None:
+            await self.task
+
+    async def stop(self) -> None:
+        task, self.task = self.task, None
+        if task is not None and not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    async def readiness(self, request: Request) -> JSONResponse:
+        if not self.ready:
+            return JSONResponse(
+                {"ready": False, "versions": [asdict(warm_up) for warm_up in self.report], "total": self.versions},
+                status_code=503,
+            )
+        return JSONResponse(
+            {"ready": True, "seconds": self.seconds, "versions": [asdict(warm_up) for warm_up in self.report]},
+        )
+
+
+def enable_warm_up(
+    app: HeaderRoutingFastAPI,
+    readiness_path: str | None = "/ready",
+    **warm_up_kwargs: Any,
+) -> WarmUp:
+    """
+    Run WarmUp in background once the app lifespan started - the app serves requests meanwhile, and add readiness
+    endpoint served in any version. Warm-up which isn't done yet is cancelled on shutdown.
+    """
+    warm_up = WarmUp(**warm_up_kwargs)
+    lifespan_context = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(lifespan_app: Any) -> AsyncIterator[Any]:
+        async with lifespan_context(lifespan_app) as state:
+            warm_up.start(app)
+            try:
+                yield state
+            finally:
+                await warm_up.stop()
+
+    app.router.lifespan_context = lifespan
+    if readiness_path is not None:
+        app.router.routes.append(Route(readiness_path, warm_up.readiness, methods=["GET"], include_in_schema=False))
+    return warm_up
@@ -0,0 +1 @@
+pytest_plugins = ["fastapi_header_versioning.pytest_plugin"]
@@ -0,0 +1,142 @@
+import uuid
+
+import pytest
+from fastapi import APIRouter, Depends, Request, params
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from starlette.routing import BaseRoute
+
+from examples.deferred_include.app import app
+from examples.unversioned_routers_wrapping.commons import get_version
+from examples.unversioned_routers_wrapping.v1.routes import router as router_v1
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.profiling import profile_build
+
+
+@pytest.fixture()
+def client() -> TestClient:
+    return TestClient(
+        app,
+    )
+
+
+@pytest.fixture()
+def item_id() -> str:
+    return str(uuid.uuid4())
+
+
+async def test__versioned_route__exact_version_matching__should_use_correct_version(client: TestClient, item_id: str):
+    result = client.get(f"/item/{item_id}?query_parameter=foo", headers={"x-version": "1"})
+    assert result.status_code == 200
+    assert result.json() == {
+        "query_parameter": "foo",
+        "id": item_id,
+        "dependency_parameters": {
+            "skip": 0,
+            "limit": 100,
+        },
+        "version": "1",
+    }
+
+    result = client.get(f"/item/{item_id}?new_query_parameter=foo", headers={"x-version": "2"})
+    assert result.status_code == 200
+    assert result.json() == {
+        "new_query_parameter": "foo",
+        "id": item_id,
+        "dependency_parameters": {
+            "offset": 0,
+            "limit": 100,
+        },
+    }
+
+
+@pytest.mark.parametrize("headers", [{"x-version": "1"}, {"x-version": "3"}, {}])
+async def test__route_without_version__any_version_header__should_use_correct_route(client: TestClient, headers):
+    result = client.get("/hello", headers=headers)
+    assert result.status_code == 200
+    assert result.json() == {"greeting": "Hi! It's not versioned route."}
+
+
+async def test__versioned_route__not_exact_version__should_use_correct_route(client: TestClient, item_id: str):
+    result = client.get(f"/item/{item_id}?query_parameter=foo", headers={"x-version": "1.5"})
+    assert result.status_code == 200
+    assert result.json() == {
+        "query_parameter": "foo",
+        "id": item_id,
+        "dependency_parameters": {
+            "skip": 0,
+            "limit": 100,
+        },
+        "version": "1.5",
+    }
+
+    result = client.get(f"/item/{item_id}?new_query_parameter=foo", headers={"x-version": "3"})
+    assert result.status_code == 200
+    assert result.json() == {
+        "new_query_parameter": "foo",
+        "id": item_id,
+        "dependency_parameters": {
+            "offset": 0,
+            "limit": 100,
+        },
+    }
+
+
+async def test__versioned_route__impossible_to_pick_version__should_return_406(client: TestClient, item_id):
+    result = client.get(f"/item/{item_id}?query_parameter=foo", headers={"x-version": "0"})
+    assert result.status_code == 406
+
+
+async def test__versioned_route__not_existing_path__should_return_404(client: TestClient):
+    result = client.get(f"/item/{item_id}/foo?new_query_parameter=foo", headers={"x-version": "2"})
+    assert result.status_code == 404
+
+
+@pytest.mark.parametrize("path", ["/hello", "/item/foo"])
+async def test__any_route__not_existing_method__should_return_405(client: TestClient, path: str):
+    result = client.head(path, headers={"x-version": "2"})
+    assert result.status_code == 405
+
+
+async def own_endpoint():
+    return {}
+
+
+async def plain_endpoint(request: Request):
+    return PlainTextResponse("plain")
+
+
+def build_router(deferred: bool, version_dependency: params.Depends) -> HeaderVersionedAPIRouter:
+    router = HeaderVersionedAPIRouter(deferred=deferred, prefix="/api", dependencies=[version_dependency])
+    router.include_router(router_v1, version="1", tags=["v1"])
+    router.add_api_route("/own", own_endpoint, tags=["own"])
+    plain_router = APIRouter()
+    plain_router.add_route("/plain", plain_endpoint)
+    router.include_router(plain_router)
+    return router
+
+
+async def test__deferred_include__nested_routers__should_build_each_route_once():
+    version_dependency = Depends(get_version)
+    with profile_build(trace_memory=False) as profiler:
+        root_router = HeaderVersionedAPIRouter(deferred=True)
+        root_router.include_router(build_router(deferred=True, version_dependency=version_dependency), prefix="/root")
+        deferred_app = HeaderRoutingFastAPI(version_header="x-version")
+        deferred_app.include_router(root_router)
+
+    assert {route["builds"] for route in profiler.as_dict()["routes"]} == {1}
+    assert [route.path for route in root_router.routes] == ["/root/plain"]
+    assert deferred_app.router.registered_versions == {None, "1"}
+
+    eager_app = HeaderRoutingFastAPI(version_header="x-version")
+    eager_app.include_router(build_router(deferred=False, version_dependency=version_dependency), prefix="/root")
+
+    def describe(route: BaseRoute) -> tuple:
+        if isinstance(route, APIRoute):
+            return route.path, route.methods, route.api_version, route.tags, route.dependencies, route.response_model
+        return route.path, route.methods
+
+    assert [describe(route) for route in deferred_app.routes] == [describe(route) for route in eager_app.routes]
+    assert TestClient(deferred_app).get("/root/plain").text == "plain"
+    assert TestClient(deferred_app).get("/root/api/own").json() == {}
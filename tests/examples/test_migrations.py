@@ -0,0 +1,112 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from examples.migrations.app import app
+from fastapi_header_versioning.routing import HeaderVersionedAPIRouter
+
+
+@pytest.fixture()
+def client() -> TestClient:
+    return TestClient(
+        app,
+    )
+
+
+@pytest.mark.parametrize(
+    ("version", "body", "expected"),
+    [
+        ("1", {"name": "John Doe"}, {"name": "John Doe"}),
+        ("1.5", {"name": "John Doe"}, {"name": "John Doe"}),
+        ("2", {"first_name": "John", "last_name": "Doe"}, {"first_name": "John", "last_name": "Doe"}),
+        (
+            "3",
+            {"first_name": "John", "last_name": "Doe", "tags": ["a"]},
+            {"first_name": "John", "last_name": "Doe", "tags": ["a"]},
+        ),
+    ],
+)
+async def test__migrated_route__old_version_request__should_be_migrated_both_ways(
+    client: TestClient,
+    version: str,
+    body: dict,
+    expected: dict,
+):
+    result = client.post("/users", json=body, headers={"x-version": version})
+    assert result.status_code == 200
+    assert result.json() == expected
+    assert int(result.headers["content-length"]) == len(result.content)
+
+
+@pytest.mark.parametrize(
+    ("version", "expected"),
+    [
+        ("1", {"name": "John Doe1"}),
+        ("2", {"first_name": "John", "last_name": "Doe1"}),
+        ("3", {"first_name": "John", "last_name": "Doe1", "tags": ["admin"]}),
+    ],
+)
+async def test__migrated_route__path_not_matching_request_step__should_migrate_only_response(
+    client: TestClient,
+    version: str,
+    expected: dict,
+):
+    result = client.get("/users/1", headers={"x-version": version})
+    assert result.status_code == 200
+    assert result.json() == expected
+
+
+async def test__migrated_route__validation_error__should_not_be_migrated(client: TestClient):
+    result = client.post("/users", json={"first_name": "John"}, headers={"x-version": "2"})
+    assert result.status_code == 422
+    assert result.json()["detail"][0]["loc"] == ["body", "last_name"]
+
+
+@pytest.mark.parametrize("version", ["1", "3"])
+async def test__migrated_route__malformed_json__should_be_rejected_as_by_head(client: TestClient, version: str):
+    result = client.post(
+        "/users",
+        content=b"{not json",
+        headers={"x-version": version, "content-type": "application/json"},
+    )
+    assert result.status_code == 422
+    assert result.json()["detail"][0]["type"] == "json_invalid"
+
+
+@pytest.mark.parametrize("body", [{"first_name": "John"}, ["John Doe"], {"name": 1}])
+async def test__migrated_route__body_of_unexpected_shape__should_return_422(client: TestClient, body: object):
+    result = client.post("/users", json=body, headers={"x-version": "1"})
+    assert result.status_code == 422
+    error = result.json()["detail"][0]
+    assert error["type"] == "migration_error"
+    assert error["loc"] == ["body"]
+    assert error["input"] == body
+
+
+async def test__migrated_route__version_before_chain__should_return_406(client: TestClient):
+    result = client.get("/users/1", headers={"x-version": "0"})
+    assert result.status_code == 406
+
+
+async def test__migrated_route__single_route_for_all_versions__should_be_built(client: TestClient):
+    users_routes = [route for route in app.routes if getattr(route, "path", None) == "/users"]
+    assert len(users_routes) == 1
+
+    router = app.router
+    assert isinstance(router, HeaderVersionedAPIRouter)
+    client.get("/users/1", headers={"x-version": "1"})
+    client.post("/users", json={"name": "John Doe"}, headers={"x-version": "1"})
+    stats = router.migration_stats()
+    assert set(stats) == {"1", "2"}
+    assert stats["1"].requests >= 1
+    assert stats["1"].responses >= 2
+    assert stats["1"].response_seconds > 0
+
+
+@pytest.mark.parametrize("version", ["1", "2", "3"])
+async def test__doc_generation__migrated_route__should_be_documented_in_each_version(
+    client: TestClient,
+    version: str,
+):
+    result = client.get(f"/version_{version}/openapi.json")
+    assert result.status_code == 200
+    assert "/users/{user_id}" in result.json()["paths"]
@@ -0,0 +1,66 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from examples.platform_selectors.app import app
+
+
+@pytest.fixture()
+def client() -> TestClient:
+    return TestClient(
+        app,
+    )
+
+
+@pytest.mark.parametrize(
+    ("headers", "greeting"),
+    [
+        ({"x-version": "1", "x-platform": "ios"}, "Hi from iOS!"),
+        ({"x-version": "1", "x-platform": "web"}, "Hi from web!"),
+        ({"x-version": "1.5", "x-platform": "ios"}, "Hi from iOS!"),
+        ({"x-version": "2", "x-platform": "android"}, "Hi from Android! v2"),
+        ({"x-version": "3", "x-platform": "android"}, "Hi from Android! v2"),
+    ],
+)
+async def test__selector_route__exact_selector_matching__should_use_correct_route(
+    client: TestClient,
+    headers: dict,
+    greeting: str,
+):
+    result = client.get("/greeting", headers=headers)
+    assert result.status_code == 200
+    assert result.json() == {"greeting": greeting}
+
+
+@pytest.mark.parametrize("headers", [{"x-version": "1", "x-platform": "blackberry"}, {"x-version": "1"}])
+async def test__selector_route__unknown_selector__should_use_fallback_selector(client: TestClient, headers: dict):
+    result = client.get("/greeting", headers=headers)
+    assert result.status_code == 200
+    assert result.json() == {"greeting": "Hi from web!"}
+
+
+@pytest.mark.parametrize("headers", [{"x-version": "2", "x-platform": "ios"}, {"x-version": "2"}])
+async def test__selector_route__no_route_for_selector__should_use_generic_route(client: TestClient, headers: dict):
+    result = client.get("/greeting", headers=headers)
+    assert result.status_code == 200
+    assert result.json() == {"greeting": "Hi! v2"}
+
+
+async def test__selector_route__route_present_for_one_selector__other_selector_return_404(client: TestClient):
+    result = client.get("/widgets", headers={"x-version": "2", "x-platform": "android"})
+    assert result.status_code == 200
+    result = client.get("/widgets", headers={"x-version": "2", "x-platform": "ios"})
+    assert result.status_code == 404
+
+
+async def test__doc_generation__selector_routes__should_be_documented_per_selector(client: TestClient):
+    result = client.get("/version_1_ios/openapi.json")
+    assert result.status_code == 200
+    assert result.json()["paths"]["/greeting"]["get"]["operationId"].startswith("ios_greeting")
+
+    result = client.get("/version_1/openapi.json")
+    assert result.status_code == 200
+    assert result.json()["paths"]["/greeting"]["get"]["operationId"].startswith("greeting")
+
+    result = client.get("/version_2_android/openapi.json")
+    assert result.status_code == 200
+    assert set(result.json()["paths"]) == {"/greeting", "/widgets"}
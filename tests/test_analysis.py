@@ -0,0 +1,114 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.analysis import UnreachableReason, UnreachableRoutesError, find_unreachable_routes
+from fastapi_header_versioning.openapi import doc_generation
+from fastapi_header_versioning.testing import assert_routing_equivalent
+
+
+def build_app() -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items/{item_id}")
+    @router.version("1")
+    async def get_item(item_id: int):
+        return {"handler": "get_item"}
+
+    @router.get("/items/{key}")
+    @router.version("1")
+    async def get_item_override(key: str):
+        raise AssertionError("shadowed by get_item")
+
+    # POST is reachable, so the route is
+    @router.api_route("/items/{item_id}", methods=["GET", "POST"])
+    @router.version("1")
+    async def upsert_item(item_id: int):
+        return {"handler": "upsert_item"}
+
+    @router.get("/items/{item_id}")
+    @router.version("2")
+    async def get_item_v2(item_id: int):
+        return {"handler": "get_item_v2"}
+
+    @router.get("/items/{item_id}")
+    @router.version("3")
+    async def get_item_v3(item_id: int):
+        raise AssertionError("version 3 is served by the mounted app")
+
+    @router.get("/items/{item_id}")
+    @router.version("4")
+    async def get_item_v4(item_id: int):
+        raise AssertionError("version 4 is resolved to version 3")
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    app.mount_version(["3"], PlainTextResponse("mounted"))
+    # version 4 is retired - its routes are kept, but requests are resolved to version 3
+    app.swap_routing(app.router.build_snapshot(registered_versions={None, "1", "2", "3"}))
+    return doc_generation(app)
+
+
+async def test__find_unreachable_routes__should_report_each_reason():
+    app = build_app()
+    report = {unreachable.route.name: unreachable for unreachable in app.check_routes()}
+
+    assert {name: unreachable.reason for name, unreachable in report.items()} == {
+        "get_item_override": UnreachableReason.SHADOWED,
+        "get_item_v3": UnreachableReason.MOUNTED_VERSION,
+        "get_item_v4": UnreachableReason.VERSION_NOT_RESOLVED,
+    }
+    assert report["get_item_override"].shadowed_by.name == "get_item"  # type: ignore[union-attr]
+    assert report["get_item_override"].describe() == (
+        "GET /items/{key} (version 1): shadowed by GET /items/{item_id} (version 1)"
+    )
+
+
+async def test__check_routes__drop__should_keep_dispatch_unchanged():
+    app = build_app()
+    client = TestClient(app)
+    expected = [client.get("/items/1", headers={"x-version": version}).text for version in ("1", "2", "3", "4")]
+    routes_count = len(app.routes)
+
+    assert len(app.check_routes(drop=True)) == 3
+    assert len(app.routes) == routes_count - 3
+    assert find_unreachable_routes(app.router) == []  # pyright: ignore[reportGeneralTypeIssues]
+    assert [client.get("/items/1", headers={"x-version": version}).text for version in ("1", "2", "3", "4")] == expected
+    assert client.post("/items/1", headers={"x-version": "1"}).json() == {"handler": "upsert_item"}
+    assert_routing_equivalent(app, samples=200)
+
+
+async def test__check_routes__strict__should_raise():
+    app = build_app()
+    with pytest.raises(UnreachableRoutesError, match="Unreachable routes") as exc_info:
+        app.check_routes(strict=True)
+    assert len(exc_info.value.unreachable_routes) == 3
+
+
+async def test__find_unreachable_routes__selectors__should_check_each_combination():
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items")
+    @router.version("1", selectors=("ios",))
+    async def get_items_ios():
+        return "ios"
+
+    @router.get("/items")
+    @router.version("1")
+    async def get_items():
+        return "generic"
+
+    @router.get("/items")
+    @router.version("1", selectors=("ios",))
+    async def get_items_ios_override():
+        raise AssertionError("shadowed by get_items_ios")
+
+    app = HeaderRoutingFastAPI(version_header="x-version", selector_headers=["x-platform"])
+    app.include_router(router)
+    [unreachable] = app.check_routes()
+    assert unreachable.route.name == "get_items_ios_override"  # type: ignore[attr-defined]
+    assert unreachable.describe().startswith("GET /items (version 1, selectors ('ios',)): shadowed")
+    client = TestClient(app)
+    assert client.get("/items", headers={"x-version": "1", "x-platform": "ios"}).json() == "ios"
+    assert client.get("/items", headers={"x-version": "1"}).json() == "generic"
@@ -0,0 +1,235 @@
+import gc
+import importlib
+import json
+import sys
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict
+from functools import partial
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from starlette.types import ASGIApp
+
+from fastapi_header_versioning import pytest_plugin
+from fastapi_header_versioning.budgets import (
+    BudgetRequest,
+    BudgetScenario,
+    PerformanceBudget,
+    ScenarioMeasurement,
+    format_violations,
+    gc_disabled,
+    measure_allocations,
+    measure_scenario,
+    synthetic_app,
+)
+from fastapi_header_versioning.pytest_plugin import BudgetChecker, budget_checker
+
+ITEM_ID = "00000000-0000-0000-0000-000000000001"
+
+EXAMPLE_REQUESTS = [
+    BudgetRequest("GET", f"/item/{ITEM_ID}?query_parameter=foo", headers=(("x-version", "1"),)),
+    BudgetRequest("GET", f"/item/{ITEM_ID}?new_query_parameter=foo", headers=(("x-version", "2"),)),
+    BudgetRequest(
+        "POST",
+        "/item",
+        headers=(("x-version", "1"), ("content-type", "application/json")),
+        body=b'{"name": "name", "description": "description"}',
+    ),
+    BudgetRequest("GET", "/hello"),
+    BudgetRequest("GET", f"/item/{ITEM_ID}/foo", headers=(("x-version", "2"),), status_code=404),
+    BudgetRequest("HEAD", "/item/foo", headers=(("x-version", "2"),), status_code=405),
+    BudgetRequest("GET", f"/item/{ITEM_ID}", headers=(("x-version", "0"),), status_code=406),
+]
+
+
+@contextmanager
+def fresh_modules(package: str) -> Iterator[None]:
+    """Modules of 'package' are imported from scratch inside the block, ones imported before are restored on exit"""
+
+    def package_modules() -> dict[str, ModuleType]:
+        return {
+            name: module for name, module in sys.modules.items() if name == package or name.startswith(f"{package}.")
+        }
+
+    imported = package_modules()
+    for name in imported:
+        del sys.modules[name]
+    try:
+        yield
+    finally:
+        for name in package_modules():
+            del sys.modules[name]
+        sys.modules.update(imported)
+        # import binds submodules to attributes of their parents
+        for name, module in imported.items():
+            parent, _, attribute = name.rpartition(".")
+            setattr(sys.modules[parent], attribute, module)
+
+
+def example_app(example: str) -> Callable[[], ASGIApp]:
+    """Import the example from scratch - its routers are declared at module level"""
+    package = f"examples.{example}"
+
+    def build_app() -> ASGIApp:
+        with fresh_modules(package):
+            return importlib.import_module(f"{package}.app").app
+
+    return build_app
+
+
+@pytest.mark.parametrize("example", ["basic", "router_level_versions", "unversioned_routers_wrapping"])
+async def test__performance_budget__example_app__should_not_regress(
+    performance_budget: BudgetChecker,
+    example: str,
+):  # pragma: no cover - skipped under coverage tracer
+    await performance_budget.check(BudgetScenario(example, example_app(example), EXAMPLE_REQUESTS))
+
+
+async def test__performance_budget__synthetic_app__should_not_regress(
+    performance_budget: BudgetChecker,
+):  # pragma: no cover - skipped under coverage tracer
+    requests = [
+        BudgetRequest("GET", f"/resource{route_number}/1", headers=(("x-version", version),))
+        for route_number, version in [(0, "1"), (19, "10"), (10, "5.5"), (5, "99")]
+    ]
+    await performance_budget.check(BudgetScenario("synthetic_10_versions_20_routes", synthetic_app, requests))
+
+
+async def test__example_app__should_keep_modules_imported_by_the_suite():
+    module = importlib.import_module("examples.basic.app")
+    package = sys.modules["examples.basic"]
+    build_app = example_app("basic")
+
+    app = build_app()
+    assert app is not module.app
+    assert build_app() is not app
+    assert sys.modules["examples.basic.app"] is module
+    assert sys.modules["examples.basic"] is package
+    assert package.app is module
+    assert sys.modules["examples"].basic is package
+
+
+def measurement(**metrics: float) -> ScenarioMeasurement:
+    return ScenarioMeasurement(
+        **{"build_seconds": 1.0, "dispatch_seconds": 0.001, "allocated_bytes_per_request": 1000, **metrics},
+    )
+
+
+async def test__performance_budget__check__should_scale_time_by_calibration(tmp_path: Path):
+    budget = PerformanceBudget(tmp_path / "budget.json")
+    budget.record("app", measurement(), calibration_seconds=0.01)
+
+    # twice slower machine
+    assert budget.check("app", measurement(build_seconds=2.5, dispatch_seconds=0.0025), calibration_seconds=0.02) == []
+
+    violations = budget.check(
+        "app",
+        measurement(dispatch_seconds=0.002, allocated_bytes_per_request=1300),
+        calibration_seconds=0.01,
+    )
+    assert [(violation.metric, violation.limit) for violation in violations] == [
+        ("dispatch_seconds", 0.0015),
+        ("allocated_bytes_per_request", 1250),
+    ]
+    diff = format_violations(violations)
+    assert "dispatch_seconds" in diff
+    assert "+100.0%" in diff
+    assert "+30.0%" in diff
+
+
+async def test__performance_budget__should_be_saved_and_loaded(tmp_path: Path):
+    path = tmp_path / "budget.json"
+    assert PerformanceBudget.load(path).scenarios == {}
+
+    budget = PerformanceBudget(path)
+    budget.record("app", measurement(), calibration_seconds=0.01)
+    # recorded on other machine - normalized to the calibration of the file
+    budget.record("other", measurement(build_seconds=4.0), calibration_seconds=0.02)
+    budget.save()
+
+    loaded = PerformanceBudget.load(path)
+    assert loaded.calibration_seconds == 0.01
+    assert loaded.scenarios["other"]["build_seconds"] == 2.0
+    assert json.loads(path.read_text()) == budget.as_dict()
+
+    with pytest.raises(LookupError, match="--update-performance-budget"):
+        loaded.check("missing", measurement(), calibration_seconds=0.01)
+
+
+async def test__budget_checker__regression__should_fail_with_diff(tmp_path: Path):
+    scenario = BudgetScenario(
+        "synthetic",
+        lambda: synthetic_app(2, 2),
+        [BudgetRequest("GET", "/resource0/1", headers=(("x-version", "1"),))],
+    )
+    checker = BudgetChecker(PerformanceBudget(tmp_path / "budget.json"), update=True)
+    await checker.check(scenario, build_rounds=1, dispatch_rounds=1, requests_per_round=1)
+
+    checker.update = False
+    checker.budget.scenarios["synthetic"]["dispatch_seconds"] = 1e-12
+    with pytest.raises(pytest.fail.Exception, match="dispatch_seconds"):
+        await checker.check(scenario, build_rounds=1, dispatch_rounds=1, requests_per_round=1)
+
+
+async def test__budget_checker__regression_not_reproduced__should_pass(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    measurements = iter([measurement(dispatch_seconds=0.01), measurement(), measurement()])
+
+    async def measure(scenario: BudgetScenario) -> ScenarioMeasurement:
+        return next(measurements)
+
+    monkeypatch.setattr(pytest_plugin, "measure_scenario", measure)
+    budget = PerformanceBudget(tmp_path / "budget.json")
+    budget.record("synthetic", measurement(), calibration_seconds=0.01)
+    checker = BudgetChecker(budget, update=False)
+    checker._calibration_seconds = 0.01
+    scenario = BudgetScenario("synthetic", partial(synthetic_app, 1, 1), [])
+    # the slow measurement is retaken
+    await checker.check(scenario)
+    await checker.check(scenario)
+    assert next(measurements, None) is None
+
+
+async def test__budget_checker__update__should_save_budget_on_exit(tmp_path: Path):
+    path = tmp_path / "budget.json"
+    with budget_checker(path, update=False) as checker:
+        checker.budget.record("app", measurement(), calibration_seconds=0.01)
+    assert not path.exists()
+
+    with budget_checker(path, update=True) as checker:
+        checker.budget.record("app", measurement(), calibration_seconds=0.01)
+    assert PerformanceBudget.load(path).scenarios == {"app": asdict(measurement())}
+
+
+async def test__performance_budget__metric_not_recorded__should_not_be_checked(tmp_path: Path):
+    budget = PerformanceBudget(tmp_path / "budget.json", calibration_seconds=0.01)
+    budget.scenarios["app"] = {"build_seconds": 1.0, "dispatch_seconds": 0.001}
+    assert budget.check("app", measurement(allocated_bytes_per_request=10**9), calibration_seconds=0.01) == []
+
+
+async def test__measure_allocations__tracing_started_before__should_keep_tracing():
+    app = synthetic_app(1, 1)
+    tracemalloc.start()
+    try:
+        assert await measure_allocations(app, [BudgetRequest("GET", "/resource0/1")]) > 0
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+async def test__gc_disabled__collector_disabled_before__should_stay_disabled():
+    gc.disable()
+    try:
+        with gc_disabled():
+            assert not gc.isenabled()
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+
+async def test__measure_scenario__unexpected_status__should_raise():
+    scenario = BudgetScenario("synthetic", lambda: synthetic_app(1, 1), [BudgetRequest("GET", "/missing")])
+    with pytest.raises(AssertionError, match="responded with 404, expected 200"):
+        await measure_scenario(scenario)
@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from starlette.requests import HTTPConnection
+
+from fastapi_header_versioning import (
+    APIVersion,
+    HeaderRoutingFastAPI,
+    HeaderVersionedAPIRouter,
+    get_api_version,
+    version_cached,
+)
+from fastapi_header_versioning.dispatch import interned_api_version
+
+
+def build_app() -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+    seen_versions = []
+
+    @router.get("/items")
+    @router.version("2.10")
+    async def get_items(version: APIVersion = Depends(get_api_version)):
+        seen_versions.append(version)
+        return {"version": str(version), "parts": version.parts}
+
+    @router.get("/plain")
+    async def get_plain(version: APIVersion | None = Depends(get_api_version)):
+        seen_versions.append(version)
+        return {"version": version}
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    app.state.seen_versions = seen_versions
+    return app
+
+
+@pytest.mark.parametrize("requested_version", ["2.10", "2.9", "3"])
+async def test__get_api_version__should_return_resolved_interned_version(requested_version: str):
+    app = build_app()
+    client = TestClient(app)
+    result = client.get("/items", headers={"x-version": requested_version})
+    assert result.json() == {"version": "2.10", "parts": [2, 10]}
+    assert app.state.seen_versions[0] is interned_api_version("2.10")
+
+
+async def test__get_api_version__no_version__should_return_none():
+    app = build_app()
+    assert TestClient(app).get("/plain").json() == {"version": None}
+
+
+async def test__get_api_version__should_not_add_parameters_to_openapi():
+    app = build_app()
+    operation = app.openapi()["paths"]["/items"]["get"]
+    assert "parameters" not in operation
+
+
+async def test__api_version__should_compare_as_router_does():
+    version = APIVersion.parse("2.10")
+    assert version == "2.10"
+    assert version == APIVersion.parse("2.10")
+    assert version < "2.9"
+    assert version > APIVersion.parse("10")
+    assert {version: 1}[APIVersion.parse("2.10")] == 1
+    assert APIVersion.parse("1.0-beta").parts == (1, "0-beta")
+
+
+def http_connection(version: str | None) -> HTTPConnection:
+    api_version = None if version is None else interned_api_version(version)
+    return HTTPConnection({"type": "http", "api_version": api_version})
+
+
+async def test__version_cached__should_call_factory_once_per_resolved_version():
+    calls = []
+
+    @version_cached()
+    def get_features(version: APIVersion | None) -> dict:
+        calls.append(version)
+        return {"version": None if version is None else str(version)}
+
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/features")
+    @router.version("1")
+    async def get_features_v1(features: dict = Depends(get_features)):
+        return features
+
+    @router.get("/features")
+    @router.version("2")
+    async def get_features_v2(features: dict = Depends(get_features)):
+        return features
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    client = TestClient(app)
+    for requested_version in ["1", "1.5", "2", "1", "3"]:
+        client.get("/features", headers={"x-version": requested_version})
+
+    assert client.get("/features", headers={"x-version": "1.9"}).json() == {"version": "1"}
+    assert calls == [interned_api_version("1"), interned_api_version("2")]
+
+
+async def test__version_cached__concurrent_requests__should_share_single_factory_call():
+    calls = 0
+    release = asyncio.Event()
+
+    @version_cached()
+    async def get_features(version: APIVersion | None) -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    pending = asyncio.gather(*(get_features(http_connection("1")) for _ in range(5)))
+    await asyncio.sleep(0)
+    release.set()
+    assert await pending == [1] * 5
+    assert await get_features(http_connection(None)) == 2
+
+
+async def test__version_cached__failure__should_not_be_cached():
+    calls = 0
+
+    @version_cached()
+    async def get_features(version: APIVersion | None) -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        if calls == 1:
+            raise RuntimeError("Not ready")
+        return calls
+
+    results = await asyncio.gather(
+        get_features(http_connection("1")),
+        get_features(http_connection("1")),
+        return_exceptions=True,
+    )
+    assert [str(result) for result in results] == ["Not ready", "Not ready"]
+    assert await get_features(http_connection("1")) == 2
+
+
+async def test__version_cached__first_request_cancelled__should_cancel_waiters():
+    @version_cached()
+    async def get_features(version: APIVersion | None) -> int:
+        await asyncio.sleep(10)
+        raise AssertionError("should be cancelled")
+
+    first = asyncio.ensure_future(get_features(http_connection("1")))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(get_features(http_connection("1")))
+    await asyncio.sleep(0)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await second
+
+
+async def test__version_cached__ttl_and_invalidate__should_call_factory_again():
+    calls = []
+
+    @version_cached(ttl=0)
+    def get_expiring(version: APIVersion | None) -> int:
+        calls.append(version)
+        return len(calls)
+
+    assert await get_expiring(http_connection("1")) == 1
+    assert await get_expiring(http_connection("1")) == 2
+
+    @version_cached(ttl=60)
+    def get_features(version: APIVersion | None) -> int:
+        calls.append(version)
+        return len(calls)
+
+    assert await get_features(http_connection("1")) == 3
+    assert await get_features(http_connection("2")) == 4
+    assert await get_features(http_connection("1")) == 3
+    get_features.invalidate("1")
+    assert await get_features(http_connection("1")) == 5
+    assert await get_features(http_connection("2")) == 4
+    get_features.invalidate()
+    assert await get_features(http_connection("2")) == 6
@@ -0,0 +1,250 @@
+import pytest
+from fastapi import APIRouter, Depends, Request
+from fastapi.testclient import TestClient
+from starlette.routing import Match
+
+from fastapi_header_versioning import (
+    HeaderRoutingFastAPI,
+    HeaderVersionedAPIRouter,
+    VersionResolution,
+    get_version_resolution,
+)
+from fastapi_header_versioning.dispatch import AllowedMethods, RoutingTable, VersionIndex, VersionNotFoundError
+
+
+@pytest.mark.parametrize(
+    ("requested_version", "resolved_version"),
+    [(None, None), ("1", "1"), ("1.5", "1"), ("2", "2"), ("10", "1"), ("3", "2")],
+)
+async def test__version_index__resolve__should_use_closest_lower_version(requested_version, resolved_version):
+    assert VersionIndex([None, "1", "2"]).resolve(requested_version) == resolved_version
+
+
+async def test__version_index__no_lower_version__should_raise():
+    with pytest.raises(VersionNotFoundError):
+        VersionIndex([None, "1", "2"]).resolve("0")
+
+
+async def test__routing_table__candidates__should_be_filtered_by_version_and_selectors():
+    router = HeaderVersionedAPIRouter(selector_headers=["x-platform"])
+
+    @router.get("/generic")
+    @router.version("1")
+    async def generic():
+        return "generic"
+
+    @router.get("/specific")
+    @router.version("1", selectors=("ios",))
+    async def specific():
+        return "specific"
+
+    plain_router = APIRouter()
+
+    @plain_router.get("/plain")
+    async def plain():
+        return "plain"
+
+    router.include_router(plain_router)
+    routing_table = router.get_routing_table()
+    assert routing_table is router.get_routing_table()
+    assert routing_table.resolve_selectors(("ios",)) == ("ios",)
+    assert routing_table.resolve_selectors(("android",)) == (None,)
+    assert [route.path for route in routing_table.candidates("1", ("ios",))] == ["/specific", "/generic", "/plain"]
+    assert [route.path for route in routing_table.candidates("1", (None,))] == ["/generic", "/plain"]
+    assert [route.path for route in routing_table.candidates("2", (None,))] == ["/plain"]
+    # routes bound to selectors are never used if selector headers are not configured
+    assert [route.path for route in RoutingTable(router.routes, router.registered_versions).candidates("1")] == [
+        "/generic",
+        "/plain",
+    ]
+
+    router.invalidate_routing_table()
+    assert routing_table is not router.get_routing_table()
+
+    app = HeaderRoutingFastAPI(version_header="x-version", selector_headers=["x-platform"])
+    app.include_router(router)
+    client = TestClient(app)
+    ios_headers = {"x-version": "1", "x-platform": "ios"}
+    assert [client.get(path, headers=ios_headers).json() for path in ("/specific", "/generic", "/plain")] == [
+        "specific",
+        "generic",
+        "plain",
+    ]
+    assert client.get("/specific", headers={"x-version": "1", "x-platform": "android"}).status_code == 404
+
+
+async def test__routing_table__routes_or_versions_changed_in_place__should_be_rebuilt():
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items")
+    @router.version("1")
+    async def get_items():
+        return ["v1"]
+
+    @router.get("/items")
+    @router.version("2")
+    async def get_items_v2():
+        return ["v2"]
+
+    replacement_router = HeaderVersionedAPIRouter()
+
+    @replacement_router.get("/items")
+    @replacement_router.version("2")
+    async def get_items_v2_replacement():
+        return ["v2 replacement"]
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    client = TestClient(app)
+    assert client.get("/items", headers={"x-version": "2"}).json() == ["v2"]
+
+    # same number of routes and versions
+    [route_index] = [
+        index for index, route in enumerate(app.router.routes) if getattr(route, "api_version", None) == "2"
+    ]
+    app.router.routes[route_index] = replacement_router.routes[0]
+    assert client.get("/items", headers={"x-version": "2"}).json() == ["v2 replacement"]
+
+    app.router.registered_versions.discard("2")
+    app.router.registered_versions.add("3")
+    assert client.get("/items", headers={"x-version": "2"}).json() == ["v1"]
+
+    routing_table = app.router.get_routing_table()
+    assert routing_table is app.router.get_routing_table()
+    app.router.routes.reverse()
+    assert routing_table is not app.router.get_routing_table()
+
+
+async def test__versioned_route__matches__other_version__should_not_match():
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items")
+    @router.version("1")
+    async def get_items():
+        raise AssertionError("only matching is checked")
+
+    [route] = router.routes
+    scope = {"type": "http", "method": "GET", "path": "/items", "requested_version": "1"}
+    assert route.matches(scope)[0] == Match.FULL
+    assert route.matches({**scope, "requested_version": "2"})[0] == Match.NONE
+    assert route.matches({**scope, "path": "/other"})[0] == Match.NONE
+
+
+def build_methods_app() -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items/{item_id}")
+    @router.version("1")
+    async def get_item():
+        return "get_item"
+
+    @router.delete("/items/{item_id}")
+    @router.version("1")
+    async def delete_item():
+        return "delete_item"
+
+    @router.post("/items/{item_id}")
+    @router.version("2")
+    async def update_item():
+        return "update_item"
+
+    @router.put("/items/{price:float}")
+    @router.version("2")
+    async def update_price():
+        return "update_price"
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    return app
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "version", "allow"),
+    [
+        ("PATCH", "/items/1", "1", "DELETE, GET"),
+        ("PATCH", "/items/1", "1.5", "DELETE, GET"),
+        ("PATCH", "/items/1", "2", "POST"),
+        # the first matching template wins
+        ("PATCH", "/items/1.5", "2", "POST"),
+    ],
+)
+async def test__router__method_not_allowed__should_return_allow_of_resolved_version(method, path, version, allow):
+    client = TestClient(build_methods_app())
+    result = client.request(method, path, headers={"x-version": version})
+    assert result.status_code == 405
+    assert result.headers["allow"] == allow
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "version", "handler"),
+    [
+        ("GET", "/items/1", "1", "get_item"),
+        ("DELETE", "/items/1", "1.5", "delete_item"),
+        ("POST", "/items/1", "2", "update_item"),
+        ("PUT", "/items/1.5", "2", "update_price"),
+    ],
+)
+async def test__router__allowed_method__should_call_handler_of_resolved_version(method, path, version, handler):
+    client = TestClient(build_methods_app())
+    assert client.request(method, path, headers={"x-version": version}).json() == handler
+
+
+async def test__allowed_methods__lookup__should_match_whole_path():
+    app = build_methods_app()
+    allowed_methods = app.router.get_routing_table().allowed_methods("2")
+    assert allowed_methods.lookup("/items/1") == {"POST"}
+    assert allowed_methods.lookup("/items/1/other") is None
+    assert AllowedMethods([]).lookup("/items") is None
+
+
+def add_versioned_items(router: HeaderVersionedAPIRouter, version: str) -> None:
+    @router.get("/items")
+    @router.version(version)
+    async def get_items(request: Request, resolution: VersionResolution = Depends(get_version_resolution)):
+        return {
+            "version": version,
+            "requested_version": resolution.requested_version,
+            "resolved_by": "outer" if resolution.router is request.app.router else "inner",
+        }
+
+
+def build_nested_app(inner_versions: tuple[str, ...]) -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+    for version in ("1", "2"):
+        add_versioned_items(router, version)
+    inner_router = HeaderVersionedAPIRouter()
+    for version in inner_versions:
+        add_versioned_items(inner_router, version)
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    app.mount("/inner", inner_router)
+    return app
+
+
+@pytest.mark.parametrize(
+    ("inner_versions", "requested_version", "expected"),
+    [
+        # same versions - resolution of the outer router is reused
+        (("1", "2"), "1.5", {"version": "1", "requested_version": "1.5", "resolved_by": "outer"}),
+        # inner router resolves the value sent by the client, not the one resolved by the outer router
+        (("1.2", "2"), "1.5", {"version": "1.2", "requested_version": "1.5", "resolved_by": "inner"}),
+        (("1.2", "2"), "2", {"version": "2", "requested_version": "2", "resolved_by": "inner"}),
+    ],
+)
+async def test__nested_router__should_resolve_version_sent_by_client(inner_versions, requested_version, expected):
+    client = TestClient(build_nested_app(inner_versions))
+    assert client.get("/items", headers={"x-version": requested_version}).json()["resolved_by"] == "outer"
+    assert client.get("/inner/items", headers={"x-version": requested_version}).json() == expected
+
+
+async def test__nested_router__version_not_found__should_report_version_sent_by_client():
+    client = TestClient(build_nested_app(("1.2", "2")))
+    response = client.get("/inner/items", headers={"x-version": "1.1"})
+    assert response.status_code == 406
+    assert "1.1" in response.text
+
+
+async def test__routing_tables__same_versions__should_share_version_index():
+    assert RoutingTable([], [None, "1"]).version_index is RoutingTable([], ["1", None]).version_index
+    assert RoutingTable([], [None, "1"]).version_index is not RoutingTable([], [None, "2"]).version_index
@@ -0,0 +1,129 @@
+import pytest
+from fastapi import Depends, Header, HTTPException
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.explain import enable_routing_explain, explain_routing
+
+
+def build_app() -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/owners")
+    @router.version("1")
+    async def get_owners():
+        return "get_owners"
+
+    @router.get("/items/{item_id}")
+    @router.version("1")
+    async def get_item(item_id: int):
+        return "get_item"
+
+    @router.get("/items/{item_id}")
+    @router.version("2", selectors=("ios",))
+    async def get_item_ios(item_id: int):
+        return "get_item_ios"
+
+    @router.get("/items/{item_id}")
+    @router.version("2")
+    async def get_item_v2(item_id: int):
+        return "get_item_v2"
+
+    app = HeaderRoutingFastAPI(version_header="x-version", selector_headers=["x-platform"])
+    app.include_router(router)
+    app.mount_version(["3"], PlainTextResponse("mounted"))
+    return app
+
+
+async def test__explain_routing__fallback__should_report_examined_candidates():
+    explanation = explain_routing(build_app(), "get", "/items/1", [("X-Version", "1.5")])
+
+    assert explanation.method == "GET"
+    assert (explanation.requested_version, explanation.version, explanation.fallback) == ("1.5", "1", True)
+    assert explanation.version_source == "header"
+    assert explanation.kind == "full"
+    assert explanation.route == "GET /items/{item_id} (version 1)"
+    assert [(candidate.route, candidate.match) for candidate in explanation.candidates] == [
+        ("GET /owners (version 1)", "none"),
+        ("GET /items/{item_id} (version 1)", "full"),
+    ]
+    assert explanation.candidates_count == 2
+    assert all(candidate.seconds >= 0 for candidate in explanation.candidates)
+    assert explanation.as_dict()["candidates"][1]["match"] == "full"
+
+
+async def test__explain_routing__selectors__should_report_resolved_selectors():
+    explanation = explain_routing(build_app(), "GET", "/items/1", [("x-version", "2"), ("x-platform", "ios")])
+    assert (explanation.requested_selectors, explanation.selectors) == (("ios",), ("ios",))
+    assert explanation.route == "GET /items/{item_id} (version 2, selectors ('ios',))"
+    assert explanation.fallback is False
+
+    explanation = explain_routing(build_app(), "GET", "/items/1", [("x-version", "2"), ("x-platform", "web")])
+    assert explanation.selectors == (None,)
+    assert explanation.route == "GET /items/{item_id} (version 2)"
+
+
+@pytest.mark.parametrize(
+    ("path", "headers", "route", "handler"),
+    [
+        ("/owners", {"x-version": "1"}, "GET /owners (version 1)", "get_owners"),
+        ("/items/1", {"x-version": "1.5"}, "GET /items/{item_id} (version 1)", "get_item"),
+        (
+            "/items/1",
+            {"x-version": "2", "x-platform": "ios"},
+            "GET /items/{item_id} (version 2, selectors ('ios',))",
+            "get_item_ios",
+        ),
+        ("/items/1", {"x-version": "2", "x-platform": "web"}, "GET /items/{item_id} (version 2)", "get_item_v2"),
+    ],
+)
+async def test__explain_routing__found_route__should_be_handled_by_dispatch(path, headers, route, handler):
+    app = build_app()
+    assert explain_routing(app, "GET", path, list(headers.items())).route == route
+    assert TestClient(app).get(path, headers=headers).json() == handler
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "version", "expected"),
+    [
+        ("DELETE", "/items/1", "2", {"kind": "partial", "allowed_methods": ["GET"], "route": None}),
+        ("GET", "/items/1", "0", {"kind": "version_not_found", "version": None, "fallback": False, "candidates": []}),
+        ("GET", "/items/1", "3", {"kind": "app", "version": "3", "candidates_count": 0}),
+        ("GET", "/unknown", "1", {"kind": "not_found", "redirect_url": None}),
+        ("GET", "/owners/", "1", {"kind": "redirect", "redirect_url": "http://testserver/owners"}),
+    ],
+)
+async def test__explain_routing__should_report_resolution_kind(method, path, version, expected):
+    explanation = explain_routing(build_app(), method, path, [("x-version", version)]).as_dict()
+    assert {key: explanation[key] for key in expected} == expected
+
+
+async def test__explain_routing__redirect__should_report_candidates_examined_for_redirect():
+    explanation = explain_routing(build_app(), "GET", "/owners/", [("x-version", "1")])
+    assert [(candidate.match, candidate.redirect) for candidate in explanation.candidates] == [
+        ("none", False),
+        ("none", False),
+        ("full", True),
+    ]
+
+
+async def verify_token(x_admin_token: str = Header(None)) -> None:
+    if x_admin_token != "secret":
+        raise HTTPException(403)
+
+
+async def test__routing_explain_endpoint__should_require_access():
+    app = build_app()
+    enable_routing_explain(app, dependencies=[Depends(verify_token)])
+    client = TestClient(app)
+    request = {"path": "/items/1", "headers": {"x-version": "1.5"}}
+
+    assert client.post("/_routing/explain", json=request).status_code == 403
+    response = client.post("/_routing/explain", json=request, headers={"x-admin-token": "secret", "x-version": "2"})
+    assert response.status_code == 200
+    assert response.json()["route"] == "GET /items/{item_id} (version 1)"
+    assert "/_routing/explain" not in app.openapi()["paths"]
+
+    with pytest.raises(ValueError, match="access control"):
+        enable_routing_explain(app, dependencies=[])
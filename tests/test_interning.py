@@ -0,0 +1,130 @@
+import pytest
+from fastapi import APIRouter, Depends, Header
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRoute, HeaderVersionedAPIRouter
+from fastapi_header_versioning.interning import RouteInterner, route_interner
+
+VERSIONS = ("1", "2", "3")
+
+
+class Item(BaseModel):
+    name: str
+
+
+class ItemOut(BaseModel):
+    name: str
+
+
+class NotFound(BaseModel):
+    detail: str
+
+
+async def get_token(x_token: str = Header("default")) -> str:
+    return x_token
+
+
+async def get_user(token: str = Depends(get_token)) -> str:
+    return f"user:{token}"
+
+
+def build_app() -> HeaderRoutingFastAPI:
+    items = APIRouter()
+
+    @items.post("/items", response_model=ItemOut, responses={404: {"model": NotFound}})
+    async def create_item(item: Item, user: str = Depends(get_user)):
+        return {"name": f"{item.name} by {user}", "secret": "filtered"}
+
+    router = HeaderVersionedAPIRouter()
+    for version in VERSIONS:
+        router.include_router(items, version=version, dependencies=[Depends(get_token)])
+
+    @router.get("/items")
+    @router.version("1")
+    async def get_items(user: str = Depends(get_user)):
+        return user
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    return app
+
+
+def item_routes(app: HeaderRoutingFastAPI) -> list[HeaderVersionedAPIRoute]:
+    return [route for route in app.routes if isinstance(route, HeaderVersionedAPIRoute) and "POST" in route.methods]
+
+
+async def test__interning__versions_of_endpoint__should_share_fields_and_dependants():
+    shared_before = route_interner.stats().shared
+    app = build_app()
+    first, *others = item_routes(app)
+
+    assert len(others) == len(VERSIONS) - 1
+    for route in others:
+        assert route.response_field is first.response_field
+        assert route.secure_cloned_response_field is first.secure_cloned_response_field
+        assert route.response_fields[404] is first.response_fields[404]
+        assert route.dependant is first.dependant
+        assert route.body_field is first.body_field
+    # response, cloned response, 404, body fields and dependant with its 3 sub-dependants per version
+    assert route_interner.stats().shared - shared_before >= 7 * len(others)
+
+    # other endpoint of the same path
+    [get_items_route] = [route for route in app.routes if getattr(route, "name", None) == "get_items"]
+    [get_user_dependant] = get_items_route.dependant.dependencies  # type: ignore[attr-defined]
+    assert get_user_dependant in first.dependant.dependencies
+
+
+async def test__interning__shared_objects__should_serve_each_version():
+    app = build_app()
+    client = TestClient(app)
+    for version in VERSIONS:
+        response = client.post("/items", json={"name": "pen"}, headers={"x-version": version, "x-token": version})
+        assert response.json() == {"name": f"pen by user:{version}"}
+    assert client.post("/items", json={}, headers={"x-version": "2"}).status_code == 422
+
+    app.dependency_overrides[get_user] = lambda: "override"
+    assert client.get("/items", headers={"x-version": "1"}).json() == "override"
+
+
+async def test__interning__route__should_build_handler_once(monkeypatch: pytest.MonkeyPatch):
+    built_handlers = []
+    get_route_handler = APIRoute.get_route_handler
+
+    def counting_get_route_handler(route: APIRoute):
+        built_handlers.append(route)
+        return get_route_handler(route)
+
+    monkeypatch.setattr(APIRoute, "get_route_handler", counting_get_route_handler)
+    app = build_app()
+    versioned_routes = [route for route in app.routes if isinstance(route, HeaderVersionedAPIRoute)]
+    # routes are compared by path, endpoint and methods, so identity is counted
+    handlers_per_route = [sum(built is route for built in built_handlers) for route in versioned_routes]
+    assert handlers_per_route == [1] * len(versioned_routes)
+    assert all(route.interned_objects for route in versioned_routes)
+
+
+async def test__interning__disabled__should_keep_objects_per_route(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(HeaderVersionedAPIRoute, "interner", None)
+    first, second, _ = item_routes(build_app())
+    assert first.dependant is not second.dependant
+    assert first.response_field is not second.response_field
+
+
+async def test__route_interner__entries__should_be_dropped_with_routes():
+    interner = RouteInterner()
+    owned: list = []
+    value = object()
+    assert interner.intern(("key",), value, owned) is value
+    assert interner.intern(("key",), object(), owned) is value
+    assert interner.intern(("key",), value, owned) is value
+    # not hashable keys are not interned
+    unhashable = object()
+    assert interner.intern(("key", []), unhashable, owned) is unhashable
+    assert interner.stats().interned == 1
+    assert interner.stats().lookups == 4
+    assert interner.stats().shared == 1
+
+    owned.clear()
+    assert interner.stats().interned == 0
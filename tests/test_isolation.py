@@ -0,0 +1,295 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter, isolation
+from fastapi_header_versioning.isolation import (
+    ProcessGroup,
+    VersionGroup,
+    decode_message,
+    encode_message,
+    isolate_versions,
+    read_message,
+    serve,
+    write_message,
+)
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="version groups require Unix domain sockets")
+
+
+def build_legacy_app() -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items/{item_id}")
+    @router.version("1")
+    async def get_item(item_id: int, request: Request):
+        return {"item_id": item_id, "pid": os.getpid(), "query": request.url.query}
+
+    @router.post("/echo")
+    @router.version("1")
+    async def echo(request: Request):
+        chunks = [chunk async for chunk in request.stream() if chunk]
+
+        async def upper_chunks() -> AsyncIterator[bytes]:
+            for chunk in chunks:
+                yield chunk.upper()
+
+        return StreamingResponse(upper_chunks(), headers={"x-echo": "yes", "x-chunks": str(len(chunks))})
+
+    @router.get("/exit")
+    @router.version("1")
+    async def exit_process():  # pragma: no cover - runs in the child process
+        os._exit(1)
+
+    @router.get("/fail")
+    @router.version("1")
+    async def fail():
+        raise RuntimeError("Broken")
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    return app
+
+
+legacy_app = build_legacy_app()
+
+
+async def failing_app(scope: Scope, receive: Receive, send: Send) -> None:
+    raise RuntimeError("Broken")
+
+
+async def disconnect_app(scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] != "http":
+        return
+    while (await receive())["type"] != "http.disconnect":
+        pass
+    assert (await receive())["type"] == "http.disconnect"
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"disconnected"})
+
+
+def build_front_app() -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items/{item_id}")
+    @router.version("2")
+    async def get_item(item_id: int):
+        return {"item_id": item_id, "pid": os.getpid()}
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    return app
+
+
+@asynccontextmanager
+async def served_group(group: ProcessGroup, app: ASGIApp = legacy_app) -> AsyncIterator[None]:
+    """Serve group sockets in the test process, instead of child processes"""
+    group._create_socket_dir()
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(serve(app, socket_path, stop)) for socket_path in group.socket_paths]
+    while not all(Path(socket_path).exists() for socket_path in group.socket_paths):
+        await asyncio.sleep(0.01)
+    try:
+        yield
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks)
+        await group.stop()
+
+
+async def test__encode_message__should_round_trip_scope_and_bodies():
+    message = {
+        "type": "http.request",
+        "body": b"\x00\xff",
+        "more_body": True,
+        "headers": [(b"x-version", b"1")],
+        "query_string": b"a=1",
+    }
+    encoded = encode_message(message)
+    assert decode_message(encoded[8 : len(encoded) - 2], encoded[-2:]) == message
+
+
+async def test__isolated_group__should_forward_requests():
+    app = build_front_app()
+    [group] = isolate_versions(app, [VersionGroup("legacy", ["1"], "tests.test_isolation:legacy_app", processes=2)])
+    async with served_group(group), httpx.AsyncClient(app=app, base_url="http://test") as client:
+        legacy, front = await asyncio.gather(
+            client.get("/items/1", params={"a": "1"}, headers={"x-version": "1"}),
+            client.get("/items/1", headers={"x-version": "2"}),
+        )
+    # asserted outside of the served group - coverage loses lines of the block after forwarded requests
+    assert legacy.json() == {"item_id": 1, "pid": os.getpid(), "query": "a=1"}
+    assert front.json() == {"item_id": 1, "pid": os.getpid()}
+
+
+async def test__isolated_group__should_stream_bodies():
+    app = build_front_app()
+    [group] = isolate_versions(app, [VersionGroup("legacy", ["1"], "tests.test_isolation:legacy_app")])
+
+    async def request_body() -> AsyncIterator[bytes]:
+        for chunk in (b"first ", b"second"):
+            yield chunk
+
+    async with served_group(group), httpx.AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/echo", content=request_body(), headers={"x-version": "1"})
+    assert response.content == b"FIRST SECOND"
+    assert response.headers["x-echo"] == "yes"
+    assert response.headers["x-chunks"] == "2"
+
+
+async def test__isolated_group__failed_request__should_forward_error_response():
+    app = build_front_app()
+    [group] = isolate_versions(app, [VersionGroup("legacy", ["1"], "tests.test_isolation:legacy_app")])
+    async with served_group(group), httpx.AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/fail", headers={"x-version": "1"})
+    assert response.status_code == 500
+
+
+async def test__isolated_group__no_response__should_respond_bad_gateway():
+    app = build_front_app()
+    [group] = isolate_versions(app, [VersionGroup("legacy", ["1"], "tests.test_isolation:failing_app")])
+    async with served_group(group, failing_app), httpx.AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/items/1", headers={"x-version": "1"})
+    assert response.status_code == 502
+
+
+async def test__isolated_group__no_processes__should_respond_service_unavailable():
+    app = build_front_app()
+    [group] = isolate_versions(app, [VersionGroup("legacy", ["1"], "tests.test_isolation:legacy_app")])
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/items/1", headers={"x-version": "1"})
+        assert response.status_code == 503
+    await group.stop()
+
+
+async def test__process_group__not_started__should_not_create_socket_dir():
+    group = ProcessGroup(VersionGroup("legacy", ["1"], "tests.test_isolation:legacy_app"))
+    assert group.socket_dir is None
+    assert group.socket_paths == []
+
+
+async def test__isolate_versions__windows__should_raise(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(isolation.sys, "platform", "win32")
+    with pytest.raises(RuntimeError, match="Unix domain sockets"):
+        isolate_versions(build_front_app(), [VersionGroup("legacy", ["1"], "tests.test_isolation:legacy_app")])
+
+
+async def test__process_group__websocket__should_be_closed():
+    group = ProcessGroup(VersionGroup("legacy", ["1"], "tests.test_isolation:legacy_app"))
+    sent = []
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    await group({"type": "websocket"}, None, send)  # type: ignore[arg-type]
+    assert sent == [{"type": "websocket.close", "code": 1000}]
+    await group.stop()
+
+
+async def test__isolated_group__client_disconnected__should_forward_disconnect():
+    group = ProcessGroup(VersionGroup("legacy", ["1"], "tests.test_isolation:disconnect_app"), tempfile.mkdtemp())
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}])
+    sent: list[dict] = []
+
+    async def receive() -> dict:
+        return next(messages)
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    async with served_group(group, disconnect_app):
+        await group({"type": "http", "method": "GET", "path": "/", "headers": []}, receive, send)
+    assert sent[-1] == {"type": "http.response.body", "body": b"disconnected"}
+    # socket dir given by caller is kept
+    assert Path(group.socket_dir).exists()
+
+
+async def test__serve__connection_closed__should_disconnect_request():
+    group = ProcessGroup(VersionGroup("legacy", ["1"], "tests.test_isolation:disconnect_app"))
+    async with served_group(group, disconnect_app):
+        _, writer = await asyncio.open_unix_connection(group.socket_paths[0])
+        writer.close()
+
+        reader, writer = await asyncio.open_unix_connection(group.socket_paths[0])
+        await write_message(writer, {"type": "http", "method": "GET", "path": "/", "headers": []})
+        writer.write_eof()
+        assert (await read_message(reader)) == {"type": "http.response.start", "status": 200, "headers": []}
+        writer.close()
+
+
+async def test__process_group__restart_failed__should_retry(monkeypatch: pytest.MonkeyPatch):
+    group = ProcessGroup(VersionGroup("legacy", ["1"], "tests.test_isolation:legacy_app"), check_interval=0.01)
+    exited_process = SimpleNamespace(is_alive=lambda: False, exitcode=1)
+    alive_process = SimpleNamespace(is_alive=lambda: True)
+    group.processes = [alive_process, exited_process]  # type: ignore[list-item]
+
+    async def start_process(index: int) -> None:
+        raise RuntimeError("No memory")
+
+    monkeypatch.setattr(group, "_start_process", start_process)
+    supervisor = asyncio.create_task(group._supervise())
+    while group.restarts < 2:
+        await asyncio.sleep(0.01)
+    supervisor.cancel()
+    group.processes = [None, None]
+    await group.stop()
+
+
+async def test__process_group__process_not_terminated__should_be_killed():
+    group = ProcessGroup(VersionGroup("legacy", ["1"], "tests.test_isolation:legacy_app"))
+    signals: list[str] = []
+    stuck_process = SimpleNamespace(
+        is_alive=lambda: "kill" not in signals,
+        terminate=lambda: signals.append("terminate"),
+        join=lambda _: None,
+        kill=lambda: signals.append("kill"),
+    )
+    group.processes = [stuck_process]  # type: ignore[list-item]
+    await group.stop()
+    assert signals == ["terminate", "kill"]
+    assert group.processes == [None]
+
+
+def test__isolated_group__process_exited__should_be_restarted():
+    app = build_front_app()
+    [group] = isolate_versions(
+        app,
+        [VersionGroup("legacy", ["1"], "tests.test_isolation:legacy_app")],
+        check_interval=0.05,
+    )
+    with TestClient(app) as client:
+        first_pid = client.get("/items/1", headers={"x-version": "1"}).json()["pid"]
+        assert first_pid != os.getpid()
+
+        assert client.get("/exit", headers={"x-version": "1"}).status_code == 502
+        deadline = time.monotonic() + 30
+        while group.restarts == 0 or client.get("/items/1", headers={"x-version": "1"}).status_code != 200:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        assert client.get("/items/1", headers={"x-version": "1"}).json()["pid"] != first_pid
+        socket_dir = group.socket_dir
+
+    assert group.processes == [None]
+    assert socket_dir is not None
+    assert not Path(socket_dir).exists()
+    assert group.socket_dir is None
+
+
+def test__isolated_group__process_failed_to_start__should_fail_startup():
+    app = build_front_app()
+    isolate_versions(app, [VersionGroup("legacy", ["1"], "tests.missing_module:app")])
+    with pytest.raises(RuntimeError, match="failed to start"), TestClient(app):
+        raise AssertionError("startup should fail")
@@ -0,0 +1,128 @@
+import pytest
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from starlette.routing import Match, NoMatchFound
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter, get_api_version
+from fastapi_header_versioning.lazy import LazyVersionedRoute, MaterializedRoutesPool
+from fastapi_header_versioning.openapi import doc_generation
+from fastapi_header_versioning.testing import assert_routing_equivalent
+
+
+def build_app(routes_pool: MaterializedRoutesPool) -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter(deferred=True)
+    for version in ["1", "2", "3"]:
+
+        @router.get("/items/{item_id}", name=f"get_item_{version}")
+        @router.version(version)
+        async def get_item(item_id: int, api_version=Depends(get_api_version)):
+            return {"item_id": item_id, "version": str(api_version)}
+
+        @router.post("/items")
+        @router.version(version)
+        async def create_item():
+            return {}
+
+    @router.get("/plain")
+    async def plain():
+        return {}
+
+    app = HeaderRoutingFastAPI(version_header="x-version", routes_pool=routes_pool)
+    app.include_router(router, prefix="/api")
+    return doc_generation(app)
+
+
+async def test__routes_pool__versioned_routes__should_be_materialized_on_demand():
+    routes_pool = MaterializedRoutesPool(max_versions=2)
+    app = build_app(routes_pool)
+    assert len([route for route in app.routes if isinstance(route, LazyVersionedRoute)]) == 6
+    assert routes_pool.stats().builds == 0
+
+    client = TestClient(app)
+    for version in ["1", "2", "1", "3", "2"]:
+        result = client.get("/api/items/1", headers={"x-version": version})
+        assert result.json() == {"item_id": 1, "version": version}
+
+    stats = routes_pool.stats()
+    # "2" is evicted by "3" as "1" was used more recently, then it's rebuilt and evicts "1"
+    assert stats.builds == 4
+    assert stats.rebuilds == 1
+    assert stats.evicted_versions == 2
+    assert stats.materialized_versions == 2
+    assert stats.materialized_routes == 2
+
+
+async def test__routes_pool__routes_limit__should_evict_least_recently_used_versions():
+    routes_pool = MaterializedRoutesPool(max_routes=3)
+    client = TestClient(build_app(routes_pool))
+    for version in ["1", "2"]:
+        client.get("/api/items/1", headers={"x-version": version})
+        client.post("/api/items", headers={"x-version": version})
+
+    stats = routes_pool.stats()
+    assert stats.evicted_versions == 1
+    assert stats.evicted_routes == 2
+    assert stats.materialized_routes == 2
+
+
+async def test__routes_pool__lazy_routes__should_keep_dispatch_rules():
+    app = build_app(MaterializedRoutesPool(max_versions=1))
+    client = TestClient(app)
+    result = client.put("/api/items/1", headers={"x-version": "2"})
+    assert result.status_code == 405
+    assert result.headers["allow"] == "GET"
+    assert client.get("/api/items/1/", headers={"x-version": "2"}, follow_redirects=False).status_code == 307
+    assert client.get("/api/items/1", headers={"x-version": "0"}).status_code == 406
+    assert client.get("/api/plain").status_code == 200
+    assert app.url_path_for("get_item_2", item_id=1) == "/api/items/1"
+    assert client.get("/version_2/openapi.json").json()["paths"].keys() == {"/api/items/{item_id}", "/api/items"}
+    assert_routing_equivalent(app, samples=300)
+
+
+async def test__lazy_route__matches__should_check_type_and_version():
+    app = build_app(MaterializedRoutesPool())
+    [lazy_route] = [route for route in app.routes if getattr(route, "name", None) == "get_item_1"]
+    assert isinstance(lazy_route, LazyVersionedRoute)
+    scope = {"type": "http", "method": "GET", "path": "/api/items/1", "requested_version": "1"}
+    assert lazy_route.matches(scope)[0] == Match.FULL
+    assert lazy_route.matches({**scope, "requested_version": "2"})[0] == Match.NONE
+    assert lazy_route.matches({**scope, "type": "websocket"})[0] == Match.NONE
+    with pytest.raises(NoMatchFound):
+        app.url_path_for("not_existing")
+
+
+async def test__routes_pool__routes_retired_by_swap__should_be_released():
+    routes_pool = MaterializedRoutesPool()
+    app = build_app(routes_pool)
+    client = TestClient(app)
+    for version in ["1", "2"]:
+        client.get("/api/items/1", headers={"x-version": version})
+    assert routes_pool.stats().materialized_routes == 2
+
+    routes = [route for route in app.routes if getattr(route, "api_version", None) != "1"]
+    app.swap_routing(app.router.build_snapshot(routes, {None, "2", "3"}))  # pyright: ignore[reportGeneralTypeIssues]
+    stats = routes_pool.stats()
+    assert stats.released_routes == 1
+    assert stats.materialized_versions == 1
+    assert stats.materialized_routes == 1
+    assert client.get("/api/items/1", headers={"x-version": "2"}).json() == {"item_id": 1, "version": "2"}
+    assert routes_pool.stats().builds == 2
+
+
+async def test__routes_pool__routes_removed_from_router__should_be_released_on_rebuild():
+    routes_pool = MaterializedRoutesPool()
+    app = build_app(routes_pool)
+    client = TestClient(app)
+    client.post("/api/items", headers={"x-version": "3"})
+    client.get("/api/items/1", headers={"x-version": "3"})
+
+    [created] = [
+        route
+        for route in app.routes
+        if isinstance(route, LazyVersionedRoute) and route.api_version == "3" and route.methods == {"POST"}
+    ]
+    app.routes.remove(created)
+    assert client.post("/api/items", headers={"x-version": "3"}).status_code == 404
+    stats = routes_pool.stats()
+    assert stats.released_routes == 1
+    assert stats.materialized_routes == 1
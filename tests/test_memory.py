@@ -0,0 +1,60 @@
+import json
+
+from fastapi.testclient import TestClient
+from pydantic import create_model
+
+from examples.basic.app import app as basic_app
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.memory import measure_versions_memory
+from fastapi_header_versioning.openapi import doc_generation
+
+
+def build_app() -> HeaderRoutingFastAPI:
+    shared_model = create_model("Shared", __module__=__name__, value=(str, ...))
+    large_model = create_model("Large", __module__=__name__, **{f"field_{index}": (str, ...) for index in range(100)})
+    router = HeaderVersionedAPIRouter()
+
+    @router.post("/items")
+    @router.version("1")
+    async def create_item(item: shared_model):  # pyright: ignore[reportGeneralTypeIssues]
+        return item
+
+    @router.post("/items")
+    @router.version("2")
+    async def create_item_v2(item: shared_model, large: large_model):  # pyright: ignore[reportGeneralTypeIssues]
+        return {"item": item, "fields": len(large.dict())}
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    return doc_generation(app)
+
+
+async def test__memory_report__model_used_by_single_version__should_be_attributed_to_it():
+    report = measure_versions_memory(build_app()).as_dict()
+    versions = {record["version"]: record for record in report["versions"]}
+    assert set(versions) == {"1", "2"}
+    # route and docs mount of each version
+    assert versions["1"]["routes"] == 2
+    assert versions["2"]["exclusive_bytes"] > 5 * versions["1"]["exclusive_bytes"]
+    assert versions["2"]["retained_bytes"] > versions["2"]["exclusive_bytes"]
+    # shared model at least
+    assert report["shared_objects"] > 0
+    assert report["total_bytes"] == report["shared_bytes"] + sum(
+        record["exclusive_bytes"] for record in versions.values()
+    )
+
+
+async def test__memory_report__should_not_change_dispatch():
+    app = build_app()
+    measure_versions_memory(app)
+    client = TestClient(app)
+    assert client.post("/items", json={"value": "a"}, headers={"x-version": "1"}).json() == {"value": "a"}
+    large = {f"field_{index}": "" for index in range(100)}
+    response = client.post("/items", json={"item": {"value": "a"}, "large": large}, headers={"x-version": "2"})
+    assert response.json() == {"item": {"value": "a"}, "fields": 100}
+
+
+async def test__memory_report__app_method__should_return_json_serializable_report():
+    report = json.loads(basic_app.memory_report().as_json())
+    assert {record["version"] for record in report["versions"]} == {"1", "2", None}
+    assert all(record["exclusive_bytes"] > 0 for record in report["versions"])
@@ -0,0 +1,173 @@
+import pytest
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter, VersionChain
+
+
+def build_chain() -> VersionChain:
+    chain = VersionChain(["1", "2", "3", "4"])
+
+    @chain.request("2")
+    def request_2(body: list) -> list:
+        return [*body, "request 2"]
+
+    @chain.request("4")
+    def request_4(body: list) -> list:
+        return [*body, "request 4"]
+
+    @chain.response("2")
+    def response_2(body: list) -> list:
+        return [*body, "response 2"]
+
+    @chain.response("4", paths=["/other"])
+    def response_4(body: list) -> list:
+        return [*body, "response 4"]
+
+    return chain
+
+
+async def test__version_chain__compile__should_order_steps_and_skip_empty_versions():
+    chain = build_chain()
+    pipelines = chain.compile("/items")
+    # head and version without any applicable step have no pipeline
+    assert set(pipelines) == {"1", "2", "3"}
+    assert pipelines["1"].migrate_request([]) == ["request 2", "request 4"]
+    assert pipelines["1"].migrate_response([]) == ["response 2"]
+    assert pipelines["3"].migrate_request([]) == ["request 4"]
+    assert pipelines["3"].migrate_response([]) == []
+
+    other_pipelines = chain.compile("/other")
+    assert other_pipelines["1"].migrate_response([]) == ["response 4", "response 2"]
+
+
+async def test__version_chain__same_version_and_path__should_share_pipeline():
+    chain = build_chain()
+    assert chain.compile("/items")["1"] is chain.compile("/items")["1"]
+    chain.compile("/items")["1"].migrate_request([])
+    assert chain.stats()["1"].requests == 1
+
+
+@pytest.mark.parametrize(("versions", "error"), [([], "At least one"), (["1", "1"], "must be unique")])
+async def test__version_chain__invalid_versions__should_raise(versions: list[str], error: str):
+    with pytest.raises(ValueError, match=error):
+        VersionChain(versions)
+
+
+@pytest.mark.parametrize("version", ["1", "5"])
+async def test__version_chain__step_for_version_without_previous__should_raise(version: str):
+    with pytest.raises(ValueError, match="not a part of the chain"):
+        build_chain().request(version)
+
+
+async def test__migrated_route__deferred_router__should_register_all_chain_versions():
+    chain = VersionChain(["1", "2"])
+
+    @chain.response("2")
+    def wrap(body: dict) -> dict:
+        return {"wrapped": body}
+
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items")
+    @router.migrations(chain)
+    async def get_items() -> dict:
+        return {"items": []}
+
+    deferred_router = HeaderVersionedAPIRouter(deferred=True)
+    deferred_router.include_router(router, prefix="/api")
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(deferred_router)
+
+    client = TestClient(app)
+    assert client.get("/api/items", headers={"x-version": "1"}).json() == {"wrapped": {"items": []}}
+    assert client.get("/api/items", headers={"x-version": "2"}).json() == {"items": []}
+    assert client.get("/api/items", headers={"x-version": "0"}).status_code == 406
+
+
+def build_app() -> HeaderRoutingFastAPI:
+    chain = VersionChain(["1", "2"])
+
+    @chain.request("2")
+    def request_wrap(body: dict) -> dict:
+        return {"payload": body}
+
+    @chain.response("2")
+    def response_unwrap(body: dict) -> dict:
+        return body["payload"]
+
+    router = HeaderVersionedAPIRouter()
+
+    @router.post("/echo")
+    @router.migrations(chain)
+    async def echo(request: Request) -> Response:
+        body = await request.body()
+        if not body:
+            return JSONResponse({"detail": "empty"}, status_code=400)
+        if request.query_params.get("stream"):
+            return StreamingResponse(iter([b'{"payload": ', body, b"}"]), media_type="application/json")
+        return PlainTextResponse(body)
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    return app
+
+
+async def test__migrated_route__streamed_json_response__should_be_buffered_and_migrated():
+    client = TestClient(build_app())
+    result = client.post("/echo?stream=1", json={"a": 1}, headers={"x-version": "1"})
+    assert result.json() == {"payload": {"a": 1}}
+
+
+async def test__migrated_route__not_json_or_not_successful_response__should_not_be_migrated():
+    client = TestClient(build_app())
+    result = client.post("/echo", json={"a": 1}, headers={"x-version": "1"})
+    assert result.json() == {"payload": {"a": 1}}
+
+    result = client.post("/echo", headers={"x-version": "1", "content-type": "application/json"})
+    assert result.status_code == 400
+    assert result.json() == {"detail": "empty"}
+
+
+async def test__migrated_route__request_migrations_only__should_keep_response():
+    chain = VersionChain(["1", "2"])
+
+    @chain.request("2")
+    def rename(body: dict) -> dict:
+        return {"name": body["title"]}
+
+    router = HeaderVersionedAPIRouter()
+
+    @router.post("/items")
+    @router.migrations(chain)
+    async def create_item(request: Request) -> dict:
+        return {"created": await request.json()}
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    client = TestClient(app)
+    result = client.post("/items", json={"title": "item"}, headers={"x-version": "1"})
+    assert result.json() == {"created": {"name": "item"}}
+
+
+async def test__migrated_route__empty_json_response__should_be_sent_as_is():
+    chain = VersionChain(["1", "2"])
+
+    @chain.response("2")
+    def wrap(body: dict) -> dict:
+        raise AssertionError("empty body is not migrated")
+
+    router = HeaderVersionedAPIRouter()
+
+    @router.delete("/items")
+    @router.migrations(chain)
+    async def delete_items() -> Response:
+        return Response(media_type="application/json")
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    result = TestClient(app).delete("/items", headers={"x-version": "1"})
+    assert result.status_code == 200
+    assert result.content == b""
+    assert result.headers["content-length"] == "0"
@@ -0,0 +1,149 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.types import Receive, Scope, Send
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.dispatch import ResolutionKind
+from fastapi_header_versioning.mounts import import_app
+from fastapi_header_versioning.shedding import LoadShedder
+from fastapi_header_versioning.testing import assert_routing_equivalent
+
+
+def build_legacy_app(events: list[str]) -> Starlette:
+    async def get_item(request: Request) -> JSONResponse:
+        return JSONResponse(
+            {"legacy": True, "version": request.scope["requested_version"], "item_id": request.path_params["item_id"]},
+        )
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        events.append("legacy startup")
+        yield
+        events.append("legacy shutdown")
+
+    return Starlette(routes=[Route("/items/{item_id}", get_item)], lifespan=lifespan)
+
+
+def build_app(events: list[str], load_shedder: LoadShedder | None = None) -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items/{item_id}")
+    @router.version("4")
+    async def get_item(item_id: int):
+        return {"legacy": False, "item_id": item_id}
+
+    @asynccontextmanager
+    async def lifespan(app: HeaderRoutingFastAPI) -> AsyncIterator[None]:
+        events.append("app startup")
+        yield
+        events.append("app shutdown")
+
+    app = HeaderRoutingFastAPI(version_header="x-version", lifespan=lifespan, load_shedder=load_shedder)
+    app.include_router(router)
+    app.mount_version(["1", "2", "3"], build_legacy_app(events))
+    return app
+
+
+@pytest.mark.parametrize(
+    ("requested_version", "expected"),
+    [
+        ("2", {"legacy": True, "version": "2", "item_id": "1"}),
+        # resolved with the same floor fallback as routes
+        ("3.5", {"legacy": True, "version": "3", "item_id": "1"}),
+        ("4", {"legacy": False, "item_id": 1}),
+        ("5", {"legacy": False, "item_id": 1}),
+    ],
+)
+async def test__mount_version__should_dispatch_resolved_version_to_app(requested_version: str, expected: dict):
+    client = TestClient(build_app([]))
+    result = client.get("/items/1", headers={"x-version": requested_version})
+    assert result.status_code == 200
+    assert result.json() == expected
+
+
+async def test__mount_version__path_of_mounted_version__should_be_handled_by_app_only():
+    client = TestClient(build_app([]))
+    assert client.get("/missing", headers={"x-version": "1"}).text == "Not Found"
+    assert client.get("/items/1", headers={"x-version": "0"}).status_code == 406
+
+
+async def test__mount_version__should_resolve_before_route_matching():
+    app = build_app([])
+    resolution = app.router.resolve({"type": "http", "path": "/items/1", "method": "GET", "requested_version": "2"})
+    assert resolution.kind == ResolutionKind.APP
+    assert resolution.route is None
+    assert_routing_equivalent(app, samples=300)
+
+
+async def test__mount_version__should_forward_lifespan_events():
+    events: list[str] = []
+    with TestClient(build_app(events)):
+        assert events == ["legacy startup", "app startup"]
+    assert events == ["legacy startup", "app startup", "app shutdown", "legacy shutdown"]
+
+
+async def test__mount_version__several_apps__should_forward_lifespan_events_to_each():
+    events: list[str] = []
+    app = build_app(events)
+    app.mount_version(["5"], build_legacy_app(events))
+    with TestClient(app) as client:
+        assert events == ["legacy startup", "legacy startup", "app startup"]
+        assert client.get("/items/1", headers={"x-version": "5"}).json()["legacy"] is True
+        assert client.get("/items/1", headers={"x-version": "4"}).json()["legacy"] is False
+    assert events[3:] == ["app shutdown", "legacy shutdown", "legacy shutdown"]
+
+
+async def test__mount_version__app_without_lifespan__should_be_skipped():
+    async def plain_app(scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            raise RuntimeError("Lifespan is not supported")
+        await JSONResponse({"plain": True})(scope, receive, send)
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.mount_version(["1"], plain_app)
+    with TestClient(app) as client:
+        assert client.get("/", headers={"x-version": "1"}).json() == {"plain": True}
+
+
+async def test__mount_version__app_startup_failed__should_fail_startup():
+    async def failing_app(scope: Scope, receive: Receive, send: Send) -> None:
+        await receive()
+        await send({"type": "lifespan.startup.failed", "message": "no database"})
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.mount_version(["1"], failing_app)
+    with pytest.raises(RuntimeError, match="no database"), TestClient(app):
+        raise AssertionError("startup should fail")
+
+
+async def test__mount_version__app_shutdown_failed__should_fail_shutdown():
+    async def failing_app(scope: Scope, receive: Receive, send: Send) -> None:
+        await receive()
+        await send({"type": "lifespan.startup.complete"})
+        await receive()
+        await send({"type": "lifespan.shutdown.failed", "message": "connections leaked"})
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.mount_version(["1"], failing_app)
+    with pytest.raises(RuntimeError, match="connections leaked"), TestClient(app):
+        pass
+
+
+async def test__mount_version__overloaded__should_shed_mounted_versions():
+    load_shedder = LoadShedder({"1": 0, "2": 0, "3": 0}, max_in_flight=0)
+    client = TestClient(build_app([], load_shedder))
+    assert client.get("/items/1", headers={"x-version": "2"}).status_code == 503
+    assert client.get("/items/1", headers={"x-version": "4"}).status_code == 200
+
+
+async def test__import_app__should_import_by_module_and_attribute():
+    assert import_app("tests.test_mounts:build_app") is build_app
+    with pytest.raises(ValueError, match="module:attribute"):
+        import_app("tests.test_mounts")
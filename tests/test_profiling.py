@@ -0,0 +1,110 @@
+import json
+from pathlib import Path
+
+from fastapi import APIRouter
+from fastapi.testclient import TestClient
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.profiling import get_active_profiler, profile_build
+
+
+def build_app() -> HeaderRoutingFastAPI:
+    router = APIRouter()
+
+    @router.get("/items")
+    async def get_items():
+        return ["item"]
+
+    versioned_router = HeaderVersionedAPIRouter()
+
+    @versioned_router.get("/other")
+    @versioned_router.version("2")
+    async def get_other():
+        return {"other": True}
+
+    root_router = HeaderVersionedAPIRouter()
+    root_router.include_router(router, version="1")
+    root_router.include_router(versioned_router)
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(root_router, prefix="/api")
+    return app
+
+
+async def test__profile_build__nested_include_router__should_count_route_rebuilds(tmp_path: Path):
+    json_path = tmp_path / "profile.json"
+    with profile_build(json_path=str(json_path)) as profiler:
+        assert get_active_profiler() is profiler
+        build_app()
+
+    assert get_active_profiler() is None
+    report = profiler.as_dict()
+    routes = {route["path"]: route for route in report["routes"]}
+    # built in root router, re-created in app router. APIRouter construction is not tracked
+    assert routes["/api/items"]["builds"] == 1
+    assert routes["/api/items"]["rebuilds"] == 1
+    assert routes["/api/items"]["version"] == "1"
+    # declared in versioned router, then re-created on each include level
+    assert routes["/api/other"]["builds"] == 1
+    assert routes["/api/other"]["rebuilds"] == 2
+    assert routes["/api/other"]["version"] == "2"
+
+    assert {version["version"] for version in report["versions"]} == {"1", "2"}
+    assert len(report["includes"]) == 3
+    assert json.loads(json_path.read_text()) == json.loads(profiler.as_json())
+
+    text_report = profiler.as_text()
+    assert "/api/items" in text_report
+    assert "/api/other" in text_report
+
+
+async def test__profile_build__endpoint_included_with_several_versions__should_report_each_version():
+    router = APIRouter()
+
+    @router.get("/items")
+    async def get_items():
+        return ["item"]
+
+    with profile_build() as profiler:
+        root_router = HeaderVersionedAPIRouter()
+        for version in ("1", "2", "3"):
+            root_router.include_router(router, version=version)
+        app = HeaderRoutingFastAPI(version_header="x-version")
+        app.include_router(root_router)
+
+    routes = profiler.as_dict()["routes"]
+    assert sorted(route["version"] for route in routes) == ["1", "2", "3"]
+    assert all(route["builds"] == 1 and route["rebuilds"] == 1 for route in routes)
+    versions = {version.version: version for version in profiler.versions()}
+    assert versions.keys() == {"1", "2", "3"}
+    assert all(version.routes == 1 and version.builds == 1 for version in versions.values())
+    assert TestClient(app).get("/items", headers={"x-version": "3"}).json() == ["item"]
+
+
+async def test__profile_build__memory_tracing_disabled__should_report_only_time():
+    with profile_build(trace_memory=False) as profiler:
+        build_app()
+
+    report = profiler.as_dict()
+    assert report["total_allocated_bytes"] == 0
+    assert report["total_seconds"] > 0
+
+
+async def test__profile_build__app_built_outside__should_not_collect_anything():
+    with profile_build() as profiler:
+        pass
+
+    client = TestClient(build_app())
+    assert profiler.as_dict()["routes"] == []
+    assert client.get("/api/items", headers={"x-version": "1"}).json() == ["item"]
+    assert client.get("/api/other", headers={"x-version": "2"}).json() == {"other": True}
+
+
+async def test__profile_build__nested__should_collect_into_inner_profiler():
+    with profile_build(trace_memory=False) as outer:
+        with profile_build(trace_memory=False) as inner:
+            build_app()
+        assert get_active_profiler() is None
+
+    assert outer.as_dict()["routes"] == []
+    assert len(inner.as_dict()["routes"]) == 2
@@ -0,0 +1,250 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+import uvicorn
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.replay import (
+    ASGITarget,
+    HTTPTarget,
+    LogEntry,
+    StaleConnectionError,
+    main,
+    parse_access_log,
+    parse_arguments,
+    percentile,
+    replay,
+    run,
+)
+
+ACCESS_LOG = """
+# timestamp method path version
+1700000000.00 GET /items/1 1
+1700000000.01 GET /items/2 1.5
+2023-11-14T22:13:20.02+00:00 get /items/3 2
+1700000000.03 GET /stream 2
+1700000000.04 GET /health -
+1700000000.05 GET /items/4 0
+1700000000.06 GET /fail 2
+"""
+
+
+def build_app() -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items/{item_id}")
+    @router.version("1")
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    @router.get("/items/{item_id}")
+    @router.version("2")
+    async def get_item_v2(item_id: int):
+        return {"item_id": item_id, "version": 2}
+
+    @router.get("/stream")
+    @router.version("2")
+    async def stream():
+        async def chunks() -> AsyncIterator[bytes]:
+            for chunk in (b"first", b"second"):
+                yield chunk
+
+        return StreamingResponse(chunks())
+
+    @router.get("/fail")
+    @router.version("2")
+    async def fail():
+        return StreamingResponse(iter([b"partial"]), status_code=503, headers={"connection": "close"})
+
+    @router.get("/health")
+    async def health():
+        return {}
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    return app
+
+
+app = build_app()
+
+
+@asynccontextmanager
+async def running_server(timeout_keep_alive: float = 5) -> AsyncIterator[str]:
+    config = uvicorn.Config(
+        app,
+        host="127.0.0.1",
+        port=0,
+        log_level="warning",
+        lifespan="off",
+        timeout_keep_alive=timeout_keep_alive,  # type: ignore[arg-type]
+    )
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+async def test__parse_access_log__should_parse_entries():
+    entries = list(parse_access_log(ACCESS_LOG.splitlines()))
+    assert entries[:3] == [
+        LogEntry(1700000000.0, "GET", "/items/1", "1"),
+        LogEntry(1700000000.01, "GET", "/items/2", "1.5"),
+        LogEntry(1700000000.02, "GET", "/items/3", "2"),
+    ]
+    assert entries[4].version is None
+    with pytest.raises(ValueError, match="Line 2"):
+        list(parse_access_log(["", "1700000000 GET /items"]))
+
+
+async def test__replay__in_process__should_report_requested_and_resolved_versions():
+    entries = list(parse_access_log(ACCESS_LOG.splitlines()))
+    report = await replay(ASGITarget(app), entries, speed=None, concurrency=3)
+
+    assert report.requests == 7
+    assert {version: stats.requests for version, stats in report.by_requested_version.items()} == {
+        "1": 1,
+        "1.5": 1,
+        "2": 3,
+        None: 1,
+        "0": 1,
+    }
+    # 1.5 falls back to 1, not resolved 0 and not versioned request are reported without version
+    assert {version: stats.requests for version, stats in report.by_resolved_version.items()} == {
+        "1": 2,
+        "2": 3,
+        None: 2,
+    }
+    assert report.by_requested_version["2"].errors == 1
+    assert report.throughput > 0
+    formatted = report.format()
+    assert "7 requests" in formatted
+    assert "p99 ms" in formatted
+
+
+async def test__replay__in_process__should_run_app_lifespan():
+    events: list[str] = []
+
+    @asynccontextmanager
+    async def lifespan(_: HeaderRoutingFastAPI) -> AsyncIterator[dict]:
+        events.append("startup")
+        yield {"greeting": "hello"}
+        events.append("shutdown")
+
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/greeting")
+    @router.version("1")
+    async def greeting(request: Request):
+        events.append(request.state.greeting)
+        return {}
+
+    lifespan_app = HeaderRoutingFastAPI(version_header="x-version", lifespan=lifespan)
+    lifespan_app.include_router(router)
+    report = await replay(ASGITarget(lifespan_app), [LogEntry(0, "GET", "/greeting", "1")], speed=None)
+    assert report.by_requested_version["1"].errors == 0
+    assert events == ["startup", "hello", "shutdown"]
+
+
+async def test__replay__speed__should_keep_log_timing():
+    entries = [LogEntry(100.0, "GET", "/health", None), LogEntry(100.1, "GET", "/health", None)]
+    report = await replay(ASGITarget(app), entries, speed=2)
+    assert report.seconds >= 0.05
+
+
+async def test__replay__failed_request__should_be_counted_as_error():
+    class FailingTarget(ASGITarget):
+        async def send(self, entry: LogEntry) -> tuple[int, str | None]:
+            raise ConnectionError
+
+    report = await replay(FailingTarget(app), [LogEntry(0, "GET", "/", "1")], speed=None)
+    assert report.by_requested_version["1"].errors == 1
+    assert report.by_resolved_version[None].errors == 1
+    assert percentile([], 99) == 0.0
+
+
+async def test__replay__http__should_send_requests_over_keep_alive_connections(tmp_path: Path):
+    log_path = tmp_path / "access.log"
+    log_path.write_text(ACCESS_LOG + "1700000000.07 HEAD /items/5 2\n")
+    async with running_server() as url:
+        report = await run(
+            parse_arguments([str(log_path), "--url", url, "--app", "tests.test_replay:app", "--speed", "0"]),
+        )
+
+    assert report.requests == 8
+    assert report.by_resolved_version["1"].requests == 2
+    assert report.by_requested_version["2"].errors == 1
+
+
+async def test__http_target__idle_connection__should_be_reused():
+    entry = LogEntry(0, "GET", "/items/1", "1")
+    async with running_server() as url:
+        target = HTTPTarget(url)
+        assert await target.send(entry) == (200, None)
+        [(_, idle_writer)] = target._idle
+
+        assert await target.send(entry) == (200, None)
+        [(_, reused_writer)] = target._idle
+        assert reused_writer is idle_writer
+        assert not idle_writer.is_closing()
+        await target.close()
+
+
+async def test__http_target__idle_connection_closed_by_server__should_reconnect():
+    entry = LogEntry(0, "GET", "/items/1", "1")
+    async with running_server(timeout_keep_alive=0.05) as url:
+        target = HTTPTarget(url)
+        assert await target.send(entry) == (200, None)
+        [(_, idle_writer)] = target._idle
+        await asyncio.sleep(0.3)
+
+        assert await target.send(entry) == (200, None)
+        assert idle_writer.is_closing()
+        assert len(target._idle) == 1
+        await target.close()
+
+
+async def test__http_target__broken_connection__should_be_closed_and_dropped():
+    async def close_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await reader.readuntil(b"\r\n\r\n")
+        writer.close()
+
+    async def respond_garbage(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"garbage\r\n")
+        await writer.drain()
+
+    entry = LogEntry(0, "GET", "/", None)
+    for handler, error in ((close_connection, StaleConnectionError), (respond_garbage, IndexError)):
+        server = await asyncio.start_server(handler, "127.0.0.1", 0)
+        target = HTTPTarget(f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}")
+        async with server:
+            with pytest.raises(error):
+                await target.send(entry)
+        assert target._idle == []
+
+
+async def test__http_target__should_validate_url():
+    with pytest.raises(ValueError, match="Only http"):
+        HTTPTarget("https://example.com")
+    target = HTTPTarget("http://127.0.0.1:1")
+    assert target.port == 1
+    with pytest.raises(ValueError, match="--app or --url"):
+        await run(parse_arguments(["/dev/null"]))
+
+
+def test__main__should_print_report(tmp_path: Path, capsys: pytest.CaptureFixture):
+    log_path = tmp_path / "access.log"
+    log_path.write_text(ACCESS_LOG)
+    main([str(log_path), "--app", "tests.test_replay:app", "--speed", "0", "--concurrency", "2"])
+    assert "requested version" in capsys.readouterr().out
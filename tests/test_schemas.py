@@ -0,0 +1,243 @@
+from fastapi import Depends, FastAPI, Request
+from fastapi.openapi.utils import get_openapi
+from fastapi.security import HTTPBearer
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from starlette.responses import PlainTextResponse
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.openapi import VersionDocsMount, doc_generation
+from fastapi_header_versioning.schemas import SchemaRegistry
+
+
+class Owner(BaseModel):
+    name: str
+
+
+class Item(BaseModel):
+    """Item\finternal notes"""
+
+    title: str
+    owner: Owner
+
+
+class ItemV2(BaseModel):
+    title: str
+    owner: Owner
+    tags: list[str]
+
+
+def build_app(combined_docs: bool = False, registry: SchemaRegistry | None = None) -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items", response_model=Item)
+    @router.version("1")
+    async def get_item():
+        return Item(title="item", owner=Owner(name="owner"))
+
+    @router.get("/items", response_model=ItemV2)
+    @router.version("2")
+    async def get_item_v2():
+        return ItemV2(title="item", owner=Owner(name="owner"), tags=["new"])
+
+    # the same operation declared in both versions
+    for version in ("1", "2"):
+
+        @router.get("/owners", response_model=Owner)
+        @router.version(version)
+        async def get_owner():
+            return Owner(name="owner")
+
+    @router.post("/owners", response_model=Owner)
+    @router.version("2")
+    async def create_owner(owner: Owner):
+        return owner
+
+    app = HeaderRoutingFastAPI(version_header="x-version", title="Items")
+    app.include_router(router)
+    return doc_generation(app, combined_docs=combined_docs, registry=registry)
+
+
+def docs_apps(app: HeaderRoutingFastAPI) -> dict[str | None, VersionDocsMount]:
+    return {route.api_version: route for route in app.routes if isinstance(route, VersionDocsMount)}
+
+
+async def test__registry_openapi__should_equal_fastapi_openapi():
+    app = build_app()
+    for mount in docs_apps(app).values():
+        versioned_app = mount.app
+        expected = get_openapi(
+            title=versioned_app.title,
+            version=versioned_app.version,
+            description=versioned_app.description,
+            routes=versioned_app.routes,
+        )
+        assert SchemaRegistry().openapi(versioned_app) == expected
+
+
+async def test__registry_openapi__app_metadata__should_equal_fastapi_openapi():
+    app = FastAPI(
+        title="Items",
+        summary="Items service",
+        terms_of_service="https://example.com/terms",
+        contact={"name": "Items team"},
+        license_info={"name": "MIT"},
+        servers=[{"url": "https://example.com"}],
+        openapi_tags=[{"name": "items"}],
+    )
+
+    @app.get("/items", tags=["items"], dependencies=[Depends(HTTPBearer())])
+    async def get_items():
+        return []
+
+    @app.get("/hidden", include_in_schema=False)
+    async def hidden():
+        return {}
+
+    assert SchemaRegistry().openapi(app) == app.openapi()
+    client = TestClient(app)
+    assert client.get("/items", headers={"Authorization": "Bearer token"}).json() == []
+    assert client.get("/hidden").json() == {}
+
+
+async def test__registry_openapi__app_without_summary_and_webhooks__should_generate_document():
+    # FastAPI before 0.99 has neither of them
+    app = FastAPI(title="Items")
+    del app.summary
+    del app.webhooks
+
+    @app.get("/items")
+    async def get_items():
+        return []
+
+    expected = get_openapi(title=app.title, version=app.version, routes=app.routes)
+    assert SchemaRegistry().openapi(app) == expected
+    assert TestClient(app).get("/items").json() == []
+
+
+async def test__version_docs__registry__should_not_change_dispatch():
+    client = TestClient(build_app(registry=SchemaRegistry()))
+    assert client.get("/items", headers={"x-version": "1"}).json() == {"title": "item", "owner": {"name": "owner"}}
+    assert client.get("/items", headers={"x-version": "2"}).json()["tags"] == ["new"]
+    assert client.get("/owners", headers={"x-version": "2"}).json() == {"name": "owner"}
+    assert client.post("/owners", json={"name": "new"}, headers={"x-version": "2"}).json() == {"name": "new"}
+
+
+async def test__version_docs__plain_route__should_not_be_documented():
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items")
+    @router.version("1")
+    async def get_items():
+        return []
+
+    async def health(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("ok")
+
+    router.add_route("/health", health)
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    client = TestClient(doc_generation(app, registry=SchemaRegistry()))
+    assert client.get("/version_1/openapi.json").json()["paths"].keys() == {"/items"}
+    assert client.get("/health").text == "ok"
+    assert client.get("/items", headers={"x-version": "1"}).json() == []
+
+
+async def test__registry_combine__no_documents__should_return_empty_document():
+    assert SchemaRegistry().combine({}, {"title": "Empty", "version": "1"}) == {
+        "openapi": "3.1.0",
+        "info": {"title": "Empty", "version": "1"},
+        "paths": {},
+    }
+
+
+async def test__version_docs__registry__equal_schemas__should_be_shared_between_versions():
+    mounts = docs_apps(build_app(registry=SchemaRegistry()))
+    schemas_v1 = mounts["1"].app.openapi()["components"]["schemas"]
+    schemas_v2 = mounts["2"].app.openapi()["components"]["schemas"]
+    assert schemas_v1["Owner"] is schemas_v2["Owner"]
+    assert mounts["1"].app.openapi() is mounts["1"].app.openapi()
+    assert schemas_v1["Item"]["description"] == "Item"
+
+
+async def test__version_docs__no_registry__should_use_fastapi_openapi():
+    mounts = docs_apps(build_app())
+    schemas_v1 = mounts["1"].app.openapi()["components"]["schemas"]
+    schemas_v2 = mounts["2"].app.openapi()["components"]["schemas"]
+    assert schemas_v1["Owner"] == schemas_v2["Owner"]
+    assert schemas_v1["Owner"] is not schemas_v2["Owner"]
+
+
+async def test__registry__equal_fragments__should_be_stored_once():
+    registry = SchemaRegistry()
+    mounts = docs_apps(build_app())
+    document_v1 = registry.openapi(mounts["1"].app)
+    stats_v1 = registry.stats()
+    document_v2 = registry.openapi(mounts["2"].app)
+    stats = registry.stats()
+
+    assert document_v1["paths"]["/owners"]["get"] is document_v2["paths"]["/owners"]["get"]
+    assert stats.reused_fragments > stats_v1.reused_fragments
+    assert document_v1["components"]["schemas"]["Owner"] is document_v2["components"]["schemas"]["Owner"]
+
+
+async def test__combined_docs__should_list_operations_with_versions():
+    client = TestClient(build_app(combined_docs=True))
+    document = client.get("/all_versions/openapi.json").json()
+
+    assert document["info"]["title"] == "Items"
+    owners = document["paths"]["/owners"]
+    assert owners["get"]["x-versions"] == ["1", "2"]
+    assert owners["post"]["x-versions"] == ["2"]
+    assert document["components"]["schemas"]["Owner"] == {
+        "title": "Owner",
+        "type": "object",
+        "properties": {"name": {"title": "Name", "type": "string"}},
+        "required": ["name"],
+    }
+
+
+async def test__combined_docs__different_operations__should_be_listed_as_variants():
+    [combined_mount] = [route for route in build_app(combined_docs=True).routes if route.path == "/all_versions"]
+    document = combined_mount.app.openapi()
+    assert combined_mount.app.openapi() is document
+    items = document["paths"]["/items"]["get"]
+    assert items["x-versions"] == ["2"]
+    assert items["responses"]["200"]["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/ItemV2",
+    }
+    [variant] = items["x-version-variants"]
+    assert variant["x-versions"] == ["1"]
+
+
+async def test__registry_combine__conflicting_schemas__should_get_version_suffix():
+    def document(owner_schema: dict) -> dict:
+        return {
+            "openapi": "3.0.2",
+            "paths": {
+                "/owners": {
+                    "get": {"responses": {"200": {"schema": {"$ref": "#/components/schemas/Owner"}}}},
+                },
+            },
+            "components": {
+                "schemas": {"Owner": owner_schema},
+                "securitySchemes": {"key": {"type": "apiKey"}},
+            },
+        }
+
+    combined = SchemaRegistry().combine(
+        {"2": document({"type": "string"}), None: document({"type": "object"})},
+        {"title": "Owners", "version": "1"},
+    )
+    assert combined["openapi"] == "3.0.2"
+    assert combined["components"]["schemas"] == {
+        "Owner__no_version": {"type": "object"},
+        "Owner__2": {"type": "string"},
+    }
+    assert combined["components"]["securitySchemes"] == {"key": {"type": "apiKey"}}
+    operation = combined["paths"]["/owners"]["get"]
+    assert operation["responses"]["200"]["schema"] == {"$ref": "#/components/schemas/Owner__2"}
+    assert operation["x-versions"] == ["2"]
+    assert operation["x-version-variants"][0]["responses"]["200"]["schema"] == {
+        "$ref": "#/components/schemas/Owner__no_version",
+    }
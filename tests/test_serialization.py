@@ -0,0 +1,183 @@
+import datetime
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+from fastapi import Response
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, Field
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.serialization import (
+    FastSerializationAPIRoute,
+    RenderedJSONResponse,
+    TrustedSerializationAPIRoute,
+)
+
+
+class Item(BaseModel):
+    item_id: UUID
+    name: str = Field(alias="itemName")
+    price: Decimal
+    created_at: datetime.datetime
+    description: str | None = None
+
+
+class InternalItem(Item):
+    secret: str
+
+
+ITEM = {
+    "item_id": UUID(int=1),
+    "itemName": "żółw",
+    "price": Decimal("1.5"),
+    "created_at": datetime.datetime(2020, 1, 2, 3, 4, 5),
+}
+
+
+def build_app(version: str, route_class: type | None = None) -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items", response_model=list[Item])
+    @router.version(version, route_class=route_class)
+    async def get_items():
+        return [ITEM, Item(**ITEM), InternalItem(**ITEM, secret="secret")]
+
+    @router.get("/items/sync", response_model=Item, response_model_exclude_none=True)
+    @router.version(version, route_class=route_class)
+    def get_item_sync(response: Response):
+        response.headers["x-sync"] = "true"
+        response.status_code = 201
+        return ITEM
+
+    @router.get("/untyped")
+    @router.version(version, route_class=route_class)
+    async def get_untyped():
+        return {"items": [Item(**ITEM)], "tags": {"a"}, "when": datetime.date(2020, 1, 1)}
+
+    @router.get("/plain", response_class=PlainTextResponse)
+    @router.version(version, route_class=route_class)
+    async def get_plain():
+        return "plain"
+
+    @router.get("/partial", response_model=Item, response_model_include={"name"})
+    @router.version(version, route_class=route_class)
+    async def get_partial():
+        return ITEM
+
+    @router.get("/response")
+    @router.version(version, route_class=route_class)
+    async def get_response():
+        return Response("raw", media_type="text/plain")
+
+    @router.get("/empty", status_code=204)
+    @router.version(version, route_class=route_class)
+    async def get_empty():
+        return None
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    return app
+
+
+@pytest.mark.parametrize("path", ["/items", "/items/sync", "/untyped", "/plain", "/partial", "/response", "/empty"])
+async def test__fast_serialization__should_render_same_response_as_fastapi(path: str):
+    regular = TestClient(build_app("1")).get(path, headers={"x-version": "1"})
+    fast = TestClient(build_app("1", FastSerializationAPIRoute)).get(path, headers={"x-version": "1"})
+    assert fast.status_code == regular.status_code
+    assert fast.content == regular.content
+    assert fast.headers == regular.headers
+
+
+async def test__fast_serialization__should_filter_fields_of_model_subclass():
+    result = TestClient(build_app("1", FastSerializationAPIRoute)).get("/items", headers={"x-version": "1"})
+    assert all("secret" not in item for item in result.json())
+
+
+@pytest.mark.parametrize("route_class", [APIRoute, FastSerializationAPIRoute])
+async def test__fast_serialization__invalid_output__should_raise_response_validation_error(
+    route_class: type[APIRoute],
+):
+    router = HeaderVersionedAPIRouter(route_class=route_class)
+
+    @router.get("/items", response_model=Item)
+    @router.version("1")
+    async def get_item():
+        return {"item_id": "not an uuid"}
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    with pytest.raises(ResponseValidationError) as exc_info:
+        TestClient(app).get("/items", headers={"x-version": "1"})
+    # same errors as regular FastAPI serialization raises
+    assert exc_info.value.errors()[0]["loc"] == ("response", "item_id")
+    assert exc_info.value.body == {"item_id": "not an uuid"}
+
+
+async def test__trusted_serialization__should_dump_handler_output_as_is():
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items", response_model=list[Item])
+    @router.version("1", route_class=TrustedSerializationAPIRoute)
+    async def get_items():
+        return [{"legacy": True}, InternalItem(**ITEM, secret="secret")]
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    result = TestClient(app).get("/items", headers={"x-version": "1"})
+    assert result.json() == [
+        {"legacy": True},
+        {
+            "item_id": str(UUID(int=1)),
+            "itemName": "żółw",
+            "price": 1.5,
+            "created_at": "2020-01-02T03:04:05",
+            "description": None,
+            "secret": "secret",
+        },
+    ]
+
+
+async def test__version_route_class__should_opt_in_only_selected_version():
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items", response_model=list[Item])
+    @router.version("1", route_class=TrustedSerializationAPIRoute)
+    async def get_legacy_items():
+        return [Item(**ITEM)]
+
+    @router.get("/items", response_model=list[Item])
+    @router.version("2")
+    async def get_items():
+        return [Item(**ITEM)]
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    routes = {route.api_version: route for route in app.routes if getattr(route, "api_version", None)}
+    assert isinstance(routes["1"], TrustedSerializationAPIRoute)
+    assert not isinstance(routes["2"], FastSerializationAPIRoute)
+
+    client = TestClient(app)
+    legacy_result = client.get("/items", headers={"x-version": "1"})
+    assert legacy_result.json() == client.get("/items", headers={"x-version": "2"}).json()
+
+
+async def test__router_route_class__should_be_base_of_versioned_routes():
+    router = HeaderVersionedAPIRouter("1", route_class=FastSerializationAPIRoute)
+
+    @router.get("/items")
+    async def get_items():
+        return []
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    [route] = [route for route in app.routes if getattr(route, "api_version", None) == "1"]
+    assert isinstance(route, FastSerializationAPIRoute)
+    assert TestClient(app).get("/items", headers={"x-version": "1"}).json() == []
+
+
+async def test__rendered_json_response__should_render_other_content_as_json_response():
+    assert RenderedJSONResponse({"a": "ż"}).body == '{"a":"ż"}'.encode()
@@ -0,0 +1,179 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.testclient import TestClient
+from starlette.types import Message
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter, ShadowTraffic
+from fastapi_header_versioning.shadow import BodyRecorder
+
+
+def build_app(shadow_traffic: ShadowTraffic) -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+    calls = []
+
+    @router.get("/items/{item_id}")
+    @router.version("1")
+    async def get_item(item_id: int):
+        calls.append(("1", item_id))
+        if item_id < 0:
+            raise HTTPException(400)
+        return {"item_id": item_id}
+
+    @router.get("/items/{item_id}")
+    @router.version("2")
+    async def get_item_v2(item_id: int):
+        calls.append(("2", item_id))
+        await asyncio.sleep(0.01)
+        if item_id == 0:
+            raise HTTPException(404)
+        return {"id": item_id}
+
+    @router.post("/items")
+    @router.version("1")
+    async def create_item(request: Request):
+        return await request.json()
+
+    @router.post("/items")
+    @router.version("2")
+    async def create_item_v2(request: Request):
+        calls.append(("2", await request.json(), await request.is_disconnected()))
+        return {}
+
+    async def session(request: Request) -> AsyncIterator[None]:
+        calls.append(("open", request.scope["fastapi_astack"], request.scope["router"]))
+        yield
+        calls.append(("close", request.scope["fastapi_astack"], request.scope["router"]))
+
+    for version in ("1", "2"):
+
+        @router.get("/sessions", name=f"get_session_{version}")
+        @router.version(version)
+        async def get_session(request: Request, _: None = Depends(session)):
+            return request.url_for("get_session_1").path
+
+    @router.get("/other")
+    @router.version("1")
+    async def get_other():
+        return {}
+
+    @router.post("/other")
+    @router.version("1")
+    async def create_other():
+        # request body is not read
+        return {}
+
+    app = HeaderRoutingFastAPI(version_header="x-version", shadow_traffic=shadow_traffic)
+    app.include_router(router)
+    app.state.calls = calls
+    return app
+
+
+async def test__shadow_traffic__sampled_request__should_be_mirrored_to_candidate_version():
+    shadow_traffic = ShadowTraffic("2", sample_rate=1.0)
+    app = build_app(shadow_traffic)
+    with TestClient(app) as client:
+        result = client.get("/items/1", headers={"x-version": "1"})
+        assert result.json() == {"item_id": 1}
+        assert client.get("/items/0", headers={"x-version": "1"}).status_code == 200
+        assert client.get("/items/-1", headers={"x-version": "1"}).status_code == 400
+        client.portal.call(shadow_traffic.drain)
+
+    assert app.state.calls == [("1", 1), ("2", 1), ("1", 0), ("2", 0), ("1", -1), ("2", -1)]
+    stats = shadow_traffic.stats[("GET", "/items/{item_id}", "1")]
+    assert stats.primary.requests == 3
+    assert stats.primary.status_codes == {200: 2, 400: 1}
+    assert stats.candidate.status_codes == {200: 2, 404: 1}
+    assert stats.candidate.mean_seconds >= 0.01
+
+
+async def test__shadow_traffic__not_sampled_requests__should_not_be_mirrored():
+    shadow_traffic = ShadowTraffic("2", sample_rate=0.0)
+    app = build_app(shadow_traffic)
+    with TestClient(app) as client:
+        client.get("/items/1", headers={"x-version": "1"})
+        # candidate version itself and unsafe methods are never mirrored
+        shadow_traffic.sample_rate = 1.0
+        client.get("/items/1", headers={"x-version": "2"})
+        client.post("/items", json={"a": 1}, headers={"x-version": "1"})
+        client.portal.call(shadow_traffic.drain)
+
+    assert app.state.calls == [("1", 1), ("2", 1)]
+    assert shadow_traffic.stats == {}
+
+
+async def test__shadow_traffic__request_body__should_be_shared_with_copy():
+    shadow_traffic = ShadowTraffic("2", sample_rate=1.0, methods=["POST"])
+    app = build_app(shadow_traffic)
+    with TestClient(app) as client:
+        result = client.post("/items", json={"a": 1}, headers={"x-version": "1"})
+        assert result.json() == {"a": 1}
+        client.portal.call(shadow_traffic.drain)
+
+    # the copy has no client - it is disconnected once the body is replayed
+    assert app.state.calls == [("2", {"a": 1}, True)]
+
+
+async def test__shadow_traffic__no_candidate_route_or_body_not_read__should_be_skipped():
+    shadow_traffic = ShadowTraffic("2", sample_rate=1.0, methods=["GET", "POST"])
+    app = build_app(shadow_traffic)
+    with TestClient(app) as client:
+        # version 2 falls back to the same version 1 route
+        assert client.get("/other", headers={"x-version": "1"}).status_code == 200
+        assert client.post("/other", json={"a": 1}, headers={"x-version": "1"}).status_code == 200
+        client.portal.call(shadow_traffic.drain)
+
+    for method in ("GET", "POST"):
+        stats = shadow_traffic.stats[(method, "/other", "1")]
+        assert stats.skipped == 1
+        assert stats.candidate.requests == 0
+
+
+async def test__shadow_traffic__copy__should_get_own_request_state():
+    shadow_traffic = ShadowTraffic("2", sample_rate=1.0)
+    app = build_app(shadow_traffic)
+    with TestClient(app) as client:
+        assert client.get("/sessions", headers={"x-version": "1"}).json() == "/sessions"
+        client.portal.call(shadow_traffic.drain)
+
+    [primary_open, primary_close, shadow_open, shadow_close] = app.state.calls
+    assert [call[0] for call in app.state.calls] == ["open", "close", "open", "close"]
+    assert primary_open[1] is primary_close[1]
+    # yield dependency of the copy is torn down by its own exit stack
+    assert shadow_open[1] is shadow_close[1]
+    assert shadow_open[1] is not primary_open[1]
+    assert shadow_open[2] is app.router
+    stats = shadow_traffic.stats[("GET", "/sessions", "1")]
+    assert stats.candidate.status_codes == {200: 1}
+
+
+async def test__shadow_traffic__copy_scope__should_drop_per_request_state():
+    shadow_traffic = ShadowTraffic("2")
+    router = HeaderVersionedAPIRouter()
+    scope = {
+        "type": "http",
+        "path": "/items",
+        "fastapi_astack": object(),
+        "endpoint": object(),
+        "path_params": {"item_id": 1},
+        "version_resolution": object(),
+        "state": {"key": "value"},
+    }
+    shadow_scope = shadow_traffic.copy_scope(scope, router)
+    assert shadow_scope == {"type": "http", "path": "/items", "router": router, "state": {"key": "value"}}
+    assert shadow_scope["state"] is not scope["state"]
+    assert "state" not in shadow_traffic.copy_scope({"type": "http"}, router)
+
+
+async def test__body_recorder__client_disconnected__should_keep_body_incomplete():
+    messages = iter([{"type": "http.request", "body": b"first", "more_body": True}, {"type": "http.disconnect"}])
+
+    async def receive() -> Message:
+        return next(messages)
+
+    recorder = BodyRecorder(receive)
+    assert (await recorder.receive())["type"] == "http.request"
+    assert (await recorder.receive())["type"] == "http.disconnect"
+    assert recorder.chunks == [b"first"]
+    assert not recorder.complete
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter, LoadShedder
+
+
+def build_app(load_shedder: LoadShedder) -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+    for version in ["1", "2"]:
+
+        @router.get("/items")
+        @router.version(version)
+        async def get_items():
+            return []
+
+    app = HeaderRoutingFastAPI(version_header="x-version", load_shedder=load_shedder)
+    app.include_router(router)
+    return app
+
+
+@pytest.mark.parametrize(("loop_lag", "in_flight"), [(1.0, 0), (0.0, 10)])
+async def test__load_shedder__overloaded__should_shed_only_low_priority_versions(loop_lag: float, in_flight: int):
+    load_shedder = LoadShedder({"1": 0}, max_in_flight=10)
+    client = TestClient(build_app(load_shedder))
+    load_shedder.loop_lag = loop_lag
+    load_shedder.in_flight = in_flight
+
+    result = client.get("/items", headers={"x-version": "1"})
+    assert result.status_code == 503
+    assert result.headers["retry-after"] == "1"
+    assert result.text == "Service Unavailable"
+    assert client.get("/items", headers={"x-version": "2"}).status_code == 200
+    # not matched requests are never shed
+    assert client.get("/other", headers={"x-version": "1"}).status_code == 404
+    assert load_shedder.shed_counts == {"1": 1}
+
+
+async def test__load_shedder__not_overloaded__should_handle_all_versions():
+    load_shedder = LoadShedder({"1": 0})
+    client = TestClient(build_app(load_shedder))
+    assert client.get("/items", headers={"x-version": "1"}).status_code == 200
+    assert load_shedder.in_flight == 0
+    assert load_shedder.shed_counts == {}
+
+
+async def test__load_shedder__probe__should_measure_loop_lag():
+    load_shedder = LoadShedder({}, probe_interval=0.01)
+    load_shedder.ensure_probe()
+    await asyncio.sleep(0)
+    # blocks event loop
+    time.sleep(0.05)
+    await asyncio.sleep(0.005)
+    assert load_shedder.loop_lag > 0.02
+    await load_shedder.stop_probe()
+
+
+async def test__load_shedder__app_shutdown__should_stop_probe():
+    load_shedder = LoadShedder({"1": 0})
+    with TestClient(build_app(load_shedder)) as client:
+        assert client.get("/items", headers={"x-version": "1"}).status_code == 200
+        probe_task = load_shedder._probe_task
+        assert probe_task is not None
+        assert not probe_task.done()
+        # started once per event loop
+        assert client.get("/items", headers={"x-version": "1"}).status_code == 200
+        assert load_shedder._probe_task is probe_task
+
+    assert probe_task.cancelled()
+    assert load_shedder._probe_task is None
+    # nothing to stop anymore
+    await load_shedder.stop_probe()
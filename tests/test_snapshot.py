@@ -0,0 +1,86 @@
+import gc
+import weakref
+
+from fastapi.testclient import TestClient
+
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.openapi import build_routing_snapshot, doc_generation
+
+
+def build_router(versions: list[str]) -> HeaderVersionedAPIRouter:
+    router = HeaderVersionedAPIRouter()
+    for version in versions:
+
+        @router.get("/items")
+        @router.version(version)
+        async def get_items(version: str = version):
+            return {"version": version}
+
+    return router
+
+
+def build_app() -> HeaderRoutingFastAPI:
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(build_router(["1", "2"]))
+    return doc_generation(app)
+
+
+async def test__swap_routing__new_snapshot__should_serve_new_versions_and_docs():
+    app = build_app()
+    client = TestClient(app)
+    assert client.get("/version_1/openapi.json").status_code == 200
+
+    staging_router = HeaderVersionedAPIRouter()
+    staging_router.include_router(build_router(["2", "3"]))
+    snapshot = build_routing_snapshot(app, staging_router)
+    # nothing is changed until the swap
+    assert client.get("/items", headers={"x-version": "1"}).json() == {"version": "1"}
+
+    app.swap_routing(snapshot)
+    assert app.router.get_routing_table() is snapshot
+    assert client.get("/items", headers={"x-version": "1"}).status_code == 406
+    assert client.get("/items", headers={"x-version": "3"}).json() == {"version": "3"}
+    assert client.get("/version_1/openapi.json").status_code == 404
+    assert client.get("/version_3/openapi.json").status_code == 200
+    # docs are not duplicated
+    assert len([route for route in app.routes if getattr(route, "path", None) == "/version_3"]) == 1
+
+
+async def test__swap_routing__request_in_flight__should_keep_its_snapshot():
+    app = build_app()
+    snapshot = build_routing_snapshot(app, build_router(["2"]), docs=False)
+
+    @app.get("/swap")
+    async def swap():
+        app.swap_routing(snapshot)
+        return {"swapped": True}
+
+    client = TestClient(app)
+    assert client.get("/swap").json() == {"swapped": True}
+    assert client.get("/swap").status_code == 404
+    assert client.get("/items", headers={"x-version": "1"}).status_code == 406
+
+
+async def test__swap_routing__retired_routes__should_be_released():
+    app = build_app()
+    client = TestClient(app)
+    assert client.get("/items", headers={"x-version": "1"}).status_code == 200
+    retired_routes = [weakref.ref(route) for route in app.routes]
+
+    app.swap_routing(build_routing_snapshot(app, build_router(["3"])))
+    gc.collect()
+    assert all(route() is None for route in retired_routes)
+    assert client.get("/items", headers={"x-version": "3"}).status_code == 200
+
+
+async def test__build_snapshot__warm__should_precompute_candidates():
+    router = HeaderVersionedAPIRouter(selector_headers=["x-platform"])
+
+    @router.get("/items")
+    @router.version("1", selectors=("ios",))
+    async def get_items():
+        raise AssertionError("only routing is checked")
+
+    snapshot = router.build_snapshot()
+    assert set(snapshot._candidates) == {(None, ("ios",)), (None, (None,)), ("1", ("ios",)), ("1", (None,))}
+    assert router.build_snapshot(warm=False)._candidates == {}
@@ -0,0 +1,171 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from examples.basic.app import app as basic_app
+from examples.deferred_include.app import app as deferred_include_app
+from examples.migrations.app import app as migrations_app
+from examples.platform_selectors.app import app as platform_selectors_app
+from examples.router_level_versions.app import app as router_level_versions_app
+from examples.unversioned_routers_wrapping.app import app as unversioned_routers_wrapping_app
+from fastapi_header_versioning import HeaderRoutingFastAPI, HeaderVersionedAPIRouter
+from fastapi_header_versioning.dispatch import ResolutionKind, RouteResolution
+from fastapi_header_versioning.testing import (
+    DifferentialRoutingChecker,
+    ScopeGenerator,
+    assert_routing_equivalent,
+    baseline_resolve,
+    build_scope,
+    describe_resolution,
+    get_router,
+    reference_resolve,
+    simplifications,
+)
+
+
+@pytest.mark.parametrize(
+    "app",
+    [
+        basic_app,
+        deferred_include_app,
+        migrations_app,
+        platform_selectors_app,
+        router_level_versions_app,
+        unversioned_routers_wrapping_app,
+    ],
+)
+async def test__assert_routing_equivalent__example_apps__should_not_diverge(app: FastAPI):
+    assert_routing_equivalent(app, samples=500)
+
+
+async def test__differential_checker__broken_resolver__should_report_minimized_divergence():
+    router = basic_app.router
+
+    def resolver_without_fallback(scope: dict) -> RouteResolution:
+        if scope["requested_version"] not in router.registered_versions:
+            return RouteResolution(ResolutionKind.VERSION_NOT_FOUND)
+        return router.resolve(scope)
+
+    divergence = DifferentialRoutingChecker(basic_app, resolver_without_fallback).check(samples=500)
+    assert divergence is not None
+    assert divergence.optimized.kind == ResolutionKind.VERSION_NOT_FOUND
+    # not registered version is the only thing left from original scope
+    assert divergence.minimized_scope["method"] == "GET"
+    assert divergence.minimized_scope["requested_version"] not in router.registered_versions
+
+    with pytest.raises(AssertionError, match="Routing divergence"):
+        assert_routing_equivalent(basic_app, resolver_without_fallback, samples=500)
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "version", "kind"),
+    [
+        ("GET", "/items", "2", ResolutionKind.FULL),
+        ("HEAD", "/items", "2", ResolutionKind.PARTIAL),
+        ("GET", "/items/", "2", ResolutionKind.REDIRECT),
+        ("GET", "/items", "1", ResolutionKind.NOT_FOUND),
+        ("GET", "/items", "0", ResolutionKind.VERSION_NOT_FOUND),
+    ],
+)
+async def test__reference_resolve__should_follow_dispatch_rules(method, path, version, kind):
+    assert reference_resolve(basic_app.router, build_scope(method, path, version)).kind == kind
+
+
+@pytest.mark.parametrize(
+    "app",
+    [basic_app, deferred_include_app, migrations_app, router_level_versions_app, unversioned_routers_wrapping_app],
+)
+async def test__reference_resolve__apps_without_selectors__should_differ_from_baseline_only_as_documented(app: FastAPI):
+    router = get_router(app)
+    generator = ScopeGenerator(router)
+    for _ in range(500):
+        scope = generator.scope()
+        reference = reference_resolve(router, dict(scope))
+        baseline = baseline_resolve(router, dict(scope))
+        if baseline.kind == ResolutionKind.PARTIAL:
+            # version-scoped 405
+            assert reference.kind in (ResolutionKind.PARTIAL, ResolutionKind.NOT_FOUND), scope
+            assert reference.kind == ResolutionKind.NOT_FOUND or baseline.allowed_methods <= reference.allowed_methods
+        elif baseline.kind == ResolutionKind.REDIRECT:
+            # version-scoped redirect, to the same url
+            assert reference.kind in (ResolutionKind.REDIRECT, ResolutionKind.NOT_FOUND), scope
+            assert reference.kind == ResolutionKind.NOT_FOUND or reference.redirect_url == baseline.redirect_url
+        else:
+            assert describe_resolution(reference) == describe_resolution(baseline), scope
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "version", "kind"),
+    [
+        ("GET", "/items", "2", ResolutionKind.FULL),
+        ("GET", "/items", "2.5", ResolutionKind.FULL),
+        ("HEAD", "/items", "2", ResolutionKind.PARTIAL),
+        ("GET", "/items/", "2", ResolutionKind.REDIRECT),
+        ("GET", "/items", "0", ResolutionKind.VERSION_NOT_FOUND),
+        ("GET", "/not-existing", "2", ResolutionKind.NOT_FOUND),
+    ],
+)
+async def test__baseline_resolve__should_model_original_router(method, path, version, kind):
+    assert baseline_resolve(basic_app.router, build_scope(method, path, version)).kind == kind
+
+
+async def test__reference_resolve__path_of_other_version__should_not_be_allowed():
+    # "/items" is served by version "2" only - the original router answered 405 with methods of a version "2" route
+    scope = build_scope("POST", "/items", "1")
+    assert baseline_resolve(basic_app.router, dict(scope)).allowed_methods == frozenset({"GET"})
+    assert reference_resolve(basic_app.router, dict(scope)).kind == ResolutionKind.NOT_FOUND
+
+
+async def test__differential_checker__divergence_on_found_route__should_minimize_path():
+    router = migrations_app.router
+
+    def resolver_without_users(scope: dict) -> RouteResolution:
+        resolution = router.resolve(scope)
+        if resolution.kind == ResolutionKind.FULL and scope["path"].startswith("/users/"):
+            return RouteResolution(ResolutionKind.NOT_FOUND, resolution.version)
+        return resolution
+
+    divergence = DifferentialRoutingChecker(migrations_app, resolver_without_users).check(samples=500)
+    assert divergence is not None
+    assert divergence.minimized_scope["path"] == "/users/1"
+    assert "Routing divergence for GET /users/1 " in str(divergence)
+    assert "/users/{user_id}" in str(divergence)
+
+
+async def test__get_router__not_versioned_app__should_raise():
+    with pytest.raises(TypeError):
+        get_router(FastAPI())
+
+
+async def test__reference_resolve__route_bound_to_second_selector__should_skip_first_dimension():
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items")
+    @router.version("1", selectors=(None, "beta"))
+    async def get_items_beta():
+        return "beta"
+
+    @router.get("/items")
+    @router.version("1")
+    async def get_items():
+        return "generic"
+
+    app = HeaderRoutingFastAPI(version_header="x-version", selector_headers=["x-platform", "x-channel"])
+    app.include_router(router)
+    beta = reference_resolve(app.router, build_scope("GET", "/items", "1", ("ios", "beta")))
+    assert beta.route.name == "get_items_beta"  # type: ignore[union-attr]
+    stable = reference_resolve(app.router, build_scope("GET", "/items", "1", ("ios", "stable")))
+    assert stable.route.name == "get_items"  # type: ignore[union-attr]
+    assert_routing_equivalent(app, samples=200)
+    client = TestClient(app)
+    assert client.get("/items", headers={"x-version": "1", "x-platform": "ios", "x-channel": "beta"}).json() == "beta"
+    assert client.get("/items", headers={"x-version": "1", "x-channel": "stable"}).json() == "generic"
+
+
+async def test__simplifications__should_drop_selectors_and_trailing_slash():
+    scope = build_scope("GET", "/items/", None, ("ios",))
+    assert [(candidate["path"], candidate["requested_selectors"]) for candidate in simplifications(scope)] == [
+        ("/items/", (None,)),
+        ("/items", ("ios",)),
+        ("/1", ("ios",)),
+    ]
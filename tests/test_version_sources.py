@@ -0,0 +1,123 @@
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from fastapi_header_versioning import (
+    HeaderRoutingFastAPI,
+    HeaderVersionedAPIRouter,
+    HeaderVersionSource,
+    MediaTypeVersionSource,
+    PathVersionSource,
+    QueryVersionSource,
+)
+from fastapi_header_versioning.sources import VersionExtractor, find_media_type_parameter, find_query_parameter
+
+
+@pytest.fixture()
+def client() -> TestClient:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items")
+    @router.version("1")
+    async def get_items_v1(request: Request):
+        return {"version": "1", "source": request.scope["version_source"], "root_path": request.scope["root_path"]}
+
+    @router.get("/items")
+    @router.version("2")
+    async def get_items_v2(request: Request):
+        return {"version": "2", "source": request.scope["version_source"], "root_path": request.scope["root_path"]}
+
+    app = HeaderRoutingFastAPI(
+        version_sources=[
+            HeaderVersionSource("x-version"),
+            MediaTypeVersionSource(),
+            QueryVersionSource(),
+            PathVersionSource(),
+        ],
+    )
+    app.include_router(router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    ("path", "headers", "expected"),
+    [
+        ("/items", {"x-version": "2"}, {"version": "2", "source": "header", "root_path": ""}),
+        (
+            "/items",
+            {"accept": "application/json; version=2"},
+            {"version": "2", "source": "media_type", "root_path": ""},
+        ),
+        ("/items?api-version=2", {}, {"version": "2", "source": "query", "root_path": ""}),
+        ("/v2/items", {}, {"version": "2", "source": "path", "root_path": "/v2"}),
+        ("/v1.5/items", {}, {"version": "1", "source": "path", "root_path": "/v1.5"}),
+        # header has the highest priority, path segment is stripped anyway
+        ("/v1/items?api-version=1", {"x-version": "2"}, {"version": "2", "source": "header", "root_path": "/v1"}),
+        (
+            "/items?api-version=2",
+            {"accept": "text/html, application/json;version=1"},
+            {"version": "1", "source": "media_type", "root_path": ""},
+        ),
+    ],
+)
+async def test__version_sources__first_source_with_value__should_be_used(client: TestClient, path, headers, expected):
+    result = client.get(path, headers=headers)
+    assert result.status_code == 200
+    assert result.json() == expected
+
+
+async def test__version_sources__no_version_provided__should_return_404(client: TestClient):
+    result = client.get("/items")
+    assert result.status_code == 404
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("application/json; version=2", "2"),
+        ('application/json; charset=utf-8; Version="3"', "3"),
+        ("text/html, application/json; q=0.9; version=4", "4"),
+        ("application/json", None),
+        ("application/json; version", None),
+    ],
+)
+async def test__find_media_type_parameter__should_extract_parameter(value: str, expected):
+    assert find_media_type_parameter(value, "version") == expected
+
+
+@pytest.mark.parametrize(
+    ("query_string", "expected"),
+    [
+        (b"api-version=2", "2"),
+        (b"foo=1&api-version=2.1&bar=3", "2.1"),
+        (b"old-api-version=1&api-version=3", "3"),
+        (b"old-api-version=1", None),
+        (b"api-version=1%2B2", "1+2"),
+    ],
+)
+async def test__find_query_parameter__should_extract_parameter(query_string: bytes, expected):
+    assert find_query_parameter(query_string, b"api-version=") == expected
+
+
+async def test__version_extractor__invalid_configuration__should_raise():
+    with pytest.raises(ValueError, match="At least one"):
+        VersionExtractor([])
+    with pytest.raises(ValueError, match="Only one path"):
+        VersionExtractor([PathVersionSource(), PathVersionSource(prefix="version")])
+    with pytest.raises(TypeError):
+        VersionExtractor([object()])
+
+
+async def test__header_routing_fastapi__no_version_source__should_raise():
+    with pytest.raises(ValueError, match="At least one version source"):
+        HeaderRoutingFastAPI()
+    with pytest.raises(ValueError, match="At least one version source"):
+        HeaderRoutingFastAPI(version_sources=[])
+
+
+async def test__version_extractor__utf8_header__should_be_decoded_as_utf8():
+    extract_version = VersionExtractor([HeaderVersionSource("x-version")], ["x-platform"])
+    scope = {"headers": [(b"x-version", "2-β".encode()), (b"x-platform", "ios-β".encode())], "path": "/"}
+    extract_version(scope)
+    assert scope["requested_version"] == "2-β"
+    assert scope["requested_selectors"] == ("ios-β",)
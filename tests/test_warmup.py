@@ -0,0 +1,181 @@
+import asyncio
+import threading
+from uuid import UUID
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from fastapi_header_versioning import (
+    HeaderRoutingFastAPI,
+    HeaderVersionedAPIRouter,
+    MediaTypeVersionSource,
+    PathVersionSource,
+    QueryVersionSource,
+)
+from fastapi_header_versioning.openapi import VersionDocsMount, doc_generation
+from fastapi_header_versioning.sources import VersionSource
+from fastapi_header_versioning.synthetic import SyntheticRequest
+from fastapi_header_versioning.warmup import WarmUp, enable_warm_up, versioned_request
+
+
+def build_app(calls: list[tuple], **app_kwargs) -> HeaderRoutingFastAPI:
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/items/{item_id}")
+    @router.version("1")
+    async def get_item(item_id: int, request: Request):
+        calls.append((request.scope["requested_version"], "get_item", item_id))
+        return {}
+
+    @router.get("/owners/{owner_id}")
+    @router.version("2")
+    async def get_owner(owner_id: UUID, request: Request):
+        calls.append((request.scope["requested_version"], "get_owner", owner_id))
+        return {}
+
+    @router.post("/items")
+    @router.version("2")
+    async def create_item():
+        calls.append(("2", "create_item"))
+        return {}
+
+    @router.get("/health")
+    async def health(request: Request):
+        calls.append((request.scope["requested_version"], "health"))
+        return {}
+
+    app = HeaderRoutingFastAPI(**({"version_header": "x-version"} | app_kwargs))
+    app.include_router(router)
+    return doc_generation(app)
+
+
+async def test__warm_up__should_resolve_routes_of_each_version_without_calling_handlers():
+    calls: list[tuple] = []
+    app = build_app(calls)
+    warm_up = enable_warm_up(app)
+    with TestClient(app) as client:
+        client.portal.call(warm_up.wait)
+        assert calls == []
+
+        owner_id = UUID(int=1)
+        client.get("/items/1", headers={"x-version": "1"})
+        client.get(f"/owners/{owner_id}", headers={"x-version": "2"})
+        client.post("/items", headers={"x-version": "2"})
+        client.get("/health")
+        assert calls == [("1", "get_item", 1), ("2", "get_owner", owner_id), ("2", "create_item"), (None, "health")]
+
+    # readiness endpoint is served in any version
+    assert [(report.version, report.resolved, report.requests) for report in warm_up.report] == [
+        (None, 2, 0),
+        ("1", 2, 0),
+        ("2", 2, 0),
+    ]
+    assert all(route.app.openapi_schema is not None for route in app.routes if isinstance(route, VersionDocsMount))
+
+
+async def test__readiness__should_report_progress_until_warm_up_is_done():
+    release = threading.Event()
+    app = build_app([])
+
+    @app.get("/slow")
+    async def slow():
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+
+    warm_up = enable_warm_up(app, requests={None: [SyntheticRequest("GET", "/slow")]})
+    client = TestClient(app)
+    assert client.get("/ready").status_code == 503
+
+    with client:
+        # served while warm-up is in progress
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json() == {"ready": False, "versions": [], "total": 3}
+
+        release.set()
+        client.portal.call(warm_up.wait)
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+        assert [report["version"] for report in response.json()["versions"]] == [None, "1", "2"]
+        # served in any version
+        assert client.get("/ready", headers={"x-version": "1"}).status_code == 200
+
+
+@pytest.mark.parametrize(
+    "source",
+    [MediaTypeVersionSource(), QueryVersionSource(), PathVersionSource()],
+)
+async def test__warm_up__version_source__should_request_versions(source: VersionSource):
+    calls: list[tuple] = []
+    app = build_app(calls, version_sources=[source])
+    warm_up = enable_warm_up(app, readiness_path=None)
+    with TestClient(app) as client:
+        client.portal.call(warm_up.wait)
+
+    assert [(report.version, report.resolved) for report in warm_up.report] == [(None, 1), ("1", 1), ("2", 1)]
+
+
+async def test__warm_up__explicit_requests__should_be_used():
+    calls: list[tuple] = []
+    app = build_app(calls)
+    warm_up = WarmUp(
+        requests={"2": [SyntheticRequest("POST", "/items", headers=(("x-version", "2"),))]},
+        methods=("POST",),
+    )
+    report = await warm_up.run(app)
+    assert calls == [("2", "create_item")]
+    assert [(item.version, item.resolved, item.requests) for item in report] == [(None, 0, 0), ("1", 0, 0), ("2", 1, 1)]
+
+
+async def test__warm_up__failed_request__should_be_counted():
+    router = HeaderVersionedAPIRouter()
+
+    @router.get("/fail")
+    @router.version("1")
+    async def fail():
+        raise RuntimeError("Broken")
+
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.include_router(router)
+    app.mount_version(["2"], PlainTextResponse("mounted"))
+    report = await WarmUp(requests={"1": [SyntheticRequest("GET", "/fail", headers=(("x-version", "1"),))]}).run(app)
+    assert [(item.version, item.requests, item.failed) for item in report] == [(None, 0, 0), ("1", 1, 1)]
+
+
+async def test__versioned_request__unsupported_source__should_raise():
+    with pytest.raises(TypeError, match="Unsupported version source"):
+        versioned_request(VersionSource(), "1", "GET", "/")
+    assert versioned_request(QueryVersionSource(), "1", "GET", "/?a=1").path == "/?a=1&api-version=1"
+
+
+async def test__warm_up__shutdown_before_done__should_cancel_warm_up():
+    app = build_app([])
+
+    @app.get("/hang")
+    async def hang():
+        await asyncio.Event().wait()
+
+    warm_up = enable_warm_up(app, requests={None: [SyntheticRequest("GET", "/hang")]})
+    with TestClient(app):
+        task = warm_up.task
+
+    assert task is not None
+    assert task.cancelled()
+    assert not warm_up.ready
+    assert warm_up.task is None
+    # nothing to wait for
+    await warm_up.wait()
+
+
+async def test__warm_up__failed__should_be_logged(caplog: pytest.LogCaptureFixture):
+    app = HeaderRoutingFastAPI(version_header="x-version")
+    app.openapi = None  # type: ignore
+    warm_up = WarmUp()
+    with pytest.raises(TypeError):
+        await warm_up.start(app)
+    await warm_up.stop()
+    assert "Warm-up failed" in caplog.text
+    assert not warm_up.ready